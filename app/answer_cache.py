@@ -0,0 +1,204 @@
+"""
+Answer cache in front of `query_agent`.
+
+Questions are normalized (case, whitespace, punctuation, filler words,
+number words, month/quarter spellings) so trivially different phrasings
+share one entry. Optionally, a local character-trigram embedding finds
+near-duplicates above a cosine threshold, but only among questions that
+mention exactly the same numbers and periods, so "Q1" never answers "Q2".
+
+Entries are keyed by tenant and data version: a reload clears the cache,
+so stale reports never come back, and tenants never see each other's
+answers. The cache is warmed from `query_logs` rows that
+were answered on the current data version.
+"""
+import os
+import re
+import threading
+import zlib
+from typing import TYPE_CHECKING, Dict, Optional
+
+from sqlalchemy import desc, select
+
+from app.cache import TTLCache
+from app.db import current_tenant, read_engine
+from app.logger import logger
+from app.models import QueryLog
+from app.versioning import get_data_version
+
+if TYPE_CHECKING:
+    import numpy as np
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+# Cosine threshold for near-duplicate matches; 0 disables similarity lookup
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+EMBEDDING_DIM = 512
+
+FILLER = {
+    "a", "an", "the", "please", "me", "us", "can", "could", "would", "you",
+    "tell", "show", "give", "what", "whats", "was", "were", "is", "are", "our", "my",
+    "in", "for", "during",
+}
+NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10", "eleven": "11", "twelve": "12",
+    "first": "1", "second": "2", "third": "3", "fourth": "4",
+}
+MONTHS = {
+    name: f"m{i:02d}"
+    for i, names in enumerate(
+        [
+            ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"),
+            ("may",), ("june", "jun"), ("july", "jul"), ("august", "aug"),
+            ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+TOKEN_RE = re.compile(r"[a-z]+\d*|\d+(?:\.\d+)?")
+ANCHOR_RE = re.compile(r"^(?:\d+|q[1-4]|h[12]|m\d\d)$")
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question, used as the exact-match cache key."""
+    text = question.lower()
+    text = re.sub(r"(?<=\d),(?=\d{3})", "", text)  # 1,000 -> 1000
+    text = re.sub(r"\bq(?:uarter)?\s*([1-4])\b", r"q\1", text)  # quarter 1 / q 1 -> q1
+    text = re.sub(r"\b(first|second|third|fourth)\s+quarter\b", lambda m: f"q{NUMBER_WORDS[m.group(1)]}", text)
+    text = re.sub(r"\bfy\s*(\d{2,4})\b", r"\1", text)  # fy2024 -> 2024
+
+    tokens = []
+    for token in TOKEN_RE.findall(text):
+        if token in FILLER:
+            continue
+        token = NUMBER_WORDS.get(token, token)
+        token = MONTHS.get(token, token)
+        if "." in token and token.replace(".", "", 1).isdigit():
+            token = str(float(token)).rstrip("0").rstrip(".")
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+def _anchors(normalized: str) -> frozenset:
+    """Numbers and periods in a question; similarity matches must agree on them."""
+    return frozenset(t for t in normalized.split() if ANCHOR_RE.match(t))
+
+
+def embed(normalized: str) -> "np.ndarray":
+    """Local, dependency-free embedding: hashed character trigrams, L2-normalized."""
+    import numpy as np
+
+    vec = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    padded = f"  {normalized}  "
+    for i in range(len(padded) - 2):
+        vec[zlib.crc32(padded[i:i + 3].encode()) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class AnswerCache:
+    def __init__(self, maxsize: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL, similarity: float = ANSWER_CACHE_SIMILARITY):
+        self._entries = TTLCache(maxsize, ttl)
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}  # tenant -> data version last seen
+        self.similar_hits = 0
+
+    def _sync_version(self, tenant: str, version: int):
+        """Evict the tenant's answers computed on older data; other tenants keep theirs."""
+        with self._lock:
+            seen = self._versions.get(tenant)
+            if version != seen:
+                if seen is not None:
+                    dropped = self._entries.discard_where(lambda key: key[0] == tenant)
+                    logger.info("Answer cache invalidated for %s (data version %s -> %s, %d entries)", tenant, seen, version, dropped)
+                self._versions[tenant] = version
+
+    def lookup(self, question: str, version: Optional[int] = None) -> Optional[dict]:
+        version = get_data_version() if version is None else version
+        tenant = current_tenant()
+        self._sync_version(tenant, version)
+        normalized = normalize_question(question)
+
+        entry = self._entries.get((tenant, version, normalized))
+        if entry is None and self.similarity > 0:
+            entry = self._nearest(tenant, version, normalized)
+        if entry is None:
+            return None
+        return {
+            "question": question,
+            "report": entry["report"],
+            "cached": True,
+            "matched_question": entry["question"],
+        }
+
+    def _nearest(self, tenant: str, version: int, normalized: str) -> Optional[dict]:
+        import numpy as np
+
+        anchors = _anchors(normalized)
+        candidates = [
+            (key, entry)
+            for key, entry in self._entries.items()
+            if key[:2] == (tenant, version) and entry["anchors"] == anchors
+        ]
+        if not candidates:
+            return None
+
+        matrix = np.stack([entry["vector"] for _, entry in candidates])
+        scores = matrix @ embed(normalized)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        key, entry = candidates[best]
+        self._entries.get(key)  # refresh LRU position
+        self.similar_hits += 1
+        return entry
+
+    def store(self, question: str, report: str, version: Optional[int] = None):
+        version = get_data_version() if version is None else version
+        tenant = current_tenant()
+        self._sync_version(tenant, version)
+        normalized = normalize_question(question)
+        self._entries.put(
+            (tenant, version, normalized),
+            {
+                "question": question,
+                "report": report,
+                "anchors": _anchors(normalized),
+                "vector": embed(normalized),
+            },
+        )
+
+    def warm_from_logs(self, limit: int = ANSWER_CACHE_SIZE) -> int:
+        """Load recent successful answers computed on the current data version."""
+        version = get_data_version()
+        self._sync_version(current_tenant(), version)
+        with read_engine.connect() as conn:
+            rows = conn.execute(
+                select(QueryLog.question, QueryLog.report)
+                .where(
+                    QueryLog.data_version == version,
+                    QueryLog.report.is_not(None),
+                    QueryLog.error.is_(False),
+                )
+                .order_by(desc(QueryLog.id))
+                .limit(limit)
+            ).fetchall()
+        for question, report in reversed(rows):
+            self.store(question, report, version)
+        return len(rows)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        stats = self._entries.stats()
+        stats["similar_hits"] = self.similar_hits
+        stats["similarity_threshold"] = self.similarity or None
+        stats["data_version"] = self._versions.get(current_tenant())
+        return stats
+
+
+answer_cache = AnswerCache()
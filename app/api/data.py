@@ -1,22 +1,60 @@
-from fastapi import APIRouter, Query
-from app.db import SessionLocal
-from app.models import Transaction
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.export import MEDIA_TYPES, RawFilter, export_rows, fetch_page, parse_columns
 
 router = APIRouter(tags=["Data Access"])
 
+MAX_PAGE_ROWS = 1000
+
 
 @router.get("/data/raw", summary="Fetch raw transactions")
-def get_raw_data(limit: int = Query(10, description="Max number of rows to return.")):
+def get_raw_data(
+    limit: Optional[int] = Query(
+        None, ge=1, description=f"Max rows: page size for JSON (default 10, max {MAX_PAGE_ROWS}); optional cap for exports."
+    ),
+    after_id: int = Query(0, ge=0, description="Keyset cursor: return rows with `id` greater than this."),
+    source: Optional[str] = Query(None, description="Filter by source, e.g. `quickbooks` or `rootfi`."),
+    type: Optional[str] = Query(None, description="Filter by type: `revenue`, `expense` or `profit`."),
+    category: Optional[str] = Query(None, description="Filter by category (exact match)."),
+    date_from: Optional[date] = Query(None, description="Earliest date (inclusive), `YYYY-MM-DD`."),
+    date_to: Optional[date] = Query(None, description="Latest date (inclusive), `YYYY-MM-DD`."),
+    columns: Optional[str] = Query(None, description="Comma-separated projection, e.g. `date,category,amount` (`id` is always included)."),
+    format: str = Query("json", pattern="^(json|ndjson|csv|arrow)$", description="`json` page, or a streaming `ndjson`, `csv` or `arrow` export."),
+):
     """
     Return **raw transaction data** directly from the database.
 
     Useful for debugging, verifying ingestion, or testing SQL queries.
 
+    - `format=json` returns one page plus `next_after_id`; pass it back as
+      `after_id` to get the next page (`null` on the last page).
+    - `format=ndjson|csv|arrow` streams **every** matching row (from
+      `after_id`, up to `limit` if given) in constant memory; `arrow` is an
+      Arrow IPC stream readable with `pyarrow.ipc.open_stream`.
+
     **Example:**
     ```bash
     curl "http://localhost:8000/data/raw?limit=5"
+    curl "http://localhost:8000/data/raw?type=expense&date_from=2024-01-01&columns=date,category,amount&after_id=120"
+    curl -o transactions.csv "http://localhost:8000/data/raw?format=csv&source=rootfi"
     ```
     """
-    db = SessionLocal()
-    rows = db.query(Transaction).limit(limit).all()
-    return {"transactions": [r.as_dict() for r in rows]}
+    try:
+        cols = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    where = RawFilter(after_id, source, type, category, date_from, date_to)
+
+    if format == "json":
+        if limit is not None and limit > MAX_PAGE_ROWS:
+            raise HTTPException(status_code=400, detail=f"limit must be at most {MAX_PAGE_ROWS} for JSON; use a streaming format")
+        return fetch_page(cols, where, limit or 10)
+
+    return StreamingResponse(
+        export_rows(format, cols, where, limit),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
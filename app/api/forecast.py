@@ -0,0 +1,101 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app import forecasting, model_selection
+from app.rollups import GROUP_COLUMNS
+
+router = APIRouter(tags=["Forecasting & Visualization"])
+
+
+@router.get("/forecast/cache", summary="Fitted-model cache statistics")
+def forecast_cache_stats():
+    """
+    Return **hit/miss counters** of the shared fitted-model cache used by
+    `/plot/forecast` and the `forecast_arima` agent tool.
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/forecast/cache
+    ```
+
+    **Response:**
+    ```json
+    {"size": 1, "maxsize": 128, "ttl_seconds": 3600.0, "hits": 9, "misses": 1,
+     "evictions": 0, "hit_rate": 0.9, "invalidations": 0, "data_version": 2}
+    ```
+    """
+    return forecasting.cache_stats()
+
+
+@router.get("/forecast/models", summary="Selected ARIMA models per series")
+def forecast_models():
+    """
+    List the **automatically selected ARIMA models** persisted per series
+    (`target|source|category`). Each has the chosen orders, AIC, the
+    months it was fitted on, and when the grid was last searched. Months
+    added since then were absorbed by warm-started refits (`appended`).
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/forecast/models
+    ```
+
+    **Response:**
+    ```json
+    [{"series_key": "revenue||", "order": [0, 1, 1], "seasonal_order": [0, 0, 0, 0],
+      "aic": 1776.3, "start": "2021-01", "n_obs": 55, "appended": 0,
+      "searched_at": "2025-08-01 09:30:12", "updated_at": "2025-08-01 09:30:12"}]
+    ```
+    """
+    return model_selection.list_models()
+
+
+@router.get("/forecast/batch", summary="Forecast every series of a grouping in parallel")
+def forecast_batch(
+    group_by: str = Query(
+        "category",
+        description="Comma-separated grouping columns: any of `category`, `source`, `type`.",
+    ),
+    horizon: int = Query(6, ge=1, le=60, description="Number of months to forecast forward."),
+    type: Optional[str] = Query(
+        None,
+        description="Transaction type filter (`revenue`, `expense`, `profit`). Required unless grouping by type.",
+    ),
+    source: Optional[str] = Query(None, description="Optional source filter (`quickbooks` or `rootfi`)."),
+    category: Optional[str] = Query(None, description="Optional category filter."),
+):
+    """
+    Forecast **every monthly series** of a grouping in one call, e.g. each
+    expense category for both sources. Series are built from the monthly
+    rollups in one pass and fitted in parallel on a process pool
+    (`FORECAST_WORKERS`). A series that cannot be fitted gets an `error`
+    entry instead of failing the whole batch.
+
+    **Example:**
+    ```bash
+    curl "http://localhost:8000/forecast/batch?group_by=category,source&type=expense&horizon=3"
+    ```
+
+    **Response:**
+    ```json
+    {
+      "group_by": ["category", "source"],
+      "horizon": 3,
+      "periods": ["2025-08", "2025-09", "2025-10"],
+      "series": [
+        {"key": {"category": "Payroll", "source": "rootfi"}, "last": 81234.5,
+         "forecast": [80110.2, 79950.8, 80002.1], "aic": 612.4},
+        {"key": {"category": "Bank Fees", "source": "quickbooks"},
+         "error": "Insufficient history (need at least 4 months)"}
+      ],
+      "failed": 1
+    }
+    ```
+    """
+    columns = [c.strip() for c in group_by.split(",") if c.strip()]
+    if not columns or set(columns) - set(GROUP_COLUMNS):
+        raise HTTPException(status_code=400, detail=f"group_by must be a subset of {', '.join(GROUP_COLUMNS)}")
+    if type is None and "type" not in columns:
+        raise HTTPException(status_code=400, detail="Pass `type` or include `type` in group_by")
+
+    return forecasting.batch_forecast(columns, horizon, type=type, source=source, category=category)
@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.telemetry import render_prometheus
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
 router = APIRouter(tags=["System Health"])
 
@@ -19,3 +23,18 @@ def health_check():
     ```
     """
     return {"status": "ok"}
+
+
+@router.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Request latency histograms per route, per-stage timings (schema build,
+    LLM round-trips, tool calls, ARIMA fits, chart rendering) and tool call
+    and error counters, in the **Prometheus text format**.
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/metrics
+    ```
+    """
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,21 +1,114 @@
-from fastapi import APIRouter
+import json
+from datetime import date, datetime
+from typing import Optional
 
-router = APIRouter(tags=["System Health"])
+from fastapi import APIRouter, Query
+from sqlalchemy import select
+from app.db import read_engine
+from app.models import QueryLog, QueryLogDaily
 
+router = APIRouter(tags=["Query Logs"])
 
-@router.get("/health", summary="Health check")
-def health_check():
+_logs = QueryLog.__table__
+_daily = QueryLogDaily.__table__
+
+
+def _entry(row, include_result: bool) -> dict:
+    entry = {
+        "id": row.id,
+        "created_at": str(row.created_at) if row.created_at else None,
+        "tenant": row.tenant,
+        "question": row.question,
+        "tool": row.tool,
+        "sql": row.sql,
+        "report": row.report,
+        "error": row.error,
+        "data_version": row.data_version,
+    }
+    if include_result:
+        try:
+            entry["result"] = json.loads(row.result) if row.result else None
+        except ValueError:
+            entry["result"] = row.result
+    return entry
+
+
+@router.get("/logs", summary="Browse logged queries")
+def list_logs(
+    limit: int = Query(50, ge=1, le=500, description="Page size."),
+    before_id: Optional[int] = Query(None, ge=1, description="Keyset cursor: return entries older than this id."),
+    since: Optional[datetime] = Query(None, description="Earliest `created_at` (UTC), e.g. `2024-06-01T00:00:00`."),
+    until: Optional[datetime] = Query(None, description="Latest `created_at` (UTC)."),
+    tool: Optional[str] = Query(None, description="Only entries answered by this tool, e.g. `sql_query`, `answer_cache`."),
+    errors_only: bool = Query(False, description="Only failed queries."),
+    q: Optional[str] = Query(None, min_length=2, description="Case-insensitive text search in the question."),
+    include_result: bool = Query(False, description="Include the (decompressed) tool result of each entry."),
+):
     """
-    Quick **health check** endpoint to verify the service is running.
+    Return the current tenant's `query_logs` entries, **newest first**,
+    with filters and keyset pagination: pass `next_before_id` from a
+    response as `before_id` to get the next page (`null` on the last page).
+
+    Entries older than the retention window are only available as daily
+    counts via `/logs/daily`.
 
     **Example:**
     ```bash
-    curl http://localhost:8000/health
+    curl "http://localhost:8000/logs?limit=20&errors_only=true"
+    curl "http://localhost:8000/logs?tool=sql_query&since=2024-06-01T00:00:00&q=revenue"
     ```
+    """
+    columns = [c for c in _logs.c if include_result or c.name != "result"]
+    stmt = select(*columns).order_by(_logs.c.id.desc()).limit(limit)
+    if before_id is not None:
+        stmt = stmt.where(_logs.c.id < before_id)
+    if since is not None:
+        stmt = stmt.where(_logs.c.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(_logs.c.created_at <= until)
+    if tool is not None:
+        stmt = stmt.where(_logs.c.tool == tool)
+    if errors_only:
+        stmt = stmt.where(_logs.c.error.is_(True))
+    if q:
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        stmt = stmt.where(_logs.c.question.ilike(f"%{escaped}%", escape="\\"))
 
-    **Response:**
-    ```json
-    {"status": "ok"}
+    with read_engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    return {
+        "logs": [_entry(row, include_result) for row in rows],
+        "next_before_id": rows[-1].id if len(rows) == limit else None,
+    }
+
+
+@router.get("/logs/daily", summary="Daily query counts for compacted history")
+def daily_logs(
+    since: Optional[date] = Query(None, description="First day (inclusive)."),
+    until: Optional[date] = Query(None, description="Last day (inclusive)."),
+    tool: Optional[str] = Query(None, description="Only this tool."),
+):
+    """
+    Return per-day, per-tool query and error counts for entries that the
+    retention job has rolled out of `query_logs`.
+
+    **Example:**
+    ```bash
+    curl "http://localhost:8000/logs/daily?since=2024-01-01"
     ```
     """
-    return {"status": "ok"}
+    stmt = select(_daily).order_by(_daily.c.day.desc(), _daily.c.tool)
+    if since is not None:
+        stmt = stmt.where(_daily.c.day >= since)
+    if until is not None:
+        stmt = stmt.where(_daily.c.day <= until)
+    if tool is not None:
+        stmt = stmt.where(_daily.c.tool == tool)
+    with read_engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    return {
+        "days": [
+            {"day": r.day.isoformat(), "tool": r.tool, "queries": r.queries, "errors": r.errors}
+            for r in rows
+        ]
+    }
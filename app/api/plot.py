@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Query
-from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import Response
 from app.plot_utils import generate_forecast_plot
 
 router = APIRouter(tags=["Forecasting & Visualization"])
@@ -7,25 +9,47 @@ router = APIRouter(tags=["Forecasting & Visualization"])
 
 @router.get(
     "/plot/forecast",
-    summary="Generate a revenue forecast plot (PNG)",
-    response_class=StreamingResponse,
+    summary="Generate a revenue forecast plot (PNG, SVG or JSON)",
+    response_class=Response,
+    responses={
+        200: {
+            "content": {"image/png": {}, "image/svg+xml": {}, "application/json": {}},
+            "description": "Rendered chart, or the underlying numbers for `format=json`.",
+        },
+        304: {"description": "Not modified: the `If-None-Match` ETag is still current."},
+    },
 )
-def forecast_plot(
+async def forecast_plot(
     horizon: int = Query(
         6,
+        ge=1,
+        le=60,
         description="Number of months to forecast forward (default: 6)."
     ),
+    format: Literal["png", "svg", "json"] = Query(
+        "png",
+        description="`png` (default), `svg`, or `json` to skip rendering and get the numbers only.",
+    ),
+    width: int = Query(640, ge=200, le=2000, description="Image width in pixels."),
+    height: int = Query(480, ge=150, le=2000, description="Image height in pixels."),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Returns a **PNG chart** with historical revenue and a forecast for the
     requested number of future months.
 
     Use this to quickly **visualize trends** without running a natural
-    language query.
+    language query. Dashboards that only need the numbers can request
+    `format=json`.
+
+    Responses carry an `ETag` that only changes when the data, horizon,
+    size or format does; send it back in `If-None-Match` to get a
+    `304 Not Modified`.
 
     **Example:**
     ```bash
     curl -o forecast.png "http://localhost:8000/plot/forecast?horizon=6"
+    curl "http://localhost:8000/plot/forecast?horizon=6&format=json"
     ```
     """
-    return generate_forecast_plot(horizon)
+    return await generate_forecast_plot(horizon, format, width, height, if_none_match=if_none_match)
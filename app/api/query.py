@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Query, Depends
-from sqlalchemy.orm import Session
-from app.db import SessionLocal
-from app.llm import query_agent
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from app.answer_cache import answer_cache
+from app.batch_jobs import BATCH_MAX_QUESTIONS, BatchFull, batch_runner, get_job, list_jobs
+from app.intent_router import intent_router
+from app.llm import log_query
+from app.query_executor import DeadlineExceeded, Saturated, query_executor
+from app.streaming import sse
+from app.telemetry import count
+from app.tool_cache import tool_cache
+from app.versioning import get_data_version
 
 router = APIRouter(tags=["AI Querying"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Disable proxy buffering so events reach the client as they are produced
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
 
 @router.get("/query", summary="Ask a financial question (AI-powered)")
-def query_endpoint(
+async def query_endpoint(
     q: str = Query(
         ...,
         description=(
@@ -26,7 +34,14 @@ def query_endpoint(
             "- `Forecast revenue for the next 3 months`"
         ),
     ),
-    db: Session = Depends(get_db),
+    cache: bool = Query(
+        True,
+        description="Serve a cached report for an equivalent question on the same data (default: true).",
+    ),
+    timings: bool = Query(
+        False,
+        description="Add a `timings` breakdown (milliseconds per stage) to the response.",
+    ),
 ):
     """
     Use this endpoint to query financial data **in natural language**.
@@ -36,12 +51,267 @@ def query_endpoint(
     2. Optionally apply forecasting or analysis tools.
     3. Return a clear, narrative insight **plus** structured results.
 
+    Common questions (totals, monthly trends, top or fastest-growing
+    categories, period comparisons) are answered directly from the monthly
+    rollups without the LLM; those responses carry an `"intent"` field.
+    Anything else, or a question the router is unsure about, goes to the agent.
+
+    Equivalent questions (same wording up to case, spacing, number and
+    period spelling) asked on unchanged data are answered from the cache
+    with `"cached": true`; pass `cache=false` to force a fresh agent run.
+
+    With `timings=true` the response also has a `timings` object: time spent
+    in agent setup, each LLM round-trip (`llm_ms`, `llm_count`), tool calls
+    (`sql_query_ms`, `forecast_arima_ms`, ...), ARIMA fits and logging,
+    plus the end-to-end `total_ms` (including any queueing).
+
+    Concurrent identical questions share one agent run. When all agent
+    slots and the queue are busy the endpoint answers `429` with a
+    `Retry-After` header, and `504` if the request misses its deadline.
+
     **Response format:**
     ```json
     {
       "question": "Forecast revenue for the next 3 months",
       "report": "# Revenue Forecast Report ...",
+      "cached": false
     }
     ```
     """
-    return query_agent(q, db)
+    start = time.perf_counter()
+    version = await run_in_threadpool(get_data_version)
+    if cache:
+        hit = answer_cache.lookup(q, version)
+        if hit is not None:
+            await run_in_threadpool(log_query, q, "", "answer_cache", {}, hit["report"], version)
+            result = dict(hit)
+            if timings:
+                result["timings"] = {}
+            return _with_total(result, start)
+
+    try:
+        result = await query_executor.run(q, version)
+    except Saturated as e:
+        count("query_rejected")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        count("query_deadline_exceeded")
+        raise HTTPException(status_code=504, detail=str(e))
+    if not timings:
+        result.pop("timings", None)
+        return result
+    return _with_total(result, start)
+
+
+def _with_total(result: dict, start: float) -> dict:
+    if "timings" in result:
+        result["timings"] = {**result["timings"], "total_ms": round((time.perf_counter() - start) * 1000, 2)}
+    return result
+
+
+@router.get("/query/stream", summary="Ask a financial question, streaming progress (SSE)")
+async def query_stream_endpoint(
+    q: str = Query(..., description="A natural language financial question."),
+    cache: bool = Query(True, description="Serve a cached report for an equivalent question on the same data."),
+):
+    """
+    Same as `/query`, but answers with a **Server-Sent Events** stream so a
+    dashboard can show progress immediately instead of waiting for the
+    whole agent run.
+
+    Events, in order (each `data:` is JSON):
+    - `start`: `{"question", "data_version"}` — sent right away
+    - `tool_start` / `tool`: tool name and input (the SQL for `sql_query`);
+      `tool` adds `duration_ms`, `rows` and `error` when the call returns
+    - `token`: `{"text"}` — report fragments as the model generates them
+    - `done`: `{"question", "report", "cached", "elapsed_ms"}`
+    - `error`: `{"detail"}`
+
+    The finished run is logged to `query_logs` like `/query`. Returns `429`
+    with `Retry-After` when all agent slots and the queue are busy.
+
+    **Example:**
+    ```bash
+    curl -N "http://localhost:8000/query/stream?q=What%20was%20the%20total%20profit%20in%20Q1%3F"
+    ```
+    """
+    start = time.perf_counter()
+    version = await run_in_threadpool(get_data_version)
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - start) * 1000, 2)
+
+    hit = answer_cache.lookup(q, version) if cache else None
+    if hit is not None:
+        await run_in_threadpool(log_query, q, "", "answer_cache", {}, hit["report"], version)
+
+        async def replay():
+            yield sse("start", {"question": q, "data_version": version})
+            yield sse("token", {"text": hit["report"]})
+            yield sse("done", {**hit, "elapsed_ms": elapsed_ms()})
+
+        return StreamingResponse(replay(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    try:
+        # Reject up front so saturation is a plain 429 rather than an error event
+        query_executor.check_capacity()
+    except Saturated as e:
+        count("query_rejected")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    async def body():
+        yield sse("start", {"question": q, "data_version": version})
+        try:
+            async for event, data in query_executor.stream(q, version):
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event == "done":
+                    yield sse("done", {**data, "cached": False, "elapsed_ms": elapsed_ms()})
+                else:
+                    yield sse(event, data)
+        except Saturated as e:
+            yield sse("error", {"detail": str(e), "retry_after": e.retry_after})
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+class BatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUESTIONS, description="Questions to answer.")
+    cache: bool = Field(True, description="Serve cached reports for equivalent questions on the same data.")
+
+
+@router.post("/query/batch", status_code=202, summary="Submit many questions as a background job")
+async def query_batch(request: BatchRequest):
+    """
+    Queue a **batch of questions** (up to `BATCH_MAX_QUESTIONS`) as one job
+    and return at once with its `id`. The questions run concurrently on a
+    dedicated worker pool (`BATCH_WORKERS`) sharing the agent runtime with
+    `/query`, so a month-end batch never takes the interactive slots. Each
+    answer goes through the answer cache and intent router like `/query`
+    and is logged to `query_logs`.
+
+    Jobs are stored in the tenant's database: questions left unfinished by
+    a crash or restart are taken over once their lease expires. Poll
+    `/query/jobs/{id}` for progress and the answers so far. Returns `429`
+    when more than `BATCH_MAX_PENDING` questions would be pending, with a
+    `Retry-After` estimated from the backlog and the workers' recent pace.
+
+    **Example:**
+    ```bash
+    curl -X POST http://localhost:8000/query/batch -H "Content-Type: application/json" \
+      -d '{"questions": ["What was the total profit in Q1?", "Show me revenue trends for 2024"]}'
+    ```
+
+    **Response:**
+    ```json
+    {"id": "3f0c9a4e5d6b4f1c9e2a7b8c0d1e2f3a", "status": "queued", "total": 2, "queued": 2,
+     "running": 0, "done": 0, "failed": 0, "progress": 0.0, "cache": true,
+     "created_at": "2025-08-01 09:30:12.123456", "started_at": null, "finished_at": null}
+    ```
+    """
+    questions = [q.strip() for q in request.questions]
+    if not all(questions):
+        raise HTTPException(status_code=400, detail="Questions must not be empty")
+    try:
+        return await run_in_threadpool(batch_runner.submit, questions, request.cache)
+    except BatchFull as e:
+        count("batch_rejected")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+@router.get("/query/jobs", summary="Recent batch jobs")
+def query_jobs(limit: int = Query(20, ge=1, le=200, description="Number of jobs, newest first.")):
+    """
+    List the most recent **batch jobs** with their progress counters (no
+    answers; see `/query/jobs/{id}`).
+
+    **Example:**
+    ```bash
+    curl "http://localhost:8000/query/jobs?limit=5"
+    ```
+    """
+    return list_jobs(limit)
+
+
+@router.get("/query/jobs/{job_id}", summary="Progress and answers of a batch job")
+def query_job(
+    job_id: str,
+    items: bool = Query(True, description="Include the questions with their answers so far."),
+    status: Optional[str] = Query(
+        None, pattern="^(queued|running|done|failed)$", description="Only questions in this state."
+    ),
+):
+    """
+    Return a batch job's **progress** (`queued` / `running` / `done` /
+    `failed` counts and `progress` from 0 to 1) and, under `items`, every
+    question in submission order with its report as soon as it is answered.
+    The job's `status` becomes `done` once every question has finished,
+    successfully or not.
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/query/jobs/3f0c9a4e5d6b4f1c9e2a7b8c0d1e2f3a
+    curl "http://localhost:8000/query/jobs/3f0c9a4e5d6b4f1c9e2a7b8c0d1e2f3a?status=failed"
+    ```
+
+    **Response:**
+    ```json
+    {"id": "3f0c9a4e5d6b4f1c9e2a7b8c0d1e2f3a", "status": "running", "total": 2, "queued": 0,
+     "running": 1, "done": 1, "failed": 0, "progress": 0.5, "cache": true,
+     "created_at": "2025-08-01 09:30:12.123456", "started_at": "2025-08-01 09:30:12.130001", "finished_at": null,
+     "items": [
+       {"position": 0, "question": "What was the total profit in Q1?", "status": "done",
+        "report": "## Total Profit — Q1 2025 ...", "error": null, "cached": false, "intent": "total",
+        "attempts": 1, "elapsed_ms": 12.4, "started_at": "...", "finished_at": "..."},
+       {"position": 1, "question": "Show me revenue trends for 2024", "status": "running", "report": null, ...}
+     ]}
+    ```
+    """
+    job = get_job(job_id, include_items=items, status=status)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.get("/query/cache", summary="Answer and tool result cache statistics")
+def query_cache_stats():
+    """
+    Return size and **hit/miss counters** of the `/query` answer cache, and
+    under `tools` the memory use, evictions and per-tool hit rates of the
+    agent's tool result cache.
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/query/cache
+    ```
+    """
+    return {**answer_cache.stats(), "tools": tool_cache.stats()}
+
+
+@router.get("/query/load", summary="Agent concurrency statistics")
+def query_load_stats():
+    """
+    Return the state of the agent admission control: running/queued
+    executions, coalesced requests, `429` rejections and deadline misses.
+    `batch` has the batch job worker pool's pending and finished questions.
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/query/load
+    ```
+    """
+    return {**query_executor.stats(), "batch": batch_runner.stats()}
+
+
+@router.get("/query/intents", summary="Intent router statistics")
+def query_intent_stats():
+    """
+    Return the **hit rate** of the deterministic intent router (questions
+    answered without the agent), overall and per intent.
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/query/intents
+    ```
+    """
+    return intent_router.stats()
@@ -0,0 +1,92 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.db import InvalidTenant, UnknownTenant
+from app.rollups import GROUP_COLUMNS
+from app.tenancy import cross_tenant_totals, tenant_summary
+
+router = APIRouter(tags=["Tenants"])
+
+
+@router.get("/tenants", summary="List tenant databases")
+def list_tenant_shards():
+    """
+    List every **tenant** (company) with a database, with its data version
+    and transaction count, read from all shards in parallel. `engines`
+    shows which shards currently have open connection pools (at most
+    `TENANT_MAX_ENGINES`, least recently used closed first).
+
+    Every other endpoint serves one tenant: pass `X-Tenant-ID: <tenant>` or
+    `?tenant=<tenant>` (the default tenant otherwise); a tenant without a
+    database is a `404`. Only ingestion creates a tenant's database:
+    `python -m scripts.load_data --tenant <tenant>`.
+
+    **Example:**
+    ```bash
+    curl http://localhost:8000/tenants
+    ```
+
+    **Response:**
+    ```json
+    {
+      "current": "default",
+      "tenants": [
+        {"tenant": "acme", "data_version": 1, "transactions": 1840},
+        {"tenant": "default", "data_version": 3, "transactions": 4523}
+      ],
+      "failed": {},
+      "engines": {"open": ["default", "acme"], "max_open": 16, "opened": 2, "evictions": 0}
+    }
+    ```
+    """
+    return tenant_summary()
+
+
+@router.get("/tenants/aggregate", summary="Totals across all tenants")
+def aggregate_tenants(
+    group_by: str = Query(
+        "type",
+        description="Comma-separated grouping columns: any of `category`, `source`, `type` (empty for a grand total).",
+    ),
+    type: Optional[str] = Query(None, description="Transaction type filter (`revenue`, `expense` or `profit`)."),
+    source: Optional[str] = Query(None, description="Optional source filter (`quickbooks` or `rootfi`)."),
+    category: Optional[str] = Query(None, description="Optional category filter."),
+    year: Optional[int] = Query(None, ge=1900, le=2999, description="Only months of this calendar year."),
+    tenants: Optional[str] = Query(None, description="Comma-separated tenants to include (all tenants by default)."),
+):
+    """
+    **Fan-out aggregate**: the same rollup query runs on every tenant's
+    database in parallel (`TENANT_FANOUT_WORKERS`), and groups with the
+    same key are summed. Each group keeps a per-tenant breakdown; a shard
+    that fails is reported under `failed` instead of failing the request.
+
+    **Example:**
+    ```bash
+    curl "http://localhost:8000/tenants/aggregate?group_by=type&year=2024"
+    curl "http://localhost:8000/tenants/aggregate?group_by=category&type=expense&tenants=acme,globex"
+    ```
+
+    **Response:**
+    ```json
+    {
+      "group_by": ["type"],
+      "tenants": ["acme", "default"],
+      "failed": {},
+      "groups": [
+        {"key": {"type": "revenue"}, "total": 5120433.1, "transactions": 3120,
+         "by_tenant": {"acme": 1200400.0, "default": 3920033.1}}
+      ]
+    }
+    ```
+    """
+    columns = [c.strip() for c in group_by.split(",") if c.strip()]
+    if set(columns) - set(GROUP_COLUMNS):
+        raise HTTPException(status_code=400, detail=f"group_by must be a subset of {', '.join(GROUP_COLUMNS)}")
+    selected = [t.strip() for t in tenants.split(",") if t.strip()] if tenants else None
+
+    try:
+        return cross_tenant_totals(columns, type=type, source=source, category=category, year=year, tenants=selected)
+    except InvalidTenant as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownTenant as e:
+        raise HTTPException(status_code=404, detail=str(e))
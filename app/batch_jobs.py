@@ -0,0 +1,380 @@
+"""
+Batch question jobs behind `POST /query/batch`.
+
+Jobs and their questions are stored in the tenant's database and answered
+on a dedicated worker pool, one row at a time, so `GET /query/jobs/{id}`
+shows progress. Unfinished questions are leased to their runner; expired
+leases are taken over by any runner (see the README).
+"""
+import os
+import math
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.answer_cache import answer_cache
+from app.db import current_tenant, engine, get_read_engine, in_current_context, list_tenants, use_tenant
+from app.llm import log_query, query_agent
+from app.logger import logger
+from app.models import QueryJob, QueryJobItem
+from app.telemetry import count
+from app.versioning import get_data_version
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "200"))
+BATCH_MAX_PENDING = int(os.getenv("BATCH_MAX_PENDING", "1000"))
+BATCH_LEASE_SECONDS = float(os.getenv("BATCH_LEASE_SECONDS", "30"))
+
+UNFINISHED = ("queued", "running")
+
+_jobs = QueryJob.__table__
+_items = QueryJobItem.__table__
+
+
+class BatchFull(Exception):
+    """Accepting the job would exceed `BATCH_MAX_PENDING` queued questions."""
+
+    def __init__(self, pending: int, limit: int, retry_after: int):
+        super().__init__(f"{pending} batch questions are already pending (limit {limit}); retry in {retry_after}s")
+        self.pending = pending
+        self.retry_after = retry_after
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _answer(question: str, use_cache: bool) -> dict:
+    """Answer one question the way `/query` does."""
+    version = get_data_version()
+    hit = answer_cache.lookup(question, version) if use_cache else None
+    if hit is not None:
+        log_query(question, "", "answer_cache", {}, hit["report"], version)
+        return {"report": hit["report"], "cached": True}
+
+    result = query_agent(question)
+    if "report" in result:
+        answer_cache.store(question, result["report"], version)
+        result["cached"] = False
+    return result
+
+
+class BatchRunner:
+    def __init__(self, workers: int = BATCH_WORKERS, max_pending: int = BATCH_MAX_PENDING, lease: float = BATCH_LEASE_SECONDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lease = lease
+        self.owner = uuid.uuid4().hex  # lease holder id of this runner
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._held: Dict[str, int] = {}  # tenant -> questions this runner holds there
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._avg_run = 5.0  # EWMA of question run time (seconds), seeded by the first run
+        self.answered = 0
+        self.failed = 0
+        self.resumed = 0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-query")
+            return self._pool
+
+    def _hold(self, n: int):
+        """Count `n` more questions held in the current tenant (caller holds the lock)."""
+        self._pending += n
+        tenant = current_tenant()
+        self._held[tenant] = self._held.get(tenant, 0) + n
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+            tenant = current_tenant()
+            self._held[tenant] -= 1
+            if not self._held[tenant]:
+                del self._held[tenant]
+
+    def _retry_after(self, questions: int) -> int:
+        """Seconds until enough pending questions have finished for `questions` more to fit."""
+        backlog = self._pending + questions - self.max_pending
+        return max(1, math.ceil(self._avg_run * backlog / self.workers))
+
+    def _enqueue(self, job_id: str, position: int, question: str, use_cache: bool):
+        self._get_pool().submit(in_current_context(self._run), job_id, position, question, use_cache)
+
+    def submit(self, questions: List[str], use_cache: bool = True) -> dict:
+        """Persist a job for `questions` (in the current tenant) and queue them; returns the job."""
+        with self._lock:
+            if self._pending + len(questions) > self.max_pending:
+                raise BatchFull(self._pending, self.max_pending, self._retry_after(len(questions)))
+            self._hold(len(questions))
+
+        job_id, now = uuid.uuid4().hex, _now()
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    insert(_jobs).values(id=job_id, status="queued", total=len(questions), use_cache=use_cache, created_at=now)
+                )
+                conn.execute(
+                    insert(_items),
+                    [
+                        {"job_id": job_id, "position": i, "question": q, "status": "queued", "owner": self.owner, "heartbeat_at": now}
+                        for i, q in enumerate(questions)
+                    ],
+                )
+        except Exception:
+            with self._lock:
+                self._hold(-len(questions))
+            raise
+
+        for position, question in enumerate(questions):
+            self._enqueue(job_id, position, question, use_cache)
+        count("batch_job")
+        logger.info("Batch job %s queued with %d questions", job_id, len(questions))
+        return get_job(job_id, include_items=False)
+
+    def _run(self, job_id: str, position: int, question: str, use_cache: bool):
+        try:
+            self._execute(job_id, position, question, use_cache)
+        except Exception as e:
+            logger.error("Batch job %s question %d failed: %s", job_id, position, str(e))
+            try:
+                self._finish(job_id, position, {"status": "failed", "error": str(e)})
+            except Exception as record_error:
+                logger.warning("Could not record the failure of batch job %s question %d: %s", job_id, position, str(record_error))
+        finally:
+            self._release()
+
+    def _execute(self, job_id: str, position: int, question: str, use_cache: bool):
+        started = _now()
+        item = (_items.c.job_id == job_id) & (_items.c.position == position)
+        with engine.begin() as conn:
+            claimed = conn.execute(
+                update(_items)
+                .where(item, _items.c.status == "queued", _items.c.owner == self.owner)
+                .values(status="running", started_at=started, heartbeat_at=started, attempts=_items.c.attempts + 1)
+            ).rowcount
+            if not claimed:
+                return  # already answered, or our lease expired and another runner took it over
+            conn.execute(
+                update(_jobs).where(_jobs.c.id == job_id, _jobs.c.status == "queued").values(status="running", started_at=started)
+            )
+
+        start = time.perf_counter()
+        result = _answer(question, use_cache)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._avg_run = elapsed if not (self.answered or self.failed) else 0.8 * self._avg_run + 0.2 * elapsed
+        values = {"elapsed_ms": round(elapsed * 1000, 2)}
+        if "report" in result:
+            values.update(status="done", report=result["report"], cached=result["cached"], intent=result.get("intent"))
+        else:
+            values.update(status="failed", error=result.get("error", "unknown error"))
+        self._finish(job_id, position, values)
+
+    def _finish(self, job_id: str, position: int, values: dict):
+        """Store one question's outcome; the job is done once nothing is left unfinished."""
+        finished = _now()
+        with engine.begin() as conn:
+            recorded = conn.execute(
+                update(_items)
+                .where(_items.c.job_id == job_id, _items.c.position == position, _items.c.owner == self.owner)
+                .values(**values, finished_at=finished)
+            ).rowcount
+            if not recorded:
+                logger.warning("Batch job %s question %d was taken over by another runner; dropping this answer", job_id, position)
+                return
+            remaining = conn.execute(
+                select(func.count()).select_from(_items).where(_items.c.job_id == job_id, _items.c.status.in_(UNFINISHED))
+            ).scalar()
+            if not remaining:
+                conn.execute(update(_jobs).where(_jobs.c.id == job_id).values(status="done", finished_at=finished))
+        with self._lock:
+            if values["status"] == "done":
+                self.answered += 1
+            else:
+                self.failed += 1
+        count("batch_question", status=values["status"])
+        if not remaining:
+            logger.info("Batch job %s finished", job_id)
+
+    def resume(self) -> int:
+        """Take over and queue the unfinished questions whose lease expired (any tenant); returns how many."""
+        resumed = 0
+        for tenant in list_tenants():
+            try:
+                with use_tenant(tenant):
+                    resumed += self._resume_tenant()
+            except Exception as e:
+                logger.warning("Could not resume batch jobs of %s: %s", tenant, str(e))
+        if resumed:
+            logger.info("Resumed %d unfinished batch questions", resumed)
+        return resumed
+
+    def _resume_tenant(self) -> int:
+        now = _now()
+        expired = now - timedelta(seconds=self.lease)
+        with engine.begin() as conn:
+            stale = conn.execute(
+                select(_items.c.job_id, _items.c.position, _items.c.question, _items.c.owner, _items.c.heartbeat_at, _jobs.c.use_cache)
+                .join(_jobs, _jobs.c.id == _items.c.job_id)
+                .where(
+                    _items.c.status.in_(UNFINISHED),
+                    _items.c.owner.is_distinct_from(self.owner),
+                    _items.c.heartbeat_at.is_(None) | (_items.c.heartbeat_at < expired),
+                )
+                .order_by(_jobs.c.created_at, _items.c.job_id, _items.c.position)
+            ).fetchall()
+            rows = []
+            for job_id, position, question, owner, heartbeat_at, use_cache in stale:
+                # Only if nobody renewed or took it since the select; a question
+                # interrupted mid-run is run again from the start
+                taken = conn.execute(
+                    update(_items)
+                    .where(
+                        _items.c.job_id == job_id,
+                        _items.c.position == position,
+                        _items.c.status.in_(UNFINISHED),
+                        _items.c.owner.is_not_distinct_from(owner),
+                        _items.c.heartbeat_at.is_not_distinct_from(heartbeat_at),
+                    )
+                    .values(status="queued", owner=self.owner, heartbeat_at=now)
+                ).rowcount
+                if taken:
+                    rows.append((job_id, position, question, use_cache))
+        with self._lock:
+            # Admitted by their original runner; the pending limit does not apply
+            self._hold(len(rows))
+            self.resumed += len(rows)
+        for job_id, position, question, use_cache in rows:
+            self._enqueue(job_id, position, question, use_cache)
+        return len(rows)
+
+    def heartbeat(self) -> int:
+        """Renew the lease on every question this runner holds; returns how many."""
+        with self._lock:
+            tenants = list(self._held)
+        renewed, now = 0, _now()
+        for tenant in tenants:
+            try:
+                with use_tenant(tenant), engine.begin() as conn:
+                    renewed += conn.execute(
+                        update(_items)
+                        .where(_items.c.owner == self.owner, _items.c.status.in_(UNFINISHED))
+                        .values(heartbeat_at=now)
+                    ).rowcount
+            except Exception as e:
+                logger.warning("Could not renew batch leases in %s: %s", tenant, str(e))
+        return renewed
+
+    def _maintain(self):
+        next_sweep = 0.0
+        while True:
+            self.heartbeat()
+            if time.monotonic() >= next_sweep:
+                self.resume()
+                next_sweep = time.monotonic() + self.lease
+            if self._stop.wait(self.lease / 3):
+                return
+
+    def start(self):
+        """Renew leases and take over expired ones (now and every `lease` seconds) on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._maintain, name="batch-lease", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "answered": self.answered,
+                "failed": self.failed,
+                "resumed": self.resumed,
+                "avg_run_seconds": round(self._avg_run, 3),
+                "owner": self.owner,
+                "lease_seconds": self.lease,
+            }
+
+    def shutdown(self):
+        """
+        Stop without waiting; unfinished questions stay in the database and
+        are taken over once their lease expires (by this process after a
+        restart, or by any other runner).
+        """
+        self._stop.set()
+        with self._lock:
+            pool, self._pool = self._pool, None
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _job_dict(job, counts: dict) -> dict:
+    finished = counts.get("done", 0) + counts.get("failed", 0)
+    return {
+        "id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "progress": round(finished / job.total, 4) if job.total else 1.0,
+        "cache": job.use_cache,
+        "created_at": str(job.created_at) if job.created_at else None,
+        "started_at": str(job.started_at) if job.started_at else None,
+        "finished_at": str(job.finished_at) if job.finished_at else None,
+    }
+
+
+def get_job(job_id: str, include_items: bool = True, status: Optional[str] = None) -> Optional[dict]:
+    """A job of the current tenant with per-status counts and, optionally, its questions so far."""
+    with Session(get_read_engine()) as session:
+        job = session.get(QueryJob, job_id)
+        if job is None:
+            return None
+        counts = dict(
+            session.execute(
+                select(QueryJobItem.status, func.count()).where(QueryJobItem.job_id == job_id).group_by(QueryJobItem.status)
+            ).all()
+        )
+        result = _job_dict(job, counts)
+        if include_items:
+            stmt = select(QueryJobItem).where(QueryJobItem.job_id == job_id).order_by(QueryJobItem.position)
+            if status is not None:
+                stmt = stmt.where(QueryJobItem.status == status)
+            result["items"] = [item.as_dict() for item in session.scalars(stmt)]
+        return result
+
+
+def list_jobs(limit: int = 20) -> List[dict]:
+    """The current tenant's most recent jobs, newest first, without their questions."""
+    with Session(get_read_engine()) as session:
+        jobs = session.scalars(select(QueryJob).order_by(QueryJob.created_at.desc(), QueryJob.id).limit(limit)).all()
+        counts = {}
+        if jobs:
+            rows = session.execute(
+                select(QueryJobItem.job_id, QueryJobItem.status, func.count())
+                .where(QueryJobItem.job_id.in_([job.id for job in jobs]))
+                .group_by(QueryJobItem.job_id, QueryJobItem.status)
+            ).all()
+            for job_id, status, n in rows:
+                counts.setdefault(job_id, {})[status] = n
+        return [_job_dict(job, counts.get(job.id, {})) for job in jobs]
+
+
+batch_runner = BatchRunner()
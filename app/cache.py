@@ -0,0 +1,179 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries also expire after `ttl`
+    seconds (`ttl=None` disables expiry). Tracks hit/miss/eviction counters.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                stored_at, value = item
+                if self.ttl is None or self._clock() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> list:
+        """Snapshot of live (key, value) pairs, oldest first; does not touch LRU order."""
+        with self._lock:
+            now = self._clock()
+            return [
+                (key, value)
+                for key, (stored_at, value) in self._data.items()
+                if self.ttl is None or now - stored_at < self.ttl
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches `predicate`; returns how many."""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class SizedCache:
+    """
+    Thread-safe cache bounded by a byte budget with GreedyDual-Size
+    eviction: each entry is worth `clock + cost / size` (cost = seconds it
+    took to compute, size = estimated bytes), refreshed on every hit, and
+    the least valuable entry is evicted first. Cheap, large results go
+    before expensive, small ones; the rising clock ages out entries that
+    are no longer used. Values larger than `max_entry_bytes` are not stored.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be a positive integer")
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes
+        self._data: "dict[Hashable, list]" = {}  # key -> [priority, size, cost, value]
+        self._heap: list = []  # (priority, seq, key); stale tuples are skipped on pop
+        self._seq = 0
+        self._clock = 0.0
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def _push(self, key: Hashable, entry: list):
+        entry[0] = self._clock + entry[2] / entry[1]
+        self._seq += 1
+        heapq.heappush(self._heap, (entry[0], self._seq, key))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._push(key, entry)
+            return entry[3]
+
+    def put(self, key: Hashable, value: Any, size: int, cost: float = 0.0) -> bool:
+        """Store `value`; returns False when it is too large to be cached."""
+        size = max(1, size)
+        with self._lock:
+            if size > self.max_entry_bytes:
+                self.rejected += 1
+                return False
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            entry = [0.0, size, max(cost, 1e-6), value]
+            self._data[key] = entry
+            self.bytes += size
+            self._push(key, entry)
+            while self.bytes > self.max_bytes and self._heap:
+                priority, _, victim = heapq.heappop(self._heap)
+                current = self._data.get(victim)
+                if current is None or current[0] != priority:
+                    continue
+                del self._data[victim]
+                self.bytes -= current[1]
+                self._clock = priority
+                self.evictions += 1
+            if len(self._heap) > 4 * len(self._data) + 64:
+                self._heap = [(e[0], i, k) for i, (k, e) in enumerate(self._data.items())]
+                heapq.heapify(self._heap)
+            return key in self._data
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._heap.clear()
+            self.bytes = 0
+            self._clock = 0.0
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches `predicate`; returns how many."""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                self.bytes -= self._data.pop(key)[1]  # its heap tuples are skipped as stale
+            return len(doomed)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "rejected_too_large": self.rejected,
+            }
@@ -0,0 +1,88 @@
+"""
+LangChain callback handlers for agent runs. Kept apart from `app.llm` and
+`app.streaming` so LangChain is only imported once an agent actually runs.
+"""
+import time
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.streaming import logged_result
+from app.telemetry import record
+
+
+def _tool_input(input_str: str, inputs: Optional[dict]) -> Any:
+    if inputs and len(inputs) == 1 and "sql" in inputs:
+        return inputs["sql"]
+    return inputs if inputs else input_str
+
+
+class StreamEventHandler(BaseCallbackHandler):
+    """Forward agent progress to `emit(event, data)`; safe to call from any thread."""
+
+    def __init__(self, emit: Callable[[str, dict], None]):
+        self.emit = emit
+        self._started: Dict[UUID, tuple] = {}
+        self.tool: Optional[str] = None
+        self.sql: Optional[str] = None
+        self.result: dict = {}
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, inputs: Optional[dict] = None, **kwargs: Any):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        tool_input = _tool_input(input_str, inputs)
+        self._started[run_id] = (name, tool_input, time.perf_counter())
+        self.emit("tool_start", {"tool": name, "input": tool_input})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, output=output)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, error=str(error))
+
+    def _finish_tool(self, run_id: UUID, output: Any = None, error: Optional[str] = None):
+        name, tool_input, start = self._started.pop(run_id, ("tool", None, time.perf_counter()))
+        event = {
+            "tool": name,
+            "input": tool_input,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        if isinstance(output, list):
+            event["rows"] = len(output)
+        if error:
+            event["error"] = error
+        self.emit("tool", event)
+
+        self.tool = name
+        if name == "sql_query" and isinstance(tool_input, str):
+            self.sql = tool_input
+        self.result = {"error": error} if error else logged_result(output)
+
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        # Function-call turns stream empty content deltas; only report text is forwarded
+        if token:
+            self.emit("token", {"text": token})
+
+
+class LLMTimingHandler(BaseCallbackHandler):
+    """Records every chat-model round-trip of an agent run as an `llm` span."""
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID):
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            record("llm", time.perf_counter() - start)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
@@ -1,14 +1,320 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+"""
+Database engines, routed per tenant.
 
-DATABASE_URL = "sqlite:///./financial.db"
+Every company (tenant) has its own SQLite database: the default tenant
+keeps `./financial.db`, any other tenant `TENANT_DB_DIR/<tenant>.db`.
+Only ingestion (`init_db`) creates a tenant's database; routing to a
+tenant without one raises `UnknownTenant`, so a request can never leave an
+empty shard behind. Shards are migrated when first opened by a process.
+The current tenant lives in a context
+variable (set per request by `TenantMiddleware`, or with `use_tenant`),
+and `engine` / `read_engine` resolve to that tenant's writer and
+read-only pool on every call, so code written against a single database
+works unchanged.
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+At most `TENANT_MAX_ENGINES` tenants have engines open at once; the least
+recently used one is disposed when another is opened. `fan_out` runs a
+function against several shards in parallel for cross-tenant aggregates.
+"""
+import os
+import re
+import glob
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+
+DATABASE_URL = "sqlite:///./financial.db"  # default tenant
+
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANT_DB_DIR = os.getenv("TENANT_DB_DIR", "./tenants")
+TENANT_MAX_ENGINES = int(os.getenv("TENANT_MAX_ENGINES", "16"))
+TENANT_FANOUT_WORKERS = int(os.getenv("TENANT_FANOUT_WORKERS", "8"))
+TENANT_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+# Connection tuning, applied to every new SQLite connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # safe with WAL; FULL for fsync per commit
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", "8"))
 
 Base = declarative_base()
 
+_tenant: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+class InvalidTenant(ValueError):
+    """The tenant id is not a valid shard name."""
+
+
+class UnknownTenant(LookupError):
+    """No database exists for the tenant (ingestion creates it)."""
+
+    def __init__(self, tenant: str):
+        super().__init__(f"Unknown tenant {tenant!r}: load its data with `python -m scripts.load_data --tenant {tenant}`")
+        self.tenant = tenant
+
+
+def validate_tenant(tenant: str) -> str:
+    if not TENANT_ID_RE.match(tenant or ""):
+        raise InvalidTenant(
+            f"Invalid tenant id {tenant!r}: use 1-63 lowercase letters, digits, '-' or '_'"
+        )
+    return tenant
+
+
+def current_tenant() -> str:
+    return _tenant.get()
+
+
+@contextmanager
+def use_tenant(tenant: str) -> Iterator[str]:
+    """Route every database access in this context to `tenant`'s shard."""
+    token = _tenant.set(validate_tenant(tenant))
+    try:
+        yield tenant
+    finally:
+        _tenant.reset(token)
+
+
+def in_current_context(fn: Callable) -> Callable:
+    """Bind `fn` to the caller's context (tenant included), e.g. before handing it to an executor."""
+    context = copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def tenant_path(tenant: str) -> str:
+    return os.path.join(TENANT_DB_DIR, validate_tenant(tenant) + ".db")
+
+
+def tenant_url(tenant: str) -> str:
+    if tenant == DEFAULT_TENANT:
+        return DATABASE_URL
+    return f"sqlite:///{tenant_path(tenant)}"
+
+
+def tenant_exists(tenant: str) -> bool:
+    """Whether `tenant` has a database (the default tenant always does)."""
+    return tenant == DEFAULT_TENANT or os.path.exists(tenant_path(tenant))
+
+
+def list_tenants() -> List[str]:
+    """Tenants with a database on disk (the default tenant always)."""
+    tenants = {DEFAULT_TENANT}
+    for path in glob.glob(os.path.join(TENANT_DB_DIR, "*.db")):
+        name = os.path.basename(path)[:-3]
+        if TENANT_ID_RE.match(name):
+            tenants.add(name)
+    return sorted(tenants)
+
+
+def _apply_pragmas(dbapi_conn, *, read_only: bool):
+    cursor = dbapi_conn.cursor()
+    if not read_only:
+        # Persistent in the file; readers inherit it
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+class Shard:
+    """One tenant's writer engine and read-only pool."""
+
+    def __init__(self, tenant: str):
+        self.tenant = tenant
+        url = tenant_url(tenant)
+        if tenant != DEFAULT_TENANT:
+            os.makedirs(TENANT_DB_DIR, exist_ok=True)
+        self.writer = create_engine(url, connect_args={"check_same_thread": False})
+        # Read-only pool for tools, forecasting and plots. With WAL, readers see
+        # the last committed snapshot and never block (or wait for) the writer.
+        self.reader = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            pool_size=READ_POOL_SIZE,
+            max_overflow=READ_POOL_SIZE,
+        )
+        event.listen(self.writer, "connect", lambda conn, _record: _apply_pragmas(conn, read_only=False))
+        event.listen(self.reader, "connect", lambda conn, _record: _apply_pragmas(conn, read_only=True))
+        self.ready = False
+        self.init_lock = threading.Lock()
+
+    def _initialize(self):
+        from app.migrations import run_migrations
+
+        Base.metadata.create_all(bind=self.writer)
+        with self.writer.begin() as conn:
+            run_migrations(conn)
+        self.ready = True
+
+    def initialize(self):
+        """Create missing tables and apply pending migrations."""
+        with self.init_lock:
+            self._initialize()
+
+    def ensure_ready(self):
+        if not self.ready:
+            with self.init_lock:
+                if not self.ready:
+                    self._initialize()
+
+    def dispose(self):
+        self.writer.dispose()
+        self.reader.dispose()
+
+
+class ShardRouter:
+    """Bounded LRU of open shards; a shard is migrated when this process first opens it."""
+
+    def __init__(self, max_open: int = TENANT_MAX_ENGINES):
+        self.max_open = max(1, max_open)
+        self._open: "OrderedDict[str, Shard]" = OrderedDict()
+        self._migrated = set()  # tenants whose schema is current; reopening skips migrations
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evictions = 0
+
+    def get(self, tenant: str, create: bool = False) -> Shard:
+        """The tenant's shard; without `create`, raises `UnknownTenant` if it has no database yet."""
+        evicted = []
+        with self._lock:
+            shard = self._open.get(tenant)
+            if shard is not None:
+                self._open.move_to_end(tenant)
+            else:
+                if not create and not tenant_exists(tenant):
+                    raise UnknownTenant(tenant)
+                shard = self._open[tenant] = Shard(tenant)
+                shard.ready = tenant in self._migrated
+                self.opened += 1
+                while len(self._open) > self.max_open:
+                    evicted.append(self._open.popitem(last=False)[1])
+                    self.evictions += 1
+        for old in evicted:
+            # Checked-out connections stay usable; the pools are closed as they come back
+            old.dispose()
+        if not shard.ready:
+            shard.ensure_ready()
+            with self._lock:
+                self._migrated.add(tenant)
+        return shard
+
+    def open_tenants(self) -> List[str]:
+        with self._lock:
+            return list(self._open)
+
+    def dispose_all(self):
+        with self._lock:
+            shards, self._open = list(self._open.values()), OrderedDict()
+        for shard in shards:
+            shard.dispose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": list(self._open),
+                "max_open": self.max_open,
+                "opened": self.opened,
+                "evictions": self.evictions,
+            }
+
+
+shards = ShardRouter()
+
+
+def get_engine() -> Engine:
+    """Writer engine of the current tenant."""
+    return shards.get(current_tenant()).writer
+
+
+def get_read_engine() -> Engine:
+    """Read-only engine of the current tenant."""
+    return shards.get(current_tenant()).reader
+
+
+class _TenantEngine:
+    """Module-level stand-in that forwards to the current tenant's engine on every use."""
+
+    def __init__(self, resolve: Callable[[], Engine]):
+        self._resolve = resolve
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __repr__(self):
+        return f"<tenant-routed {self._resolve()!r}>"
+
+
+engine = _TenantEngine(get_engine)
+read_engine = _TenantEngine(get_read_engine)
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+def SessionLocal() -> Session:
+    """ORM session on the current tenant's database."""
+    return _session_factory(bind=get_engine())
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """Create (if needed) and migrate the current tenant's database; other shards are migrated lazily."""
+    shards.get(current_tenant(), create=True).initialize()
+
+
+def check_db() -> bool:
+    """Validate a prebuilt database at boot: warn (but keep serving) if no data was loaded."""
+    from app.logger import logger
+
+    with read_engine.connect() as conn:
+        loaded = conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM transactions)").scalar()
+    if not loaded:
+        logger.warning("Database has no transactions; run `python -m scripts.load_data`")
+    return bool(loaded)
+
+
+def fan_out(
+    fn: Callable[[], Any],
+    tenants: Optional[Sequence[str]] = None,
+    workers: int = TENANT_FANOUT_WORKERS,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Run `fn` once per tenant (every tenant on disk by default), in parallel,
+    each call routed to its tenant's shard. Returns `(results, errors)`
+    keyed by tenant; one failing shard does not fail the others. Raises
+    `UnknownTenant` up front if an explicitly listed tenant has no database.
+    """
+    tenants = list_tenants() if tenants is None else [validate_tenant(t) for t in tenants]
+    for tenant in tenants:
+        if not tenant_exists(tenant):
+            raise UnknownTenant(tenant)
+
+    def run(tenant: str):
+        with use_tenant(tenant):
+            return fn()
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    if not tenants:
+        return results, errors
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tenants))), thread_name_prefix="fan-out") as pool:
+        futures = {tenant: pool.submit(copy_context().run, run, tenant) for tenant in tenants}
+        for tenant, future in futures.items():
+            try:
+                results[tenant] = future.result()
+            except Exception as e:
+                errors[tenant] = str(e)
+    return results, errors
@@ -0,0 +1,108 @@
+"""
+Offline stand-in for `ChatOpenAI`, selected with `LLM_PROVIDER=fake`.
+
+It drives the OpenAI-functions agent deterministically: the first turn
+calls a tool that fits the question, the next turn turns the tool output
+into a short Markdown report. Optional latency makes it usable for load
+and concurrency testing without network access or API keys. With
+`streaming=True` the report is emitted token by token through the
+callback manager, like `ChatOpenAI(streaming=True)`.
+"""
+import json
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, FunctionMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_SQL = (
+    "SELECT type, SUM(total_amount) AS total, SUM(row_count) AS transactions "
+    "FROM monthly_rollups GROUP BY type ORDER BY type"
+)
+
+
+class FakeFinancialChatModel(BaseChatModel):
+    """Deterministic chat model that exercises the agent's tools offline."""
+
+    latency: float = 0.0
+    """Seconds to sleep per model call, to simulate a remote LLM."""
+
+    token_delay: float = 0.0
+    """Seconds to sleep between streamed tokens."""
+
+    streaming: bool = False
+    """Emit the response through `_stream` so callbacks see each token."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-financial"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.streaming:
+            return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._respond(messages, kwargs.get("functions") or [])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._respond(messages, kwargs.get("functions") or [])
+        if message.additional_kwargs:
+            # Function calls arrive as one chunk; only report text is tokenized
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", additional_kwargs=message.additional_kwargs))
+            return
+
+        for i, token in enumerate(re.findall(r"\s*\S+", message.content)):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _respond(self, messages: List[BaseMessage], functions: List[dict]) -> AIMessage:
+        question = next(
+            (m.content for m in reversed(messages) if isinstance(m, HumanMessage)), ""
+        )
+        last = messages[-1] if messages else None
+        if isinstance(last, FunctionMessage) or not functions:
+            observation = last.content if isinstance(last, FunctionMessage) else ""
+            tool = last.name if isinstance(last, FunctionMessage) else None
+            return AIMessage(content=self._report(question, tool, observation))
+
+        available = {f.get("name") for f in functions}
+        if "forecast" in question.lower() and "forecast_arima" in available:
+            name, args = "forecast_arima", {"horizon": 3, "target": "revenue"}
+        else:
+            name, args = "sql_query", {"sql": DEFAULT_SQL}
+        return AIMessage(
+            content="",
+            additional_kwargs={"function_call": {"name": name, "arguments": json.dumps(args)}},
+        )
+
+    @staticmethod
+    def _report(question: str, tool: Optional[str], observation: str) -> str:
+        lines = ["## Financial Report", "", f"- Question: {question}"]
+        if tool:
+            lines.append(f"- Source: `{tool}` (offline fake model)")
+        if observation:
+            snippet = observation if len(observation) <= 500 else observation[:500] + "..."
+            lines += ["", "### Data", "", snippet]
+        return "\n".join(lines)
@@ -0,0 +1,49 @@
+"""
+Process-pool worker for batch forecasting.
+
+Kept free of app imports (DB, logging, FastAPI) so spawned workers start
+quickly and only pay for numpy/pandas/statsmodels.
+"""
+import warnings
+from typing import Sequence, Tuple
+
+
+def fit_series(job: Tuple[Sequence[float], str, int, Tuple[int, int, int]]) -> dict:
+    """
+    Fit one monthly series and forecast it. Errors are returned rather than
+    raised so one bad series never fails the whole batch.
+    """
+    import pandas as pd
+    from statsmodels.tsa.arima.model import ARIMA  # imported here so the app can import this module cheaply
+
+    values, start, horizon, order = job
+    try:
+        series = pd.Series(values, index=pd.date_range(start=start, periods=len(values), freq="M"), dtype=float)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fitted = ARIMA(series, order=order).fit()
+            forecast = fitted.forecast(steps=horizon)
+        return {"forecast": [round(float(v), 2) for v in forecast], "aic": round(float(fitted.aic), 2)}
+    except Exception as e:
+        return {"error": f"ARIMA failed: {str(e)}"}
+
+
+def fit_candidate(job: Tuple[Sequence[float], str, Tuple[int, int, int], Tuple[int, int, int, int], int]) -> dict:
+    """
+    Fit one candidate order for model selection; returns its AIC and
+    parameters (or an error) so the winner can be restored without refitting.
+    """
+    import pandas as pd
+    from statsmodels.tsa.arima.model import ARIMA
+
+    values, start, order, seasonal_order, maxiter = job
+    result = {"order": list(order), "seasonal_order": list(seasonal_order)}
+    try:
+        series = pd.Series(values, index=pd.date_range(start=start, periods=len(values), freq="M"), dtype=float)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fitted = ARIMA(series, order=order, seasonal_order=seasonal_order).fit(method_kwargs={"maxiter": maxiter})
+        result.update(aic=float(fitted.aic), params=[float(v) for v in fitted.params])
+    except Exception as e:
+        result["error"] = str(e)
+    return result
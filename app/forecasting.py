@@ -0,0 +1,238 @@
+"""
+Forecasting service shared by the `forecast_arima` tool and `/plot/forecast`.
+
+Fitted ARIMA results are cached by (series fingerprint, order), so any
+horizon can be served from one fit. The cache is a bounded LRU with a TTL;
+when a tenant's data version changes, that tenant's selected-model fits are
+dropped (fixed-order fits are keyed by the values and stay valid).
+
+Without an explicit order, series identified by a `series_key` get an
+automatically selected model (`app.model_selection`), searched in
+parallel on the process pool and persisted for later fits.
+
+Batch forecasts over many series are fitted in parallel on a process pool.
+"""
+import os
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
+
+from app.cache import TTLCache
+from app.db import current_tenant
+from app import model_selection
+from app.forecast_worker import fit_candidate, fit_series
+from app.logger import logger
+from app.rollups import monthly_frame
+from app.telemetry import span
+from app.versioning import get_data_version
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_ORDER = (1, 1, 1)
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "128"))
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "3600"))
+
+_fits = TTLCache(FORECAST_CACHE_SIZE, FORECAST_CACHE_TTL)
+_version_lock = threading.Lock()
+_seen_versions: Dict[str, int] = {}  # tenant -> data version last seen
+_invalidations = 0
+
+
+def series_fingerprint(series: "pd.Series") -> str:
+    """Stable digest of a series' index and values."""
+    import pandas as pd
+
+    hashed = pd.util.hash_pandas_object(series.astype(float), index=True)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def _is_tenant_fit(key, tenant: str) -> bool:
+    """Selected-model fits belong to one tenant; fixed-order fits depend on the values alone."""
+    model = key[1]
+    return model[0] == "auto" and model[1] == tenant
+
+
+def _check_data_version():
+    """Drop the tenant's selected-model fits once ingestion has changed its data."""
+    global _invalidations
+    tenant, version = current_tenant(), get_data_version()
+    with _version_lock:
+        seen = _seen_versions.get(tenant)
+        if version != seen:
+            if seen is not None:
+                _fits.discard_where(lambda key: _is_tenant_fit(key, tenant))
+                _invalidations += 1
+                logger.info("Forecast cache invalidated (%s data version %s -> %s)", tenant, seen, version)
+            _seen_versions[tenant] = version
+
+
+def fit_arima(
+    series: "pd.Series",
+    order: Optional[Tuple[int, int, int]] = None,
+    series_key: Optional[str] = None,
+):
+    """
+    Return a fitted ARIMA result for `series`, reusing a cached fit when
+    possible. With no `order`, a series with a `series_key` (e.g.
+    `"revenue|quickbooks|"`) uses its selected model; others use `DEFAULT_ORDER`.
+    """
+    _check_data_version()
+    auto = order is None and series_key is not None and model_selection.ARIMA_AUTO
+    order = tuple(order or DEFAULT_ORDER)
+    # Fixed-order fits depend on the values alone; selected models are per tenant
+    key = (series_fingerprint(series), ("auto", current_tenant(), series_key) if auto else order)
+    fitted = _fits.get(key)
+    if fitted is None:
+        if auto:
+            fitted = model_selection.fit_auto(series_key, series, _map_candidates, DEFAULT_ORDER)
+        else:
+            from statsmodels.tsa.arima.model import ARIMA  # ~1s import, paid on the first fit or by prewarm()
+
+            with span("arima_fit"):
+                fitted = ARIMA(series, order=order).fit()
+        _fits.put(key, fitted)
+    return fitted
+
+
+def forecast(
+    series: "pd.Series",
+    horizon: int,
+    order: Optional[Tuple[int, int, int]] = None,
+    series_key: Optional[str] = None,
+) -> "pd.Series":
+    """Forecast `horizon` steps ahead; any horizon is served from the same fit."""
+    return fit_arima(series, order, series_key).forecast(steps=horizon)
+
+
+def describe_model(fitted) -> str:
+    """e.g. `ARIMA(2,1,0)` or `ARIMA(1,1,1)(1,0,0)[12]`."""
+    text = "ARIMA({},{},{})".format(*fitted.model.order)
+    seasonal = fitted.model.seasonal_order
+    if any(seasonal[:3]):
+        text += "({},{},{})[{}]".format(*seasonal)
+    return text
+
+
+def prewarm():
+    """Import the model code ahead of the first fit (runs in the background after startup)."""
+    import statsmodels.tsa.arima.model  # noqa: F401
+
+
+def cache_stats() -> dict:
+    stats = _fits.stats()
+    stats["invalidations"] = _invalidations
+    stats["data_version"] = _seen_versions.get(current_tenant())
+    return stats
+
+
+def clear_cache():
+    _fits.clear()
+
+
+# --- Batch forecasting ---
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(min(4, os.cpu_count() or 1))))
+MIN_HISTORY = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Lazily start the shared process pool (spawned, so safe to use from server threads)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=FORECAST_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _map_candidates(jobs: list) -> list:
+    """Fit model-selection candidates on the pool (in-process if it is unavailable)."""
+    try:
+        return list(_get_pool().map(fit_candidate, jobs))
+    except BrokenProcessPool as e:
+        shutdown_pool()
+        logger.error("Forecast pool crashed during model selection: %s", str(e))
+        return [fit_candidate(job) for job in jobs]
+
+
+def batch_forecast(
+    group_by: Sequence[str],
+    horizon: int,
+    type: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    order: Tuple[int, int, int] = DEFAULT_ORDER,
+) -> dict:
+    """
+    Forecast every monthly series of a grouping (e.g. each expense category
+    per source). Series are built in one pass over the rollups and fitted
+    in parallel on the process pool; failures are reported per series.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = monthly_frame(group_by, type=type, source=source, category=category)
+    periods = []
+    if not frame.empty:
+        periods = [
+            p.strftime("%Y-%m")
+            for p in pd.date_range(frame.index[-1] + pd.offsets.MonthEnd(), periods=horizon, freq="M")
+        ]
+    result = {
+        "group_by": list(group_by),
+        "filters": {"type": type, "source": source, "category": category},
+        "horizon": horizon,
+        "order": list(order),
+        "periods": periods,
+        "series": [],
+        "failed": 0,
+    }
+    if frame.empty:
+        return result
+
+    values = frame.to_numpy(dtype=float)
+    jobs, entries = [], []
+    for col_idx, key in enumerate(frame.columns):
+        column = values[:, col_idx]
+        nonzero = np.flatnonzero(column)
+        entry = {"key": dict(zip(group_by, key))}
+        entries.append(entry)
+        if len(nonzero) == 0 or len(column) - nonzero[0] < MIN_HISTORY:
+            entry["error"] = f"Insufficient history (need at least {MIN_HISTORY} months)"
+            continue
+        start = frame.index[nonzero[0]].strftime("%Y-%m-%d")
+        history = column[nonzero[0]:]
+        entry["last"] = round(float(history[-1]), 2)
+        jobs.append((entry, (history.tolist(), start, horizon, tuple(order))))
+
+    if jobs:
+        chunksize = max(1, len(jobs) // (FORECAST_WORKERS * 4))
+        try:
+            with span("arima_fit_batch"):
+                fits = _get_pool().map(fit_series, [job for _, job in jobs], chunksize=chunksize)
+                for (entry, _), fit in zip(jobs, fits):
+                    entry.update(fit)
+        except BrokenProcessPool as e:
+            shutdown_pool()
+            logger.error("Forecast pool crashed: %s", str(e))
+            for entry, _ in jobs:
+                entry.setdefault("error", "Forecast worker crashed")
+
+    result["series"] = entries
+    result["failed"] = sum(1 for e in entries if "error" in e)
+    return result
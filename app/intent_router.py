@@ -0,0 +1,548 @@
+"""
+Deterministic fast path for common questions, in front of the agent.
+
+A small token grammar turns the normalized question into an intent
+(`total`, `trend`, `top_category`, `category_increase`, `compare`) and
+its slots, answered by parameterized SQL over `monthly_rollups`. Any
+question it does not fully understand goes to the agent (see the README).
+"""
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.answer_cache import normalize_question
+from app.db import current_tenant, read_engine
+from app.logger import logger
+from app.telemetry import count
+from app.versioning import get_data_version
+
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") == "1"
+TOP_N = 5  # rows in category rankings unless the question asks for N
+TOP_N_MAX = 50
+
+METRICS = {
+    "revenue": "revenue", "revenues": "revenue", "income": "revenue", "sales": "revenue", "earned": "revenue",
+    "expense": "expense", "expenses": "expense", "cost": "expense", "costs": "expense",
+    "spend": "expense", "spending": "expense", "spent": "expense",
+    "profit": "profit", "profits": "profit", "earnings": "profit",
+}
+SOURCES = {"quickbooks": "quickbooks", "qb": "quickbooks", "rootfi": "rootfi"}
+COMPARE_WORDS = {"compare", "comparison", "vs", "versus", "against"}
+TREND_WORDS = {"trend", "trends", "monthly", "evolution", "over", "time", "month", "by", "per", "each"}
+TOP_WORDS = {"top", "highest", "largest", "biggest", "most", "which", "leading"}
+CATEGORY_WORDS = {"category", "categories", "account", "accounts", "line", "item", "items"}
+INCREASE_WORDS = {"increase", "increased", "increases", "growth", "grew", "rise", "rose", "jump", "jumped"}
+# Words that never change the meaning of a supported question
+NEUTRAL_WORDS = {
+    "total", "sum", "how", "much", "did", "do", "we", "have", "had", "get", "make", "made", "overall",
+    "net", "amount", "from", "source", "data", "of", "and", "to", "with", "on", "at", "all",
+    "performance", "figures", "numbers", "report", "summary", "which", "has", "biggest", "company",
+}
+# Consumed by `_periods` only when they form a period ("this year", "last quarter")
+PERIOD_WORDS = {"this", "current", "last", "previous", "ytd", "year", "quarter"}
+# Questions mentioning these always need the agent
+AGENT_WORDS = {"forecast", "predict", "prediction", "projection", "project", "next", "will", "why", "explain", "average", "margin", "ratio"}
+# Words the grammar cannot express; answering without them would flip the question's meaning
+NEGATION_WORDS = {
+    "not", "no", "non", "never", "nor", "neither", "except", "excluding", "exclude", "excludes", "excluded",
+    "without", "other", "others", "besides", "minus", "but", "outside", "apart", "only",
+    "don", "doesn", "didn", "isn", "wasn", "aren", "weren", "hasn", "haven", "hadn",
+}
+ORDERING_WORDS = {
+    "lowest", "least", "bottom", "smallest", "fewest", "minimum", "min", "worst", "weakest", "lower", "less",
+    "fewer", "decrease", "decreased", "decreases", "decline", "declined", "drop", "dropped", "fall", "fell",
+    "shrink", "shrank", "reduction", "reduced",
+}
+RELATIVE_WORDS = {
+    "after", "before", "since", "until", "till", "prior", "following", "preceding", "earlier", "later",
+    "than", "above", "below", "under", "beyond", "exceed", "exceeded", "exceeding",
+}
+LOSS_WORDS = {"lose", "loses", "losing", "lost", "loss", "losses"}
+
+YEAR_RE = re.compile(r"^(19|20)\d\d$")
+QUARTER_RE = re.compile(r"^q([1-4])$")
+HALF_RE = re.compile(r"^h([12])$")
+MONTH_RE = re.compile(r"^m(0[1-9]|1[0-2])$")
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+TOTALS_SQL = text(
+    "SELECT type, SUM(total_amount) AS total, SUM(row_count) AS n FROM monthly_rollups "
+    "WHERE year_month BETWEEN :start AND :end "
+    "AND (:source IS NULL OR source = :source) AND (:category IS NULL OR category = :category) "
+    "GROUP BY type"
+)
+MONTHLY_SQL = text(
+    "SELECT year_month, type, SUM(total_amount) AS total FROM monthly_rollups "
+    "WHERE year_month BETWEEN :start AND :end "
+    "AND (:source IS NULL OR source = :source) AND (:category IS NULL OR category = :category) "
+    "GROUP BY year_month, type ORDER BY year_month"
+)
+TOP_CATEGORIES_SQL = text(
+    "SELECT category, SUM(total_amount) AS total FROM monthly_rollups "
+    "WHERE type = :type AND year_month BETWEEN :start AND :end AND (:source IS NULL OR source = :source) "
+    "GROUP BY category ORDER BY total DESC LIMIT :limit"
+)
+CATEGORY_INCREASE_SQL = text(
+    "SELECT category, "
+    "SUM(CASE WHEN year_month BETWEEN :start AND :end THEN total_amount ELSE 0 END) AS current, "
+    "SUM(CASE WHEN year_month BETWEEN :prev_start AND :prev_end THEN total_amount ELSE 0 END) AS previous "
+    "FROM monthly_rollups "
+    "WHERE type = :type AND (year_month BETWEEN :start AND :end OR year_month BETWEEN :prev_start AND :prev_end) "
+    "AND (:source IS NULL OR source = :source) "
+    "GROUP BY category ORDER BY current - previous DESC LIMIT :limit"
+)
+BOUNDS_SQL = text("SELECT MIN(year_month), MAX(year_month) FROM monthly_rollups")
+CATEGORIES_SQL = text("SELECT DISTINCT category FROM monthly_rollups")
+
+
+@dataclass
+class Period:
+    label: str
+    start: int  # YYYYMM, inclusive
+    end: int
+
+    def shifted_year(self, years: int) -> "Period":
+        label = re.sub(r"\d{4}", lambda m: str(int(m.group()) + years), self.label)
+        return Period(label, self.start + 100 * years, self.end + 100 * years)
+
+    def clipped(self, last: int) -> "Period":
+        """Limit to data up to `last` (e.g. the current, partial year)."""
+        if self.start <= last < self.end:
+            return Period(f"{self.label} (through {_month_label(last)})", self.start, last)
+        return self
+
+
+@dataclass
+class Parsed:
+    intent: Optional[str]
+    confidence: float
+    metrics: List[str] = field(default_factory=list)
+    periods: List[Period] = field(default_factory=list)
+    source: Optional[str] = None
+    category: Optional[str] = None
+    limit: int = TOP_N
+    reason: Optional[str] = None
+
+
+def _month_label(ym: int) -> str:
+    return f"{MONTH_NAMES[ym % 100 - 1]} {ym // 100}"
+
+
+def _quarter(q: int, year: int) -> Period:
+    return Period(f"Q{q} {year}", year * 100 + 3 * q - 2, year * 100 + 3 * q)
+
+
+def _half(h: int, year: int) -> Period:
+    return Period(f"H{h} {year}", year * 100 + 6 * h - 5, year * 100 + 6 * h)
+
+
+def _month(m: int, year: int) -> Period:
+    return Period(_month_label(year * 100 + m), year * 100 + m, year * 100 + m)
+
+
+def _year(year: int) -> Period:
+    return Period(str(year), year * 100 + 1, year * 100 + 12)
+
+
+def _money(value: float) -> str:
+    return f"-${-value:,.2f}" if value < 0 else f"${value:,.2f}"
+
+
+def _pct(current: float, previous: float) -> str:
+    if not previous:
+        return "n/a"
+    return f"{100 * (current - previous) / abs(previous):+.1f}%"
+
+
+class IntentRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # tenant -> (data version, (first, last) year_month, normalized category -> name)
+        self._tenants: Dict[str, Tuple[int, Tuple[int, int], Dict[str, str]]] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses = 0
+
+    # --- data-dependent vocabulary, refreshed per tenant and data version ---
+    def _tenant_state(self) -> Tuple[Optional[int], Tuple[int, int], Dict[str, str]]:
+        return self._tenants.get(current_tenant(), (None, (0, 0), {}))
+
+    @property
+    def _bounds(self) -> Tuple[int, int]:
+        return self._tenant_state()[1]
+
+    @property
+    def _categories(self) -> Dict[str, str]:
+        return self._tenant_state()[2]
+
+    def _refresh(self, version: int):
+        with self._lock:
+            if version == self._tenant_state()[0]:
+                return
+            with read_engine.connect() as conn:
+                low, high = conn.execute(BOUNDS_SQL).one()
+                names = [r[0] for r in conn.execute(CATEGORIES_SQL) if r[0]]
+            categories = {}
+            for name in names:
+                key = normalize_question(name)
+                # Category names that are just a metric word ("Revenue") would hijack generic questions
+                if key and not set(key.split()) <= set(METRICS) | CATEGORY_WORDS:
+                    categories.setdefault(key, name)
+            self._tenants[current_tenant()] = (version, (low or 0, high or 0), categories)
+
+    # --- parsing ---
+    def _periods(self, tokens: List[str], used: set) -> List[Period]:
+        """Periods in question order; year-less quarters/months take an explicit year or the latest with data."""
+        last = self._bounds[1]
+        latest_year = last // 100
+        explicit_years = [int(t) for t in tokens if YEAR_RE.match(t)]
+        periods: List[Period] = []
+        pending: List[Tuple[int, str, int]] = []  # (index in periods, kind, number) awaiting a year
+
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else ""
+            unit = None
+            match = QUARTER_RE.match(token) or HALF_RE.match(token) or MONTH_RE.match(token)
+            if match:
+                kind, number = token[0], int(match.group(1))
+                if YEAR_RE.match(nxt):
+                    year = int(nxt)
+                    used.update((i, i + 1))
+                    periods.append({"q": _quarter, "h": _half, "m": _month}[kind](number, year))
+                    i += 2
+                    continue
+                used.add(i)
+                pending.append((len(periods), kind, number))
+                periods.append(None)
+            elif YEAR_RE.match(token):
+                used.add(i)
+                periods.append(_year(int(token)).clipped(last))
+            elif token in ("this", "current", "last", "previous", "ytd"):
+                if token == "ytd":
+                    used.add(i)
+                    periods.append(_year(latest_year).clipped(last))
+                    i += 1
+                    continue
+                if nxt in ("year", "quarter"):
+                    unit, offset = nxt, (0 if token in ("this", "current") else -1)
+                if unit == "year":
+                    used.update((i, i + 1))
+                    periods.append(_year(latest_year + offset).clipped(last))
+                    i += 2
+                    continue
+                if unit == "quarter":
+                    used.update((i, i + 1))
+                    q = (last % 100 - 1) // 3 + 1 + offset
+                    year = latest_year
+                    if q == 0:
+                        q, year = 4, year - 1
+                    periods.append(_quarter(q, year).clipped(last))
+                    i += 2
+                    continue
+            i += 1
+
+        for idx, kind, number in pending:
+            if explicit_years:
+                year = explicit_years[-1]
+            else:
+                year = latest_year
+                start = {"q": 3 * number - 2, "h": 6 * number - 5, "m": number}[kind]
+                if year * 100 + start > last:
+                    year -= 1  # that period has not happened yet in the latest year
+            periods[idx] = {"q": _quarter, "h": _half, "m": _month}[kind](number, year).clipped(last)
+        return periods
+
+    def _category(self, text_: str) -> Tuple[Optional[str], set]:
+        best = None
+        for key, name in self._categories.items():
+            if re.search(rf"(?<![a-z0-9]){re.escape(key)}(?![a-z0-9])", text_) and (best is None or len(key) > len(best[0])):
+                best = (key, name)
+        if best is None:
+            return None, set()
+        return best[1], set(best[0].split())
+
+    def parse(self, question: str) -> Parsed:
+        normalized = normalize_question(question)
+        tokens = normalized.split()
+        if not tokens:
+            return Parsed(None, 0.0, reason="empty")
+        blocked = (AGENT_WORDS | NEGATION_WORDS | ORDERING_WORDS | RELATIVE_WORDS | LOSS_WORDS) & set(tokens)
+        if blocked:
+            return Parsed(None, 0.0, reason="needs agent: " + ", ".join(sorted(blocked)))
+
+        used: set = set()
+        periods = self._periods(tokens, used)
+        category, category_tokens = self._category(normalized)
+        metrics = list(dict.fromkeys(METRICS[t] for t in tokens if t in METRICS))
+        source = next((SOURCES[t] for t in tokens if t in SOURCES), None)
+        words = set(tokens)
+        limit = self._limit(tokens, used)
+
+        # Only an explicit compare word: "profit in Q1 and Q2" may ask for the combined total
+        if words & COMPARE_WORDS:
+            intent = "compare"
+        elif words & TOP_WORDS and words & CATEGORY_WORDS:
+            intent = "category_increase" if words & INCREASE_WORDS else "top_category"
+        elif words & {"trend", "trends", "monthly", "evolution"} or {"over", "time"} <= words or {"by", "month"} <= words:
+            intent = "trend"
+        elif metrics:
+            intent = "total"
+        else:
+            intent = None
+
+        vocabulary = (set(METRICS) | set(SOURCES) | NEUTRAL_WORDS | category_tokens | {"q"}) - PERIOD_WORDS
+        vocabulary |= {
+            "compare": COMPARE_WORDS | {"and", "between"},
+            "trend": TREND_WORDS | {"show", "growth"},
+            "top_category": TOP_WORDS | CATEGORY_WORDS,
+            "category_increase": TOP_WORDS | CATEGORY_WORDS | INCREASE_WORDS,
+            "total": set(),
+            None: set(),
+        }[intent]
+        unexplained = [t for i, t in enumerate(tokens) if i not in used and t not in vocabulary]
+        confidence = 1 - len(unexplained) / len(tokens)
+        parsed = Parsed(intent, confidence, metrics, periods, source, category, limit or TOP_N)
+
+        if intent is None:
+            parsed.reason = "no intent"
+        elif unexplained:
+            parsed.reason = "unrecognized: " + ", ".join(dict.fromkeys(unexplained))
+        elif "between" in words and not words & COMPARE_WORDS:
+            parsed.reason = "period range"  # "between Q1 and Q3" is a range, not a comparison
+        elif limit is not None and (intent not in ("top_category", "category_increase") or not 1 <= limit <= TOP_N_MAX):
+            parsed.reason = f"unsupported count {limit}"
+        elif intent == "compare" and len(periods) != 2:
+            parsed.reason = "compare needs exactly two periods"
+        elif intent in ("top_category", "category_increase") and metrics not in (["revenue"], ["expense"]):
+            parsed.reason = "category ranking needs revenue or expense"
+        elif intent in ("total", "trend", "top_category", "category_increase") and len(periods) > 1:
+            parsed.reason = "more than one period"
+        return parsed
+
+    @staticmethod
+    def _limit(tokens: List[str], used: set) -> Optional[int]:
+        """N in "top N" / "N largest"; other numbers stay unexplained."""
+        for i, token in enumerate(tokens):
+            if token.isdigit() and i not in used:
+                neighbours = tokens[max(0, i - 1):i] + tokens[i + 1:i + 2]
+                if set(neighbours) & TOP_WORDS:
+                    used.add(i)
+                    return int(token)
+        return None
+
+    # --- answering ---
+    def _params(self, period: Optional[Period], parsed: Parsed) -> dict:
+        first, last = self._bounds
+        return {
+            "start": period.start if period else first,
+            "end": period.end if period else last,
+            "source": parsed.source,
+            "category": parsed.category,
+        }
+
+    def _scope(self, parsed: Parsed) -> str:
+        parts = []
+        if parsed.source:
+            parts.append({"quickbooks": "QuickBooks", "rootfi": "RootFi"}[parsed.source])
+        if parsed.category:
+            parts.append(f"category **{parsed.category}**")
+        return ", ".join(parts) if parts else "all sources"
+
+    def _totals(self, conn, period: Optional[Period], parsed: Parsed) -> Dict[str, float]:
+        rows = conn.execute(TOTALS_SQL, self._params(period, parsed)).fetchall()
+        totals = {r.type: r.total or 0.0 for r in rows}
+        totals["transactions"] = sum(r.n or 0 for r in rows)
+        totals["revenue"] = totals.get("revenue", 0.0)
+        totals["expense"] = totals.get("expense", 0.0)
+        totals["profit"] = totals["revenue"] - totals["expense"]
+        return totals
+
+    def _answer_total(self, conn, parsed: Parsed):
+        period = parsed.periods[0] if parsed.periods else None
+        label = period.label if period else "all periods"
+        totals = self._totals(conn, period, parsed)
+        metric = parsed.metrics[0] if len(parsed.metrics) == 1 else None
+        lines = [f"## {'Total ' + metric.title() if metric else 'Totals'} — {label}", ""]
+        if not totals["transactions"]:
+            lines.append(f"- No transactions recorded for {label} ({self._scope(parsed)}).")
+        else:
+            for m in parsed.metrics or ("revenue", "expense", "profit"):
+                value = totals[m]
+                if m == "profit":
+                    lines.append(
+                        f"- **Profit:** {_money(value)} (revenue {_money(totals['revenue'])} "
+                        f"minus expenses {_money(totals['expense'])})"
+                    )
+                else:
+                    lines.append(f"- **{m.title()}:** {_money(value)}")
+            if totals["revenue"] and (not metric or metric == "profit"):
+                lines.append(f"- Profit margin: {100 * totals['profit'] / totals['revenue']:.1f}%")
+            lines.append(f"- Scope: {self._scope(parsed)}, {totals['transactions']:,} transactions")
+        return lines, TOTALS_SQL, self._params(period, parsed), totals
+
+    def _answer_trend(self, conn, parsed: Parsed):
+        last = self._bounds[1]
+        period = parsed.periods[0] if parsed.periods else _year(last // 100).clipped(last)
+        params = self._params(period, parsed)
+        months: Dict[int, Dict[str, float]] = {}
+        for r in conn.execute(MONTHLY_SQL, params):
+            months.setdefault(r.year_month, {"revenue": 0.0, "expense": 0.0})[r.type] = r.total or 0.0
+        for values in months.values():
+            values["profit"] = values.get("revenue", 0.0) - values.get("expense", 0.0)
+        metrics = parsed.metrics or ["revenue", "expense", "profit"]
+        title = " & ".join(m.title() for m in metrics)
+        lines = [f"## {title} Trend — {period.label}", ""]
+        if not months:
+            lines.append(f"- No transactions recorded for {period.label} ({self._scope(parsed)}).")
+            return lines, MONTHLY_SQL, params, {}
+
+        ordered = sorted(months)
+        for m in metrics:
+            series = [months[ym].get(m, 0.0) for ym in ordered]
+            best = max(range(len(series)), key=series.__getitem__)
+            worst = min(range(len(series)), key=series.__getitem__)
+            lines.append(f"- **{m.title()}:** {_money(sum(series))} over {len(series)} months, "
+                         f"average {_money(sum(series) / len(series))} per month")
+            if len(series) > 1:
+                lines.append(f"  - {_month_label(ordered[0])} to {_month_label(ordered[-1])}: "
+                             f"{_money(series[0])} → {_money(series[-1])} ({_pct(series[-1], series[0])})")
+            lines.append(f"  - Highest: {_month_label(ordered[best])} ({_money(series[best])}); "
+                         f"lowest: {_month_label(ordered[worst])} ({_money(series[worst])})")
+        lines += ["", "| Month | " + " | ".join(m.title() for m in metrics) + " |", "|---" * (len(metrics) + 1) + "|"]
+        for ym in ordered:
+            lines.append(f"| {_month_label(ym)} | " + " | ".join(_money(months[ym].get(m, 0.0)) for m in metrics) + " |")
+        lines += ["", f"- Scope: {self._scope(parsed)}"]
+        return lines, MONTHLY_SQL, params, {_month_label(ym): months[ym] for ym in ordered}
+
+    def _answer_top(self, conn, parsed: Parsed):
+        last = self._bounds[1]
+        metric = parsed.metrics[0]
+        period = parsed.periods[0] if parsed.periods else _year(last // 100).clipped(last)
+        params = {"type": metric, "start": period.start, "end": period.end, "source": parsed.source, "limit": parsed.limit}
+        rows = conn.execute(TOP_CATEGORIES_SQL, params).fetchall()
+        lines = [f"## Top {parsed.limit} {metric.title()} Categories — {period.label}", ""]
+        if not rows:
+            lines.append(f"- No {metric} recorded for {period.label} ({self._scope(parsed)}).")
+            return lines, TOP_CATEGORIES_SQL, params, []
+        total = self._totals(conn, period, Parsed(None, 1.0, source=parsed.source))[metric]
+        lead = rows[0]
+        share = f" ({100 * lead.total / total:.1f}% of all {metric})" if total else ""
+        lines.append(f"- **{lead.category}** had the highest {metric}: {_money(lead.total)}{share}")
+        lines += ["", "| Rank | Category | Total |", "|---|---|---|"]
+        lines += [f"| {i} | {r.category} | {_money(r.total)} |" for i, r in enumerate(rows, start=1)]
+        lines += ["", f"- Scope: {self._scope(parsed)}"]
+        return lines, TOP_CATEGORIES_SQL, params, [{"category": r.category, "total": r.total} for r in rows]
+
+    def _answer_increase(self, conn, parsed: Parsed):
+        last = self._bounds[1]
+        metric = parsed.metrics[0]
+        period = parsed.periods[0] if parsed.periods else _year(last // 100).clipped(last)
+        previous = period.shifted_year(-1)
+        params = {
+            "type": metric, "start": period.start, "end": period.end,
+            "prev_start": previous.start, "prev_end": previous.end, "source": parsed.source, "limit": parsed.limit,
+        }
+        rows = conn.execute(CATEGORY_INCREASE_SQL, params).fetchall()
+        lines = [f"## {metric.title()} Category Increase — {period.label} vs {previous.label}", ""]
+        if not rows or rows[0].current - rows[0].previous <= 0:
+            lines.append(f"- No {metric} category increased in {period.label} compared with {previous.label}.")
+            return lines, CATEGORY_INCREASE_SQL, params, []
+        lead = rows[0]
+        lines.append(f"- **{lead.category}** had the highest increase: {_money(lead.previous)} → "
+                     f"{_money(lead.current)} (+{_money(lead.current - lead.previous)}, {_pct(lead.current, lead.previous)})")
+        lines += ["", f"| Category | {previous.label} | {period.label} | Change |", "|---|---|---|---|"]
+        lines += [
+            f"| {r.category} | {_money(r.previous)} | {_money(r.current)} | {_money(r.current - r.previous)} ({_pct(r.current, r.previous)}) |"
+            for r in rows if r.current - r.previous > 0
+        ]
+        lines += ["", f"- Scope: {self._scope(parsed)}"]
+        result = [{"category": r.category, "previous": r.previous, "current": r.current} for r in rows]
+        return lines, CATEGORY_INCREASE_SQL, params, result
+
+    def _answer_compare(self, conn, parsed: Parsed):
+        first, second = parsed.periods
+        a, b = self._totals(conn, first, parsed), self._totals(conn, second, parsed)
+        metrics = parsed.metrics or ["revenue", "expense", "profit"]
+        lines = [f"## {first.label} vs {second.label}", ""]
+        for m in metrics:
+            change = b[m] - a[m]
+            direction = "up" if change > 0 else "down" if change < 0 else "flat"
+            lines.append(f"- **{m.title()}** {direction}: {_money(a[m])} → {_money(b[m])} ({_pct(b[m], a[m])})")
+        lines += ["", f"| Metric | {first.label} | {second.label} | Change |", "|---|---|---|---|"]
+        lines += [f"| {m.title()} | {_money(a[m])} | {_money(b[m])} | {_money(b[m] - a[m])} |" for m in metrics]
+        lines += ["", f"- Scope: {self._scope(parsed)}"]
+        params = [self._params(first, parsed), self._params(second, parsed)]
+        return lines, TOTALS_SQL, params, {first.label: a, second.label: b}
+
+    def route(self, question: str) -> Optional[dict]:
+        """
+        Answer `question` from a known intent, or return None so the caller
+        runs the agent. The answer has `intent`, `confidence`, `report`,
+        `sql`, `params`, `result` and `data_version`.
+        """
+        if not INTENT_ROUTER:
+            return None
+        version = get_data_version()
+        self._refresh(version)
+        parsed = self.parse(question)
+        if parsed.reason:
+            self._record(question, parsed, hit=False)
+            return None
+
+        handler = {
+            "total": self._answer_total,
+            "trend": self._answer_trend,
+            "top_category": self._answer_top,
+            "category_increase": self._answer_increase,
+            "compare": self._answer_compare,
+        }[parsed.intent]
+        with read_engine.connect() as conn:
+            lines, sql, params, result = handler(conn, parsed)
+        lines += ["", f"_Answered directly from `monthly_rollups` (intent `{parsed.intent}`)._"]
+        self._record(question, parsed, hit=True)
+        return {
+            "intent": parsed.intent,
+            "confidence": round(parsed.confidence, 2),
+            "report": "\n".join(lines),
+            "sql": str(sql),
+            "params": params,
+            "result": result,
+            "data_version": version,
+        }
+
+    def _record(self, question: str, parsed: Parsed, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits[parsed.intent] = self.hits.get(parsed.intent, 0) + 1
+            else:
+                self.misses += 1
+            hits = sum(self.hits.values())
+            rate = hits / (hits + self.misses)
+        if hit:
+            count("intent_hit", intent=parsed.intent)
+            logger.info("INTENT hit intent=%s confidence=%.2f hit_rate=%.1f%% | %s",
+                        parsed.intent, parsed.confidence, 100 * rate, question)
+        else:
+            count("intent_miss")
+            logger.info("INTENT miss reason=%s intent=%s hit_rate=%.1f%% | %s",
+                        parsed.reason, parsed.intent, 100 * rate, question)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(self.hits.values())
+            total = hits + self.misses
+            return {
+                "enabled": INTENT_ROUTER,
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else None,
+                "by_intent": dict(self.hits),
+            }
+
+
+intent_router = IntentRouter()
@@ -1,93 +1,340 @@
 import os
 import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
 from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 
-from langchain_openai import ChatOpenAI
-from langchain.agents import initialize_agent, AgentType
-
-from app.db import engine, SessionLocal
-from app.models import Transaction, QueryLog
+from app.db import TENANT_MAX_ENGINES, current_tenant, get_read_engine
+from app.intent_router import intent_router
+from app.log_writer import query_log_writer
+from app.models import MonthlyRollup, Transaction
 from app.prompts import build_agent_prompt
-from app.tools.sql_tool import sql_query
-from app.tools.forecast_tool import forecast_arima
 from app.logger import logger
+from app.streaming import logged_result
+from app.telemetry import end_trace, span, start_trace
+from app.tool_cache import captured_calls, end_capture, start_capture
+from app.versioning import get_data_version
 
 load_dotenv()
 
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")  # "openai" or "fake" (offline)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
 
 def get_schema() -> str:
-    """Inspect the DB and return schema definition for transactions table."""
-    insp = inspect(engine)
-    cols = insp.get_columns(Transaction.__tablename__)
+    """
+    Inspect the DB and return schema definitions for the tables the agent
+    may query, with per-column notes and the available indexes.
+    """
+    with span("get_schema"):
+        insp = inspect(get_read_engine())
+        return "\n\n".join(_describe_table(insp, model.__table__) for model in (Transaction, MonthlyRollup))
+
+
+def _describe_table(insp, table) -> str:
+    cols = insp.get_columns(table.name)
     col_defs = [f"{c['name']} {c['type']}" for c in cols]
-    return f"{Transaction.__tablename__}({', '.join(col_defs)})"
+    lines = [f"{table.name}({', '.join(col_defs)})"]
 
+    for c in cols:
+        model_col = table.c.get(c["name"])
+        if model_col is not None and model_col.comment:
+            lines.append(f"- {c['name']}: {model_col.comment}")
 
-def log_query(question: str, sql: str, tool: str, result: dict, report: str):
-    """Persist query execution into QueryLog table."""
-    db = SessionLocal()
+    indexes = [
+        f"({', '.join(ix['column_names'])})"
+        for ix in insp.get_indexes(table.name)
+        if len(ix["column_names"]) > 1
+    ]
+    if indexes:
+        lines.append(f"Indexes: {', '.join(indexes)}")
+    return "\n".join(lines)
+
+
+def log_query(question: str, sql: str, tool: str, result: dict, report: str, data_version: Optional[int] = None):
+    """Persist query execution into QueryLog table (batched by the background log writer)."""
     try:
-        entry = QueryLog(
-            question=question,
-            sql=sql,
-            tool=tool,
-            result=json.dumps(result) if result else None,
-            report=report,
+        query_log_writer.submit(
+            {
+                "question": question,
+                "sql": sql,
+                "tool": tool,
+                "result": json.dumps(result, default=str) if result else None,
+                "report": report,
+                "data_version": data_version,
+                "error": bool(report) and report.startswith("ERROR:"),
+            }
         )
-        db.add(entry)
-        db.commit()
     except Exception as e:
         logger.warning("Failed to log query: %s", str(e))
-        db.rollback()
-    finally:
-        db.close()
 
 
-def query_agent(question: str, db: Session):
-    """Main entrypoint: run user question through LLM agent and persist results."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        msg = "OPENAI_API_KEY is missing"
-        logger.error(msg)
-        return {"error": msg}
+class AgentRuntime:
+    """
+    Long-lived agent state shared by every request: one chat model (and its
+    pooled HTTP client), tools bound once, and per tenant a schema string /
+    agent executor that are only rebuilt when that tenant's data version
+    changes (the `TENANT_MAX_ENGINES` most recently used tenants are kept).
+    """
+
+    def __init__(self, llm=None, tools=None):
+        self._http_client = None
+        self._http_async_client = None
+        self.llm = llm if llm is not None else self._build_llm()
+        self.streaming_llm = self._streaming_copy(self.llm)
+        self.tools = tools if tools is not None else self._default_tools()
+        self._lock = threading.Lock()
+        # tenant -> (data version, schema, agent, streaming agent)
+        self._builds: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _default_tools() -> list:
+        from app.tools.forecast_tool import forecast_arima, forecast_batch
+        from app.tools.sql_tool import sql_query
 
-    # Build context-aware system prompt
-    schema = get_schema()
-    system_prompt = build_agent_prompt(schema)
+        return [sql_query, forecast_arima, forecast_batch]
 
-    llm = ChatOpenAI(
-        model="gpt-4o",
-        temperature=0,
-        openai_api_key=api_key,
-    )
+    def _build_llm(self):
+        if LLM_PROVIDER == "fake":
+            from app.fake_llm import FakeFinancialChatModel
 
-    # Register tools available to the agent
-    tools = [sql_query, forecast_arima]
+            return FakeFinancialChatModel(
+                latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+                token_delay=float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0")),
+            )
 
-    agent = initialize_agent(
-        tools=tools,
-        llm=llm,
-        agent=AgentType.OPENAI_FUNCTIONS,
-        verbose=True,
-        agent_kwargs={"system_message": system_prompt},
-    )
+        from langchain_openai import ChatOpenAI  # heavy; only needed for the real provider
 
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY is missing")
+
+        limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+        self._http_client = httpx.Client(limits=limits, timeout=LLM_TIMEOUT)
+        self._http_async_client = httpx.AsyncClient(limits=limits, timeout=LLM_TIMEOUT)
+        return ChatOpenAI(
+            model="gpt-4o",
+            temperature=0,
+            openai_api_key=api_key,
+            http_client=self._http_client,
+            http_async_client=self._http_async_client,
+        )
+
+    @staticmethod
+    def _streaming_copy(llm):
+        """Same model and HTTP clients, but emitting tokens to callbacks as they arrive."""
+        if "streaming" in type(llm).model_fields:
+            return llm.model_copy(update={"streaming": True})
+        return llm
+
+    def _build_agent(self, llm, system_prompt: str):
+        from langchain.agents import AgentType, initialize_agent  # heavy; imported on first build
+        from langchain_core.messages import SystemMessage
+
+        return initialize_agent(
+            tools=self.tools,
+            llm=llm,
+            agent=AgentType.OPENAI_FUNCTIONS,
+            verbose=True,
+            agent_kwargs={"system_message": SystemMessage(content=system_prompt)},
+        )
+
+    def _refresh(self):
+        """Rebuild schema and agent if the tenant's data version moved since the last build."""
+        tenant, version = current_tenant(), get_data_version()
+        with self._lock:
+            build = self._builds.get(tenant)
+            if build is not None and build[0] == version:
+                self._builds.move_to_end(tenant)
+                return build[1:]
+
+            # Build context-aware system prompt
+            schema = get_schema()
+            with span("agent_build"):
+                system_prompt = build_agent_prompt(schema)
+                agent = self._build_agent(self.llm, system_prompt)
+                streaming_agent = self._build_agent(self.streaming_llm, system_prompt)
+            self._builds[tenant] = (version, schema, agent, streaming_agent)
+            self._builds.move_to_end(tenant)
+            while len(self._builds) > TENANT_MAX_ENGINES:
+                self._builds.popitem(last=False)
+            return schema, agent, streaming_agent
+
+    @property
+    def schema(self) -> str:
+        return self._refresh()[0]
+
+    @property
+    def agent(self):
+        return self._refresh()[1]
+
+    @property
+    def streaming_agent(self):
+        """Agent whose chat model streams tokens to the run's callbacks."""
+        return self._refresh()[2]
+
+    @property
+    def version(self) -> Optional[int]:
+        """Data version the current tenant's schema/agent were built for."""
+        build = self._builds.get(current_tenant())
+        return build[0] if build else None
+
+    def close(self):
+        if self._http_client is not None:
+            self._http_client.close()
+        if self._http_async_client is not None:
+            try:
+                asyncio.run(self._http_async_client.aclose())
+            except RuntimeError:
+                pass  # called from inside a running loop; the process is exiting anyway
+
+
+_runtime: Optional[AgentRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AgentRuntime:
+    """Return the process-wide agent runtime, creating it on first use."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime()
+        return _runtime
+
+
+def init_runtime():
+    """Create the runtime and warm its schema/agent at app startup."""
     try:
-        report = agent.run(question)
-        logger.info("QUESTION=%s | REPORT=%s", question, report[:200])
+        get_runtime().agent
+    except Exception as e:
+        # Queries will report the error; the rest of the API keeps working
+        logger.error("Agent runtime not initialized: %s", str(e))
+
+
+def shutdown_runtime():
+    global _runtime
+    with _runtime_lock:
+        if _runtime is not None:
+            _runtime.close()
+            _runtime = None
 
-        # Collect minimal metadata for logging
-        sql = getattr(sql_query, "last_sql", None) or ""
-        result = getattr(sql_query, "last_result", {}) or {}
-        tool_used = "forecast_arima" if "forecast" in question.lower() else "sql_query"
 
-        log_query(question, sql, tool_used, result, report)
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
 
+
+def query_agent(question: str, db: Optional[Session] = None):
+    """
+    Main entrypoint: run user question through LLM agent and persist results.
+
+    Questions the intent router recognizes are answered without the agent
+    (the result then has an `intent`). The result carries a `timings`
+    breakdown (milliseconds per stage: agent setup, each LLM round-trip,
+    tool calls, ARIMA fits, logging).
+    """
+    trace = start_trace()
+    try:
+        result = _route_intent(question) or _run_agent(question)
+    finally:
+        timings = end_trace(trace)
+    logger.info("TIMINGS %s", " ".join(f"{k}={v}" for k, v in timings.items()))
+    return {**result, "timings": timings}
+
+
+def _route_intent(question: str) -> Optional[dict]:
+    """Answer from `intent_router` and log it like an agent run; None falls back to the agent."""
+    try:
+        with span("intent_route"):
+            answer = intent_router.route(question)
+    except Exception as e:
+        logger.warning("Intent router failed, using the agent: %s", str(e))
+        return None
+    if answer is None:
+        return None
+    with span("log"):
+        log_query(
+            question, answer["sql"], f"intent:{answer['intent']}", {"params": answer["params"], "rows": answer["result"]},
+            answer["report"], data_version=answer["data_version"],
+        )
+    return {"question": question, "report": answer["report"], "intent": answer["intent"]}
+
+
+def _run_agent(question: str) -> dict:
+    try:
+        with span("agent_setup"):
+            runtime = get_runtime()
+            agent = runtime.agent
+    except RuntimeError as e:
+        msg = str(e)
+        logger.error(msg)
+        return {"error": msg}
+    except Exception as e:
+        logger.error("Agent setup failed: %s", str(e))
+        return {"error": str(e)}
+
+    from app.callbacks import LLMTimingHandler
+
+    capture = start_capture()
+    try:
+        with span("agent_run"):
+            report = agent.run(question, callbacks=[LLMTimingHandler()])
+        logger.info("QUESTION=%s | REPORT=%s", question, report[:200])
+
+        # Log this run's last tool call (recorded per request, so concurrent runs cannot mix)
+        calls = captured_calls()
+        last = calls[-1] if calls else {"tool": "agent", "sql": None, "result": {}}
+        sql = next((c["sql"] for c in reversed(calls) if c["sql"]), "")
+        tool_used = last["tool"]
+        result = logged_result(last["result"]) if calls else {}
+
+        with span("log"):
+            log_query(question, sql, tool_used, result, report, data_version=runtime.version)
         return {"question": question, "report": report}
     except Exception as e:
         err_msg = f"Agent failed: {str(e)}"
         logger.error(err_msg)
         log_query(question, "", "agent", {}, f"ERROR: {str(e)}")
         return {"error": str(e)}
+    finally:
+        end_capture(capture)
+
+
+def stream_query_agent(question: str, handler) -> dict:
+    """
+    Run `question` on the streaming agent, reporting tool calls and report
+    tokens to `handler` (an `app.streaming.StreamEventHandler`) as they
+    happen, then persist the result like `query_agent`.
+    """
+    routed = _route_intent(question)
+    if routed is not None:
+        handler.on_llm_new_token(routed["report"])
+        return routed
+
+    try:
+        runtime = get_runtime()
+        agent = runtime.streaming_agent
+    except Exception as e:
+        logger.error("Agent setup failed: %s", str(e))
+        return {"error": str(e)}
+
+    from app.callbacks import LLMTimingHandler
+
+    try:
+        start = time.perf_counter()
+        with span("agent_run"):
+            report = agent.run(question, callbacks=[handler, LLMTimingHandler()])
+        logger.info("QUESTION=%s | REPORT=%s | STREAMED in %sms", question, report[:200], _ms(start))
+        log_query(question, handler.sql or "", handler.tool or "agent", handler.result, report, data_version=runtime.version)
+        return {"question": question, "report": report}
+    except Exception as e:
+        logger.error("Agent failed: %s", str(e))
+        log_query(question, handler.sql or "", "agent", {}, f"ERROR: {str(e)}")
+        return {"error": str(e)}
@@ -0,0 +1,95 @@
+"""
+Retention for `query_logs`.
+
+Entries older than `LOG_RETENTION_DAYS` are rolled up into per-day,
+per-tool counts in `query_log_daily` and deleted, in one transaction per
+`LOG_COMPACT_BATCH` rows so the writer lock is never held for long. The
+app runs this every `LOG_COMPACT_INTERVAL` seconds on a daemon thread,
+for every tenant whose database is open; `python -m scripts.compact_logs`
+runs it once.
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.db import engine, shards, use_tenant
+from app.logger import logger
+from app.models import QueryLog, QueryLogDaily
+
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "30"))
+LOG_COMPACT_INTERVAL = float(os.getenv("LOG_COMPACT_INTERVAL", "3600"))
+LOG_COMPACT_BATCH = int(os.getenv("LOG_COMPACT_BATCH", "5000"))
+
+_logs = QueryLog.__tablename__
+_daily = QueryLogDaily.__tablename__
+
+# Candidate ids are chosen once, then aggregated and deleted by the same list
+_ROLLUP_SQL = f"""
+INSERT INTO {_daily} (day, tool, queries, errors)
+SELECT date(created_at), COALESCE(tool, ''), COUNT(*), SUM(error)
+FROM {_logs}
+WHERE id IN (SELECT id FROM _compact_ids)
+GROUP BY date(created_at), COALESCE(tool, '')
+ON CONFLICT (day, tool) DO UPDATE SET
+    queries = queries + excluded.queries,
+    errors = errors + excluded.errors
+"""
+
+
+def compact_logs(retention_days: float = LOG_RETENTION_DAYS, batch_size: int = LOG_COMPACT_BATCH) -> int:
+    """Roll entries older than `retention_days` into daily aggregates; return how many were removed."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=retention_days)
+    cutoff = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    removed = 0
+    while True:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TEMP TABLE IF NOT EXISTS _compact_ids (id INTEGER PRIMARY KEY)")
+            conn.exec_driver_sql("DELETE FROM _compact_ids")
+            batch = conn.exec_driver_sql(
+                f"INSERT INTO _compact_ids SELECT id FROM {_logs} WHERE created_at < ? ORDER BY created_at LIMIT ?",
+                (cutoff, batch_size),
+            ).rowcount
+            if batch:
+                conn.exec_driver_sql(_ROLLUP_SQL)
+                conn.exec_driver_sql(f"DELETE FROM {_logs} WHERE id IN (SELECT id FROM _compact_ids)")
+        removed += batch
+        if batch < batch_size:
+            break
+    if removed:
+        logger.info("Compacted %d query log entries older than %s into daily aggregates", removed, cutoff)
+    return removed
+
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _run(interval: float):
+    while True:
+        for tenant in shards.open_tenants():
+            try:
+                with use_tenant(tenant):
+                    compact_logs()
+            except Exception as e:
+                logger.warning("Query log compaction failed for %s: %s", tenant, str(e))
+        if _stop.wait(interval):
+            return
+
+
+def start_compaction(interval: float = LOG_COMPACT_INTERVAL):
+    """Compact in the background now and every `interval` seconds until `stop_compaction`."""
+    global _thread
+    if _thread is not None or interval <= 0:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, args=(interval,), name="query-log-compaction", daemon=True)
+    _thread.start()
+
+
+def stop_compaction():
+    global _thread
+    if _thread is not None:
+        _stop.set()
+        _thread.join(timeout=5)
+        _thread = None
@@ -0,0 +1,121 @@
+"""
+Background writer for `query_logs`.
+
+Request threads only enqueue a row; one daemon thread drains the queue and
+inserts everything that arrived within `LOG_FLUSH_INTERVAL` seconds (up to
+`LOG_BATCH_SIZE` rows) in a single transaction, so logging costs one
+commit per interval instead of one per query and never holds the write
+lock on a request path. Rows still queued are flushed on shutdown.
+
+Each row is tagged with the tenant that submitted it and written to that
+tenant's database, one transaction per tenant present in the batch.
+"""
+import os
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import insert
+
+from app.db import current_tenant, engine, use_tenant
+from app.logger import logger
+from app.models import QueryLog
+
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_STOP = object()
+
+
+class QueryLogWriter:
+    def __init__(self, interval: float = LOG_FLUSH_INTERVAL, batch_size: int = LOG_BATCH_SIZE, maxsize: int = LOG_QUEUE_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._exit_hook = False
+        self._lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+                self._thread.start()
+                if not self._exit_hook:
+                    atexit.register(self.stop)
+                    self._exit_hook = True
+
+    def submit(self, row: dict):
+        """Queue one `query_logs` row (column -> value) for the next flush."""
+        self._ensure_started()
+        row.setdefault("created_at", datetime.now(timezone.utc).replace(tzinfo=None))
+        row.setdefault("tenant", current_tenant())
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Query log queue full; dropping entry for %r", row.get("question"))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: list):
+        by_tenant = {}
+        for row in batch:
+            by_tenant.setdefault(row["tenant"], []).append(row)
+        for tenant, rows in by_tenant.items():
+            try:
+                with use_tenant(tenant), engine.begin() as conn:
+                    conn.execute(insert(QueryLog.__table__), rows)
+                self.written += len(rows)
+                self.batches += 1
+            except Exception as e:
+                logger.warning("Failed to write %d query log entries for %s: %s", len(rows), tenant, str(e))
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything queued so far and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "flush_interval_seconds": self.interval,
+        }
+
+
+query_log_writer = QueryLogWriter()
@@ -1,20 +1,49 @@
 from fastapi import FastAPI
-from app.db import init_db
-from app.api import health, data, query, plot, logs
+from app.batch_jobs import batch_runner
+from app.db import check_db, init_db, shards
+from app.forecasting import shutdown_pool
+from app.llm import shutdown_runtime
+from app.log_retention import start_compaction, stop_compaction
+from app.log_writer import query_log_writer
+from app.plot_utils import shutdown_render_pool
+from app.query_executor import query_executor
+from app.telemetry import MetricsMiddleware
+from app.tenancy import TenantMiddleware
+from app.warmup import start_prewarm
+from app.api import health, data, query, plot, logs, forecast, tenants
 
 app = FastAPI(title="Kudwa Financial AI System")
+app.add_middleware(TenantMiddleware)  # X-Tenant-ID / ?tenant= -> that tenant's database
+app.add_middleware(MetricsMiddleware)  # feeds /metrics
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    check_db()
+    start_compaction()
+    batch_runner.start()  # renew batch leases, take over questions of runners that died
+    start_prewarm()  # agent runtime, answer cache, heavy imports: off the startup path
+
+@app.on_event("shutdown")
+def on_shutdown():
+    shutdown_pool()
+    shutdown_render_pool()
+    query_executor.shutdown()
+    batch_runner.shutdown()
+    shutdown_runtime()
+    query_log_writer.stop()
+    stop_compaction()
+    shards.dispose_all()
 
 @app.get("/")
 def root():
     return {"message": "Hello from Kudwa Financial AI System"}
 
 # Mount routers
-app.include_router(health.router, prefix="")      # /health
-app.include_router(data.router, prefix="/data")  # /data/raw etc.
+app.include_router(health.router, prefix="")      # /health, /metrics
+app.include_router(data.router, prefix="")  # /data/raw
 app.include_router(query.router, prefix="")      # /query (hero feature)
 app.include_router(plot.router, prefix="")  # expose /plot/forecast
-app.include_router(logs.router, prefix="")
+app.include_router(forecast.router, prefix="")  # /forecast/batch, /forecast/cache
+app.include_router(logs.router, prefix="")  # /logs, /logs/daily
+app.include_router(tenants.router, prefix="")  # /tenants, /tenants/aggregate
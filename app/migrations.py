@@ -0,0 +1,123 @@
+"""
+Minimal schema migrations for SQLite, tracked with `PRAGMA user_version`.
+
+`Base.metadata.create_all` only creates missing tables, so changes to
+existing tables are applied here. Every migration must also be a no-op on
+a database freshly created from the current models.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateTable
+
+from app.logger import logger
+from app.models import COMPRESS_MIN_BYTES, CompressedText, QueryJobItem, QueryLog, Transaction
+from app.rollups import refresh_rollups
+
+
+def _typed_dates_and_indexes(conn: Connection):
+    """Store `date` as a normalized ISO DATE, add `year_month` and composite indexes."""
+    table = Transaction.__table__
+    columns = {c["name"] for c in inspect(conn).get_columns(table.name)}
+
+    if "year_month" not in columns:
+        logger.info("Migrating %s: typed date, year_month key and indexes", table.name)
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_transactions_id")
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {table.name}__old")
+        conn.execute(CreateTable(table))
+        conn.exec_driver_sql(
+            f"""
+            INSERT INTO {table.name} (id, date, year_month, source, type, category, amount)
+            SELECT id,
+                   date(substr(date, 1, 10)),
+                   CAST(strftime('%Y%m', substr(date, 1, 10)) AS INTEGER),
+                   source, type, category, amount
+            FROM {table.name}__old
+            """
+        )
+        conn.exec_driver_sql(f"DROP TABLE {table.name}__old")
+
+    # Built after the copy above: bulk index builds beat per-row maintenance
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _backfill_monthly_rollups(conn: Connection):
+    """Populate `monthly_rollups` for databases loaded before it existed."""
+    refresh_rollups(conn)
+
+
+def _query_log_data_version(conn: Connection):
+    """Record which data version each logged answer was computed on."""
+    columns = {c["name"] for c in inspect(conn).get_columns(QueryLog.__tablename__)}
+    if "data_version" not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {QueryLog.__tablename__} ADD COLUMN data_version INTEGER")
+
+
+def _query_log_storage(conn: Connection):
+    """Add the `error` flag and `created_at` index, and compress existing result/report text."""
+    table = QueryLog.__table__
+    columns = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    if "error" not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN error BOOLEAN NOT NULL DEFAULT 0")
+        conn.exec_driver_sql(f"UPDATE {table.name} SET error = 1 WHERE report LIKE 'ERROR:%'")
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+    compress = CompressedText().process_bind_param
+    rows = conn.exec_driver_sql(
+        f"SELECT id, result, report FROM {table.name} "
+        f"WHERE length(CAST(result AS BLOB)) >= ? OR length(CAST(report AS BLOB)) >= ?",
+        (COMPRESS_MIN_BYTES, COMPRESS_MIN_BYTES),
+    ).fetchall()
+    if rows:
+        logger.info("Compressing %d %s rows", len(rows), table.name)
+        conn.exec_driver_sql(
+            f"UPDATE {table.name} SET result = ?, report = ? WHERE id = ?",
+            [
+                (
+                    compress(result, None) if isinstance(result, str) else result,
+                    compress(report, None) if isinstance(report, str) else report,
+                    id_,
+                )
+                for id_, result, report in rows
+            ],
+        )
+
+
+def _query_log_tenant(conn: Connection):
+    """Record which tenant each logged question was asked for."""
+    columns = {c["name"] for c in inspect(conn).get_columns(QueryLog.__tablename__)}
+    if "tenant" not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {QueryLog.__tablename__} ADD COLUMN tenant VARCHAR")
+
+
+def _query_job_item_leases(conn: Connection):
+    """Add the owner and heartbeat that lease unfinished batch questions to one runner."""
+    table = QueryJobItem.__tablename__
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if "owner" not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN owner VARCHAR")
+    if "heartbeat_at" not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN heartbeat_at DATETIME")
+
+
+# (version, migration) pairs, applied in order
+MIGRATIONS = [
+    (1, _typed_dates_and_indexes),
+    (2, _backfill_monthly_rollups),
+    (3, _query_log_data_version),
+    (4, _query_log_storage),
+    (5, _query_log_tenant),
+    (6, _query_job_item_leases),
+]
+
+
+def run_migrations(conn: Connection) -> int:
+    """Apply pending migrations and return the resulting schema version."""
+    current = conn.exec_driver_sql("PRAGMA user_version").scalar()
+    for version, migrate in MIGRATIONS:
+        if version > current:
+            migrate(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+            current = version
+    return current
@@ -0,0 +1,203 @@
+"""
+Automatic ARIMA order selection with persisted, incrementally updated models.
+
+The first forecast of a series runs a bounded grid search; the winner is
+saved in `forecast_models` and later fits reuse or warm-start it, searching
+again only when the history is revised or has grown a lot (see the README).
+"""
+import os
+import json
+import hashlib
+import threading
+import warnings
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.db import current_tenant, engine, get_read_engine, read_engine
+from app.logger import logger
+from app.models import ForecastModel
+from app.telemetry import count, span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ARIMA_AUTO = os.getenv("ARIMA_AUTO", "1") == "1"
+ARIMA_MAX_P = int(os.getenv("ARIMA_MAX_P", "3"))
+ARIMA_MAX_D = int(os.getenv("ARIMA_MAX_D", "2"))
+ARIMA_MAX_Q = int(os.getenv("ARIMA_MAX_Q", "3"))
+ARIMA_AIC_TOLERANCE = float(os.getenv("ARIMA_AIC_TOLERANCE", "2"))
+ARIMA_SEASONAL_PERIOD = int(os.getenv("ARIMA_SEASONAL_PERIOD", "12"))
+ARIMA_SEASONAL_MIN_MONTHS = int(os.getenv("ARIMA_SEASONAL_MIN_MONTHS", "36"))
+ARIMA_RESEARCH_MONTHS = int(os.getenv("ARIMA_RESEARCH_MONTHS", "12"))
+ARIMA_MAXITER = int(os.getenv("ARIMA_MAXITER", "200"))
+MIN_SEARCH_MONTHS = 8  # shorter series keep the default order
+KPSS_ALPHA = 0.05
+NO_SEASON = (0, 0, 0, 0)
+
+_table = ForecastModel.__table__
+_key_locks: dict = {}
+_key_locks_lock = threading.Lock()
+
+Job = Tuple[Sequence[float], str, Tuple[int, int, int], Tuple[int, int, int, int], int]
+
+
+def history_digest(series: "pd.Series") -> str:
+    """Digest of the values (to the cent) and first month of `series`."""
+    import numpy as np
+
+    values = np.round(series.to_numpy(dtype=float), 2)
+    head = series.index[0].strftime("%Y-%m").encode() if len(series) else b""
+    return hashlib.sha1(head + values.tobytes()).hexdigest()
+
+
+def _lock_for(series_key: str) -> threading.Lock:
+    with _key_locks_lock:
+        return _key_locks.setdefault((current_tenant(), series_key), threading.Lock())
+
+
+def load(series_key: str) -> Optional[dict]:
+    with read_engine.connect() as conn:
+        row = conn.execute(select(_table).where(_table.c.series_key == series_key)).mappings().first()
+    return dict(row) if row else None
+
+
+def save(series_key: str, series: "pd.Series", fitted, appended: int, searched: bool):
+    import numpy as np
+
+    values = {
+        "order": ",".join(str(v) for v in fitted.model.order),
+        "seasonal_order": ",".join(str(v) for v in fitted.model.seasonal_order),
+        "params": json.dumps([float(v) for v in fitted.params]),
+        "aic": float(fitted.aic) if np.isfinite(fitted.aic) else None,
+        "start": series.index[0].strftime("%Y-%m"),
+        "n_obs": len(series),
+        "digest": history_digest(series),
+        "appended": appended,
+        "updated_at": datetime.now(timezone.utc).replace(tzinfo=None),
+    }
+    if searched:
+        values["searched_at"] = values["updated_at"]
+    stmt = insert(_table).values(series_key=series_key, **values)
+    with engine.begin() as conn:
+        conn.execute(stmt.on_conflict_do_update(index_elements=[_table.c.series_key], set_=values))
+
+
+def list_models() -> List[dict]:
+    with Session(get_read_engine()) as session:
+        rows = session.scalars(select(ForecastModel).order_by(ForecastModel.series_key)).all()
+        return [row.as_dict() for row in rows]
+
+
+def _differencing(series: "pd.Series") -> int:
+    import numpy as np
+    from statsmodels.tsa.stattools import kpss
+
+    values = series.to_numpy(dtype=float)
+    d = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # p-values outside the lookup table
+        while d < ARIMA_MAX_D and len(values) > 4 and np.ptp(values) > 0:
+            if kpss(values, regression="c", nlags="auto")[1] >= KPSS_ALPHA:
+                break
+            values = np.diff(values)
+            d += 1
+    return d
+
+
+def _model(series: "pd.Series", order, seasonal_order):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    return ARIMA(series, order=tuple(order), seasonal_order=tuple(seasonal_order))
+
+
+def _restore(series: "pd.Series", order, seasonal_order, params):
+    """Fitted-results object for known parameters: one Kalman filter pass, no optimization."""
+    import numpy as np
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return _model(series, order, seasonal_order).filter(np.asarray(params, dtype=float))
+
+
+def search(series: "pd.Series", map_jobs: Callable[[List[Job]], List[dict]]):
+    """Grid search over d, (p, q) and seasonal variants; returns the winner restored as fitted results."""
+    import numpy as np
+
+    values, start = series.to_numpy(dtype=float).tolist(), series.index[0].strftime("%Y-%m-%d")
+    d = _differencing(series)
+    best, fits = None, 0
+    for level in range(ARIMA_MAX_P + ARIMA_MAX_Q + 1):
+        orders = [(p, d, level - p) for p in range(ARIMA_MAX_P + 1) if 0 <= level - p <= ARIMA_MAX_Q]
+        previous = best["aic"] if best else np.inf
+        results = map_jobs([(values, start, order, NO_SEASON, ARIMA_MAXITER) for order in orders])
+        fits += len(results)
+        for result in results:
+            if "error" not in result and np.isfinite(result["aic"]) and (best is None or result["aic"] < best["aic"]):
+                best = result
+        if best is not None and previous - best["aic"] < ARIMA_AIC_TOLERANCE:
+            break  # more parameters no longer pay for themselves
+    if best is None:
+        raise ValueError("no candidate order could be fitted")
+
+    if len(series) >= ARIMA_SEASONAL_MIN_MONTHS:
+        s = ARIMA_SEASONAL_PERIOD
+        seasonal = [(1, 0, 0, s), (0, 0, 1, s), (1, 0, 1, s)]
+        results = map_jobs([(values, start, tuple(best["order"]), so, ARIMA_MAXITER) for so in seasonal])
+        fits += len(results)
+        # Extra seasonal parameters have to pay for themselves
+        better = [r for r in results if "error" not in r and r["aic"] < best["aic"] - ARIMA_AIC_TOLERANCE]
+        if better:
+            best = min(better, key=lambda r: r["aic"])
+
+    logger.info(
+        "ARIMA search: order=%s seasonal=%s aic=%.2f after %d fits (d=%d by KPSS)",
+        tuple(best["order"]), tuple(best["seasonal_order"]), best["aic"], fits, d,
+    )
+    return _restore(series, best["order"], best["seasonal_order"], best["params"])
+
+
+def fit_auto(series_key: str, series: "pd.Series", map_jobs: Callable[[List[Job]], List[dict]], default_order):
+    """Fitted results for `series` under its selected model, searching only when needed."""
+    import numpy as np
+
+    if len(series) < MIN_SEARCH_MONTHS:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return _model(series, default_order, NO_SEASON).fit()
+
+    with _lock_for(series_key):  # concurrent first requests share one search
+        saved = load(series_key)
+        mode = "search"
+        if saved and saved["start"] == series.index[0].strftime("%Y-%m") and saved["n_obs"] <= len(series):
+            new = len(series) - saved["n_obs"]
+            unchanged = history_digest(series.iloc[:saved["n_obs"]]) == saved["digest"]
+            if unchanged and new == 0:
+                mode = "restore"
+            elif unchanged and saved["appended"] + new <= ARIMA_RESEARCH_MONTHS:
+                mode = "warm_start"
+
+        with span(f"arima_{mode}"):
+            if mode == "search":
+                fitted = search(series, map_jobs)
+            else:
+                order = [int(v) for v in saved["order"].split(",")]
+                seasonal = [int(v) for v in saved["seasonal_order"].split(",")]
+                params = json.loads(saved["params"])
+                if mode == "restore":
+                    fitted = _restore(series, order, seasonal, params)
+                else:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore")
+                        fitted = _model(series, order, seasonal).fit(start_params=np.asarray(params))
+        count("arima_model", mode=mode)
+        if mode != "restore":
+            appended = saved["appended"] + len(series) - saved["n_obs"] if mode == "warm_start" else 0
+            try:
+                save(series_key, series, fitted, appended, searched=mode == "search")
+            except Exception as e:
+                logger.warning("Could not persist the ARIMA model for %s: %s", series_key, str(e))
+        return fitted
@@ -1,21 +1,69 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, func
+import zlib
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.types import TypeDecorator
 from .db import Base
 
+COMPRESS_MIN_BYTES = 256
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored zlib-compressed as a BLOB once it reaches COMPRESS_MIN_BYTES;
+    shorter values (and rows written before compression) stay plain TEXT.
+    Reads return `str` either way.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        encoded = value.encode("utf-8")
+        if len(encoded) < COMPRESS_MIN_BYTES:
+            return value
+        return zlib.compress(encoded, 6)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            return zlib.decompress(value).decode("utf-8")
+        return value
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Trailing year_month/amount make these covering for monthly aggregates
+    __table_args__ = (
+        Index("ix_transactions_type_date", "type", "date", "year_month", "amount"),
+        Index("ix_transactions_source_type_date", "source", "type", "date", "year_month", "amount"),
+        Index("ix_transactions_category_date", "category", "date", "year_month", "amount"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String)
-    source = Column(String)        # "quickbooks" or "rootfi"
-    type = Column(String)          # revenue/expense/profit
-    category = Column(String)
-    amount = Column(Float)
+    date = Column(Date, comment="ISO date (YYYY-MM-DD) of the reporting period")
+    year_month = Column(Integer, comment="Integer month key YYYYMM, e.g. 202401; use it to filter/group by month")
+    source = Column(String, comment="'quickbooks' or 'rootfi'")
+    type = Column(String, comment="'revenue', 'expense' or 'profit'")
+    category = Column(String, comment="Account / line item name")
+    amount = Column(Float, comment="Absolute amount in USD")
 
     def as_dict(self):
         return {
             "id": self.id,
-            "date": self.date,
+            "date": self.date.isoformat() if self.date else None,
+            "year_month": self.year_month,
             "source": self.source,
             "type": self.type,
             "category": self.category,
@@ -25,22 +73,217 @@ class Transaction(Base):
 
 class QueryLog(Base):
     __tablename__ = "query_logs"
+    __table_args__ = (
+        Index("ix_query_logs_created_at", "created_at"),
+        Index("ix_query_logs_tool_id", "tool", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     question = Column(String, nullable=False)
     sql = Column(String, nullable=True)
     tool = Column(String, nullable=True)
-    result = Column(String, nullable=True)
-    report = Column(String, nullable=True)
+    result = Column(CompressedText, nullable=True)
+    report = Column(CompressedText, nullable=True)
+    data_version = Column(Integer, nullable=True)  # data the answer was computed on
+    error = Column(Boolean, nullable=False, server_default="0")  # report is an error message
+    tenant = Column(String, nullable=True)  # company the question was asked for
     created_at = Column(DateTime, server_default=func.now())
 
     def as_dict(self):
         return {
             "id": self.id,
+            "tenant": self.tenant,
             "question": self.question,
             "sql": self.sql,
             "tool": self.tool,
             "result": self.result,
             "report": self.report,
+            "data_version": self.data_version,
+            "error": self.error,
             "created_at": str(self.created_at) if self.created_at else None,
         }
+
+
+class QueryLogDaily(Base):
+    """Per-day, per-tool counts of `query_logs` entries removed by retention."""
+
+    __tablename__ = "query_log_daily"
+
+    day = Column(Date, primary_key=True)
+    tool = Column(String, primary_key=True)  # "" when the entry had no tool
+    queries = Column(Integer, nullable=False)
+    errors = Column(Integer, nullable=False)
+
+    def as_dict(self):
+        return {
+            "day": self.day.isoformat(),
+            "tool": self.tool,
+            "queries": self.queries,
+            "errors": self.errors,
+        }
+
+
+class IngestionManifest(Base):
+    """One row per ingested source file: its fingerprint and row range."""
+
+    __tablename__ = "ingestion_manifest"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, unique=True, nullable=False)  # owner of the rows
+    path = Column(String, nullable=False)
+    sha256 = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False, default=0)
+    first_id = Column(Integer, nullable=True)
+    last_id = Column(Integer, nullable=True)
+    loaded_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def as_dict(self):
+        return {
+            "source": self.source,
+            "path": self.path,
+            "sha256": self.sha256,
+            "size_bytes": self.size_bytes,
+            "row_count": self.row_count,
+            "first_id": self.first_id,
+            "last_id": self.last_id,
+            "loaded_at": str(self.loaded_at) if self.loaded_at else None,
+        }
+
+
+class IngestionPeriod(Base):
+    """Per-period digest of a source file, used to compute ingestion deltas."""
+
+    __tablename__ = "ingestion_periods"
+    __table_args__ = (UniqueConstraint("source", "period"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False)
+    period = Column(String, nullable=True)  # the rows' `date`; NULL for total columns
+    digest = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+
+
+class DataVersion(Base):
+    """Single-row counter bumped whenever ingestion changes `transactions`."""
+
+    __tablename__ = "data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class MonthlyRollup(Base):
+    """Monthly aggregates of `transactions`, maintained at ingestion time."""
+
+    __tablename__ = "monthly_rollups"
+    __table_args__ = (
+        Index("ix_monthly_rollups_type_month", "type", "year_month", "total_amount"),
+    )
+
+    source = Column(String, primary_key=True, comment="'quickbooks' or 'rootfi'")
+    type = Column(String, primary_key=True, comment="'revenue', 'expense' or 'profit'")
+    category = Column(String, primary_key=True, comment="Account / line item name")
+    year_month = Column(Integer, primary_key=True, comment="Integer month key YYYYMM")
+    total_amount = Column(Float, nullable=False, comment="SUM(amount) for the month")
+    row_count = Column(Integer, nullable=False, comment="COUNT(*) of underlying transactions")
+    min_amount = Column(Float, nullable=False, comment="MIN(amount)")
+    max_amount = Column(Float, nullable=False, comment="MAX(amount)")
+
+    def as_dict(self):
+        return {
+            "source": self.source,
+            "type": self.type,
+            "category": self.category,
+            "year_month": self.year_month,
+            "total_amount": self.total_amount,
+            "row_count": self.row_count,
+            "min_amount": self.min_amount,
+            "max_amount": self.max_amount,
+        }
+
+
+class ForecastModel(Base):
+    """Selected ARIMA specification and fitted parameters for one monthly series."""
+
+    __tablename__ = "forecast_models"
+
+    series_key = Column(String, primary_key=True, comment="e.g. 'revenue|quickbooks|' (target|source|category)")
+    order = Column(String, nullable=False, comment="'p,d,q'")
+    seasonal_order = Column(String, nullable=False, comment="'P,D,Q,s'")
+    params = Column(String, nullable=False, comment="JSON list of fitted parameters")
+    aic = Column(Float, nullable=True)
+    start = Column(String, nullable=False, comment="First month of the fitted history, YYYY-MM")
+    n_obs = Column(Integer, nullable=False, comment="Months fitted")
+    digest = Column(String, nullable=False, comment="Digest of the fitted history values")
+    appended = Column(Integer, nullable=False, default=0, comment="Months added by warm starts since the search")
+    searched_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def as_dict(self):
+        return {
+            "series_key": self.series_key,
+            "order": [int(v) for v in self.order.split(",")],
+            "seasonal_order": [int(v) for v in self.seasonal_order.split(",")],
+            "aic": self.aic,
+            "start": self.start,
+            "n_obs": self.n_obs,
+            "appended": self.appended,
+            "searched_at": str(self.searched_at) if self.searched_at else None,
+            "updated_at": str(self.updated_at) if self.updated_at else None,
+        }
+
+
+class QueryJob(Base):
+    """A batch of questions submitted together via `POST /query/batch`."""
+
+    __tablename__ = "query_jobs"
+
+    id = Column(String, primary_key=True, comment="Random hex id")
+    status = Column(String, nullable=False, comment="'queued', 'running' or 'done'")
+    total = Column(Integer, nullable=False, comment="Number of questions")
+    use_cache = Column(Boolean, nullable=False, server_default="1")
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class QueryJobItem(Base):
+    """One question of a `QueryJob` and, once answered, its report."""
+
+    __tablename__ = "query_job_items"
+    __table_args__ = (
+        Index("ix_query_job_items_status", "status"),
+    )
+
+    job_id = Column(String, primary_key=True)
+    position = Column(Integer, primary_key=True, comment="Index of the question in the submitted list")
+    question = Column(String, nullable=False)
+    status = Column(String, nullable=False, comment="'queued', 'running', 'done' or 'failed'")
+    report = Column(CompressedText, nullable=True)
+    error = Column(String, nullable=True)
+    cached = Column(Boolean, nullable=True, comment="Answered from the answer cache")
+    intent = Column(String, nullable=True, comment="Intent router answer, if any")
+    attempts = Column(Integer, nullable=False, server_default="0", comment="Runs started (restarts re-run interrupted items)")
+    owner = Column(String, nullable=True, comment="Batch runner that holds the item while it is queued or running")
+    heartbeat_at = Column(DateTime, nullable=True, comment="Last lease renewal by the owner")
+    elapsed_ms = Column(Float, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def as_dict(self):
+        return {
+            "position": self.position,
+            "question": self.question,
+            "status": self.status,
+            "report": self.report,
+            "error": self.error,
+            "cached": self.cached,
+            "intent": self.intent,
+            "attempts": self.attempts,
+            "elapsed_ms": self.elapsed_ms,
+            "started_at": str(self.started_at) if self.started_at else None,
+            "finished_at": str(self.finished_at) if self.finished_at else None,
+        }
@@ -1,70 +1,194 @@
 # app/plot_utils.py
+"""
+Forecast chart rendering for `/plot/forecast`.
+
+Charts are drawn with the object-oriented `Figure` + Agg canvas API (no
+pyplot global state, nothing to leak between requests) on a bounded
+worker pool, and the encoded bytes are cached per (data version, horizon,
+size, format). The same key doubles as the response ETag, so revalidation
+with `If-None-Match` never has to fit or render anything. A chart whose
+forecast could not be fitted is served without an ETag and never cached,
+so the next request tries the fit again.
+"""
 import io
-import pandas as pd
-import matplotlib.pyplot as plt
-from fastapi.responses import StreamingResponse
-from sqlalchemy import text
-from app.db import SessionLocal
-from statsmodels.tsa.arima.model import ARIMA
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Tuple
 
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 
-def generate_forecast_plot(horizon: int = 6):
-    """
-    Generate a PNG chart showing historical monthly revenue
-    and an ARIMA forecast for the requested horizon.
-    """
+from app import forecasting
+from app.cache import TTLCache
+from app.db import current_tenant, in_current_context
+from app.logger import logger
+from app.rollups import monthly_series
+from app.telemetry import span
+from app.versioning import get_data_version
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PLOT_WORKERS = int(os.getenv("PLOT_WORKERS", "2"))
+PLOT_CACHE_SIZE = int(os.getenv("PLOT_CACHE_SIZE", "64"))
+DPI = 100
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "json": "application/json",
+}
+
+_render_pool = None
+_pool_lock = threading.Lock()
+_rendered = TTLCache(PLOT_CACHE_SIZE)
+
+
+def _get_render_pool() -> ThreadPoolExecutor:
+    global _render_pool
+    with _pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(max_workers=PLOT_WORKERS, thread_name_prefix="plot-render")
+        return _render_pool
+
+
+def forecast_data(horizon: int) -> Tuple["pd.Series", "pd.Series", Optional[str]]:
+    """Return the monthly revenue history, its forecast, and the fit error (forecast empty on failure)."""
+    import pandas as pd
+
+    series = monthly_series("revenue")
+    if series.empty:
+        return series, pd.Series([], dtype=float), None
 
-    # --- Query revenue data ---
-    db = SessionLocal()
-    try:
-        rows = db.execute(
-            text("SELECT date, amount FROM transactions WHERE type='revenue'")
-        ).fetchall()
-        df = pd.DataFrame([dict(r._mapping) for r in rows])
-    finally:
-        db.close()
-
-    # --- Handle empty dataset ---
-    if df.empty:
-        fig, ax = plt.subplots()
-        ax.text(0.5, 0.5, "No revenue data available", ha="center", va="center")
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png")
-        buf.seek(0)
-        return StreamingResponse(buf, media_type="image/png")
-
-    # --- Prepare time series ---
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.groupby(pd.Grouper(key="date", freq="M")).sum().sort_index()
-    df = df.asfreq("M", fill_value=0)
-    series = df["amount"].astype(float)
-
-    # --- Forecast with ARIMA ---
     try:
-        model = ARIMA(series, order=(1, 1, 1))
-        fitted = model.fit()
-        forecast = fitted.forecast(steps=horizon)
+        forecast = forecasting.forecast(series, horizon, series_key="revenue||")
     except Exception as e:
-        forecast = pd.Series([], dtype=float)
-
-    # --- Plot history + forecast ---
-    fig, ax = plt.subplots()
-    series.plot(ax=ax, label="Historical", marker="o")
-    if not forecast.empty:
-        forecast.index = pd.date_range(
-            start=series.index[-1] + pd.offsets.MonthEnd(),
-            periods=horizon,
-            freq="M"
-        )
-        forecast.plot(ax=ax, label="Forecast", linestyle="--", marker="x")
+        logger.warning("Forecast fit for the chart failed: %s", str(e))
+        return series, pd.Series([], dtype=float), str(e) or type(e).__name__
+
+    forecast = pd.Series(
+        forecast.to_numpy(dtype=float),
+        index=pd.date_range(start=series.index[-1] + pd.offsets.MonthEnd(), periods=horizon, freq="M"),
+    )
+    return series, forecast, None
+
+
+def render_chart(series: "pd.Series", forecast: "pd.Series", horizon: int, fmt: str, width: int, height: int) -> bytes:
+    """Draw history + forecast on a standalone Figure and encode it as PNG or SVG."""
+    with span(f"render_{fmt}"):
+        return _render(series, forecast, horizon, fmt, width, height)
 
-    ax.set_title(f"Revenue Forecast (next {horizon} months)")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("Amount (USD)")
-    ax.legend()
 
-    # --- Return PNG ---
+def _render(series: "pd.Series", forecast: "pd.Series", horizon: int, fmt: str, width: int, height: int) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(width / DPI, height / DPI), dpi=DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    if series.empty:
+        ax.text(0.5, 0.5, "No revenue data available", ha="center", va="center")
+    else:
+        ax.plot(series.index, series.to_numpy(), label="Historical", marker="o")
+        if not forecast.empty:
+            ax.plot(forecast.index, forecast.to_numpy(), label="Forecast", linestyle="--", marker="x")
+        ax.set_title(f"Revenue Forecast (next {horizon} months)")
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Amount (USD)")
+        ax.legend()
+        fig.autofmt_xdate()
+
     buf = io.BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="image/png")
+    fig.savefig(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _payload(series: "pd.Series", forecast: "pd.Series", horizon: int, error: Optional[str] = None) -> bytes:
+    body = {
+        "horizon": horizon,
+        "history": {ts.strftime("%Y-%m"): round(float(v), 2) for ts, v in series.items()},
+        "forecast": {ts.strftime("%Y-%m"): round(float(v), 2) for ts, v in forecast.items()},
+    }
+    if error is not None:
+        body["error"] = f"Forecast failed: {error}"
+    return json.dumps(body).encode()
+
+
+def build_forecast_plot(
+    horizon: int, fmt: str = "png", width: int = 640, height: int = 480
+) -> Tuple[bytes, Optional[str]]:
+    """Fit (via the shared model cache) and encode the chart; runs on the render pool. Returns (body, fit error)."""
+    series, forecast, error = forecast_data(horizon)
+    if fmt == "json":
+        return _payload(series, forecast, horizon, error), error
+    return render_chart(series, forecast, horizon, fmt, width, height), error
+
+
+def plot_etag(version: int, horizon: int, fmt: str, width: int, height: int) -> str:
+    key = f"{current_tenant()}:{version}:{horizon}:{fmt}:{width}x{height}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+async def generate_forecast_plot(
+    horizon: int = 6,
+    fmt: str = "png",
+    width: int = 640,
+    height: int = 480,
+    if_none_match: Optional[str] = None,
+) -> Response:
+    """
+    Return a chart (PNG/SVG) or the raw numbers (JSON) showing historical
+    monthly revenue and an ARIMA forecast for the requested horizon.
+    """
+    version = await run_in_threadpool(get_data_version)
+    etag = plot_etag(version, horizon, fmt, width, height)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (current_tenant(), version, horizon, fmt, width, height)
+    body = _rendered.get(key)
+    if body is None:
+        loop = asyncio.get_running_loop()
+        body, error = await loop.run_in_executor(
+            _get_render_pool(), in_current_context(build_forecast_plot), horizon, fmt, width, height
+        )
+        if error is not None:
+            # History only: neither cached nor tagged, so the next request fits again
+            headers = {"Cache-Control": "no-store", "X-Forecast-Error": _header_safe(error)}
+            return Response(content=body, media_type=MEDIA_TYPES[fmt], headers=headers)
+        _rendered.put(key, body)
+    return Response(content=body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+def _header_safe(message: str) -> str:
+    return " ".join(message.encode("ascii", "replace").decode().split())[:200]
+
+
+def prewarm():
+    """Import matplotlib ahead of the first render (runs in the background after startup)."""
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+
+
+def render_cache_stats() -> dict:
+    return _rendered.stats()
+
+
+def shutdown_render_pool():
+    global _render_pool
+    with _pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(cancel_futures=True)
+            _render_pool = None
@@ -10,13 +10,27 @@ def build_agent_prompt(schema: str) -> str:
 Database schema:
 {schema}
 
-You have two tools available:
-1. sql_query(sql: str) → run read-only SQL queries on the transactions table.
-2. forecast_arima(sql: str, horizon: int, target: str) → run ARIMA forecasts.
+You have three tools available:
+1. sql_query(sql: str) → run read-only SQL queries on the tables above.
+2. forecast_arima(horizon: int, target: str, source: str | None, category: str | None)
+   → run ARIMA forecasts on the monthly series of a transaction type
+   (optionally filtered); pass `sql` only for series the rollups cannot express.
+3. forecast_batch(group_by: list[str], horizon: int, type: str | None, source: str | None)
+   → forecast every category/source/type series at once (e.g. all expense
+   categories) instead of calling forecast_arima once per series.
 
 Guidelines:
 - Use the schema exactly when writing SQL.
+- Prefer `monthly_rollups` for any monthly/quarterly/yearly totals, counts,
+  min/max or trends; it holds one row per (source, type, category, month),
+  so `SUM(total_amount)` over it equals `SUM(amount)` over `transactions`.
+- Only query `transactions` for individual rows; there, filter and group on
+  `year_month` (e.g. `WHERE year_month BETWEEN 202401 AND 202403`) and on
+  `type`, `source` and `category` so the indexes are used.
 - Only use SELECT queries; never modify data.
+- sql_query returns at most a few hundred rows verbatim; larger results come
+  back summarized (row_count, column stats, sample), and full scans of large
+  tables or slow queries are rejected. Aggregate in SQL and retry if refused.
 - Call tools to fetch data as needed.
 - Always respond to the user with a **Markdown financial report**.
 - Use ## headings and bullet points for clarity.
@@ -0,0 +1,230 @@
+"""
+Admission control for agent runs behind the async `/query` endpoint.
+
+- Identical in-flight questions (same tenant, normalized text and data
+  version) are coalesced: every caller awaits the same execution.
+- At most `LLM_MAX_CONCURRENCY` agent runs execute at once, on a dedicated
+  thread pool so they never starve the server's default threadpool; up to
+  `QUERY_MAX_QUEUE` more may wait. Beyond that callers get `Saturated`.
+- Each caller waits at most `QUERY_DEADLINE` seconds. A queued execution
+  that has not started by its deadline is dropped; one that is already
+  running finishes in the background and still fills the answer cache.
+- Streamed runs (`stream`) share the same slots and queue but are never
+  coalesced, since each caller needs its own token stream.
+"""
+import os
+import math
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+from app.answer_cache import answer_cache, normalize_question
+from app.db import current_tenant, in_current_context
+from app.llm import query_agent, stream_query_agent
+from app.logger import logger
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+QUERY_MAX_QUEUE = int(os.getenv("QUERY_MAX_QUEUE", "16"))
+QUERY_DEADLINE = float(os.getenv("QUERY_DEADLINE", "60"))
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))
+
+
+class Saturated(Exception):
+    """Too many agent runs are executing or queued."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Query capacity exhausted, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The request did not complete within its deadline."""
+
+
+class QueryExecutor:
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = QUERY_MAX_QUEUE,
+        deadline: float = QUERY_DEADLINE,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0  # admitted executions, queued or running
+        self._avg_run = 5.0  # EWMA of agent run time (seconds), seeded by the first run
+        self.executions = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.streams = 0
+
+    def _bind_loop(self):
+        """(Re)create loop-bound primitives when first used on a new event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._inflight = {}
+            self._pending = 0
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="agent")
+        return loop
+
+    def _retry_after(self) -> int:
+        backlog = self._pending - self.max_concurrent + 1
+        return max(1, math.ceil(self._avg_run * backlog / self.max_concurrent))
+
+    async def run(self, question: str, version: int) -> dict:
+        """Run (or join) the agent execution for `question` on data `version`."""
+        loop = self._bind_loop()
+        key = (current_tenant(), normalize_question(question), version)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if self._pending >= self.max_concurrent + self.max_queue:
+                self.rejected += 1
+                raise Saturated(self._retry_after())
+            future = loop.create_future()
+            # Consume the exception even if every caller already gave up
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = future
+            self._pending += 1
+            task = loop.create_task(self._execute(question, key, future, loop.time() + self.deadline))
+            self._tasks.add(task)  # the loop only keeps weak references
+            task.add_done_callback(self._tasks.discard)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise DeadlineExceeded(f"Query did not complete within {self.deadline:g}s")
+        return {**result, "question": question}
+
+    async def _execute(self, question: str, key, future: asyncio.Future, deadline_at: float):
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline_at - loop.time()))
+            except asyncio.TimeoutError:
+                future.set_exception(DeadlineExceeded("Query expired while queued"))
+                return
+
+            try:
+                start = time.perf_counter()
+                result = await loop.run_in_executor(self._pool, in_current_context(query_agent), question)
+                elapsed = time.perf_counter() - start
+                self._avg_run = elapsed if self.executions == 0 else 0.8 * self._avg_run + 0.2 * elapsed
+                self.executions += 1
+            finally:
+                self._slots.release()
+
+            if "report" in result:
+                answer_cache.store(question, result["report"], key[2])
+                result["cached"] = False
+            future.set_result(result)
+        except Exception as e:
+            logger.error("Query execution failed: %s", str(e))
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._pending -= 1
+            self._inflight.pop(key, None)
+
+    def check_capacity(self):
+        """Raise `Saturated` if a new execution would not be admitted right now."""
+        self._bind_loop()
+        if self._pending >= self.max_concurrent + self.max_queue:
+            self.rejected += 1
+            raise Saturated(self._retry_after())
+
+    async def stream(self, question: str, version: int) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Run the streaming agent for `question`, yielding `(event, data)` pairs
+        as they happen (see `app.streaming`). `None` events are keep-alives.
+        Raises `Saturated` before the first event if there is no capacity.
+        """
+        from app.callbacks import StreamEventHandler
+
+        loop = self._bind_loop()
+        self.check_capacity()
+        self._pending += 1
+        self.streams += 1
+        events: asyncio.Queue = asyncio.Queue()
+
+        def emit(event: str, data: dict):
+            # Called on the agent thread; the loop may be gone if the server stopped
+            try:
+                loop.call_soon_threadsafe(events.put_nowait, (event, data))
+            except RuntimeError:
+                pass
+
+        acquired, run = False, None
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.deadline)
+                acquired = True
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                yield "error", {"detail": f"Query did not start within {self.deadline:g}s"}
+                return
+
+            run = loop.run_in_executor(self._pool, in_current_context(stream_query_agent), question, StreamEventHandler(emit))
+            while not (run.done() and events.empty()):
+                getter = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({getter, run}, timeout=STREAM_KEEPALIVE, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                else:
+                    getter.cancel()
+                    if not done:
+                        yield None, {}
+
+            result = run.result()
+            if "report" in result:
+                answer_cache.store(question, result["report"], version)
+            yield ("done", result) if "report" in result else ("error", {"detail": result["error"]})
+        finally:
+            # A disconnected client leaves the run to finish (and be logged) in the background
+            if acquired:
+                if run is not None and not run.done():
+                    run.add_done_callback(lambda _: self._release_stream())
+                else:
+                    self._release_stream()
+            else:
+                self._pending -= 1
+
+    def _release_stream(self):
+        self._slots.release()
+        self._pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "deadline_seconds": self.deadline,
+            "pending": self._pending,
+            "inflight_keys": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "streams": self.streams,
+            "avg_run_seconds": round(self._avg_run, 3),
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+query_executor = QueryExecutor()
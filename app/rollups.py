@@ -0,0 +1,177 @@
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+
+from app.db import read_engine
+from app.models import MonthlyRollup, Transaction
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_rollups = MonthlyRollup.__table__
+_tx = Transaction.__table__
+
+
+def refresh_rollups(conn: Connection, source: Optional[str] = None, year_months: Optional[Iterable[int]] = None):
+    """
+    Recompute the rollup rows for `source` (all sources if None), limited
+    to `year_months` when given. Runs inside the caller's transaction so
+    rollups always match the rows written alongside them.
+    """
+    if year_months is not None:
+        year_months = sorted({ym for ym in year_months if ym is not None})
+        if not year_months:
+            return
+
+    cleanup = delete(_rollups)
+    aggregate = (
+        select(
+            _tx.c.source,
+            _tx.c.type,
+            _tx.c.category,
+            _tx.c.year_month,
+            func.sum(_tx.c.amount),
+            func.count(),
+            func.min(_tx.c.amount),
+            func.max(_tx.c.amount),
+        )
+        .where(_tx.c.year_month.is_not(None), _tx.c.amount.is_not(None))
+        .group_by(_tx.c.source, _tx.c.type, _tx.c.category, _tx.c.year_month)
+    )
+    if source is not None:
+        cleanup = cleanup.where(_rollups.c.source == source)
+        aggregate = aggregate.where(_tx.c.source == source)
+    if year_months is not None:
+        cleanup = cleanup.where(_rollups.c.year_month.in_(year_months))
+        aggregate = aggregate.where(_tx.c.year_month.in_(year_months))
+
+    conn.execute(cleanup)
+    conn.execute(
+        insert(_rollups).from_select(
+            [
+                "source",
+                "type",
+                "category",
+                "year_month",
+                "total_amount",
+                "row_count",
+                "min_amount",
+                "max_amount",
+            ],
+            aggregate,
+        )
+    )
+
+
+def year_month_index(values) -> "pd.DatetimeIndex":
+    """Convert YYYYMM integers into month-end timestamps."""
+    import pandas as pd
+
+    return pd.DatetimeIndex(
+        pd.to_datetime(pd.Series(values).astype(str), format="%Y%m") + pd.offsets.MonthEnd(0)
+    )
+
+
+def monthly_series(
+    type: str = "revenue",
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+) -> "pd.Series":
+    """
+    Return a continuous monthly series (month-end index, missing months
+    filled with 0) of total amounts, read from `monthly_rollups`.
+    """
+    import pandas as pd
+
+    stmt = (
+        select(_rollups.c.year_month, func.sum(_rollups.c.total_amount))
+        .where(_rollups.c.type == type)
+        .group_by(_rollups.c.year_month)
+        .order_by(_rollups.c.year_month)
+    )
+    if source is not None:
+        stmt = stmt.where(_rollups.c.source == source)
+    if category is not None:
+        stmt = stmt.where(_rollups.c.category == category)
+
+    with read_engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+
+    if not rows:
+        return pd.Series([], dtype=float)
+
+    months, totals = zip(*rows)
+    series = pd.Series(totals, index=year_month_index(months), dtype=float, name="amount")
+    return series.asfreq("M", fill_value=0)
+
+
+GROUP_COLUMNS = ("source", "type", "category")
+
+
+def monthly_frame(
+    group_by: Sequence[str],
+    type: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+) -> "pd.DataFrame":
+    """
+    Return every monthly series of a grouping in one read: a frame with a
+    continuous month-end index and one column per group (a tuple of the
+    `group_by` values), missing months filled with 0.
+    """
+    import pandas as pd
+
+    unknown = set(group_by) - set(GROUP_COLUMNS)
+    if unknown or not group_by:
+        raise ValueError(f"group_by must be a non-empty subset of {GROUP_COLUMNS}")
+
+    keys = [_rollups.c[name] for name in group_by]
+    stmt = (
+        select(*keys, _rollups.c.year_month, func.sum(_rollups.c.total_amount).label("amount"))
+        .group_by(*keys, _rollups.c.year_month)
+    )
+    for name, value in (("type", type), ("source", source), ("category", category)):
+        if value is not None:
+            stmt = stmt.where(_rollups.c[name] == value)
+
+    with read_engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(rows, columns=[*group_by, "year_month", "amount"])
+    wide = df.pivot_table(index="year_month", columns=list(group_by), values="amount", aggfunc="sum", fill_value=0)
+    wide.index = year_month_index(wide.index)
+    wide = wide.asfreq("M", fill_value=0)
+    if not isinstance(wide.columns, pd.MultiIndex):
+        wide.columns = [(c,) for c in wide.columns]
+    return wide
+
+
+def rollup_totals(
+    group_by: Sequence[str],
+    type: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+) -> List[Tuple[tuple, float, int]]:
+    """Return `(group key, total amount, transaction count)` per group, read from `monthly_rollups`."""
+    unknown = set(group_by) - set(GROUP_COLUMNS)
+    if unknown:
+        raise ValueError(f"group_by must be a subset of {GROUP_COLUMNS}")
+
+    keys = [_rollups.c[name] for name in group_by]
+    stmt = select(*keys, func.sum(_rollups.c.total_amount), func.sum(_rollups.c.row_count))
+    if keys:
+        stmt = stmt.group_by(*keys)
+    for name, value in (("type", type), ("source", source), ("category", category)):
+        if value is not None:
+            stmt = stmt.where(_rollups.c[name] == value)
+    if year is not None:
+        stmt = stmt.where(_rollups.c.year_month.between(year * 100 + 1, year * 100 + 12))
+
+    with read_engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    width = len(keys)
+    return [(tuple(row[:width]), row[width] or 0.0, row[width + 1] or 0) for row in rows if row[width + 1]]
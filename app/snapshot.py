@@ -0,0 +1,159 @@
+"""
+Columnar snapshot of `transactions` for analytics.
+
+Ingestion writes the table once per data version to an uncompressed Arrow
+IPC file that is memory-mapped on read, so `load_transactions()` and the
+`/data/raw` Arrow export share the page cache instead of parsing rows.
+A missing snapshot is built on first use.
+"""
+import os
+import glob
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from app.db import DEFAULT_TENANT, current_tenant, read_engine
+from app.logger import logger
+from app.versioning import get_data_version
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./snapshots")
+SNAPSHOT_BATCH_ROWS = 100_000
+COLUMNS = ("id", "date", "year_month", "source", "type", "category", "amount")
+DICTIONARY_COLUMNS = ("source", "type", "category")
+
+_lock = threading.Lock()
+_tables: Dict[str, Tuple[int, object]] = {}  # tenant -> (data version, memory-mapped pyarrow.Table)
+
+
+def snapshot_dir() -> str:
+    tenant = current_tenant()
+    return SNAPSHOT_DIR if tenant == DEFAULT_TENANT else os.path.join(SNAPSHOT_DIR, tenant)
+
+
+def snapshot_path(version: int) -> str:
+    return os.path.join(snapshot_dir(), f"transactions-v{version}.arrow")
+
+
+def _plain(pa, type_, values: "np.ndarray"):
+    """Arrow array over `values` with no validity bitmap (sentinels stay values)."""
+    return pa.Array.from_buffers(type_, len(values), [None, pa.py_buffer(values)])
+
+
+def _read_columns():
+    import numpy as np
+
+    ids: List[np.ndarray] = []
+    dates: List[np.ndarray] = []
+    months: List[np.ndarray] = []
+    amounts: List[np.ndarray] = []
+    codes = {name: [] for name in DICTIONARY_COLUMNS}
+    dictionaries = {name: {} for name in DICTIONARY_COLUMNS}
+
+    with read_engine.connect() as conn:
+        result = conn.execute(
+            text("SELECT id, date, year_month, source, type, category, amount FROM transactions ORDER BY id")
+        )
+        while True:
+            rows = result.fetchmany(SNAPSHOT_BATCH_ROWS)
+            if not rows:
+                break
+            id_, date_, ym, source, type_, category, amount = zip(*rows)
+            ids.append(np.array(id_, dtype=np.int64))
+            dates.append(np.array(date_, dtype="datetime64[D]").astype("datetime64[ns]"))
+            months.append(np.array([m or 0 for m in ym], dtype=np.int32))
+            amounts.append(np.array([np.nan if a is None else a for a in amount], dtype=np.float64))
+            for name, values in zip(DICTIONARY_COLUMNS, (source, type_, category)):
+                lookup = dictionaries[name]
+                codes[name].append(
+                    np.fromiter((lookup.setdefault(v, len(lookup)) for v in values), dtype=np.int32, count=len(values))
+                )
+    return ids, dates, months, amounts, codes, dictionaries
+
+
+def build_snapshot() -> int:
+    """Write the snapshot for the current data version, drop older ones, return the version."""
+    import numpy as np
+    import pyarrow as pa
+
+    while True:
+        version = get_data_version()
+        ids, dates, months, amounts, codes, dictionaries = _read_columns()
+        if get_data_version() == version:
+            break  # otherwise ingestion committed mid-read; the rows may mix versions
+
+    def concat(parts, dtype):
+        return np.concatenate(parts) if parts else np.array([], dtype=dtype)
+
+    arrays = {
+        "id": _plain(pa, pa.int64(), concat(ids, np.int64)),
+        "date": _plain(pa, pa.timestamp("ns"), concat(dates, "datetime64[ns]").view(np.int64)),
+        "year_month": _plain(pa, pa.int32(), concat(months, np.int32)),
+        "amount": _plain(pa, pa.float64(), concat(amounts, np.float64)),
+    }
+    for name in DICTIONARY_COLUMNS:
+        arrays[name] = pa.DictionaryArray.from_arrays(
+            pa.array(concat(codes[name], np.int32)),
+            pa.array(list(dictionaries[name]), type=pa.string()),
+        )
+    table = pa.table({name: arrays[name] for name in COLUMNS})
+
+    os.makedirs(snapshot_dir(), exist_ok=True)
+    path = snapshot_path(version)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=SNAPSHOT_BATCH_ROWS)
+    os.replace(tmp, path)
+
+    for old in glob.glob(os.path.join(snapshot_dir(), "transactions-v*.arrow")):
+        if old != path:
+            try:
+                os.remove(old)  # readers keep their existing mappings
+            except OSError:
+                pass
+    logger.info("Wrote transactions snapshot v%s (%d rows) to %s", version, table.num_rows, path)
+    return version
+
+
+def ensure_snapshot() -> int:
+    """Build the snapshot for the current data version unless it already exists."""
+    version = get_data_version()
+    return version if os.path.exists(snapshot_path(version)) else build_snapshot()
+
+
+def _table():
+    import pyarrow as pa
+
+    tenant, version = current_tenant(), get_data_version()
+    with _lock:
+        cached = _tables.get(tenant)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if not os.path.exists(snapshot_path(version)):
+            version = build_snapshot()
+        with pa.memory_map(snapshot_path(version), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        _tables[tenant] = (version, table)  # older versions are unmapped once their frames are gone
+        return table
+
+
+def load_table(columns: Optional[Sequence[str]] = None):
+    """Return the memory-mapped `pyarrow.Table` for the current data version."""
+    table = _table()
+    return table if columns is None else table.select(list(columns))
+
+
+def load_transactions(columns: Optional[Sequence[str]] = None) -> "pd.DataFrame":
+    """
+    Return `transactions` for the current data version as a DataFrame backed
+    by the memory-mapped snapshot. Unknown values are sentinels: `year_month`
+    0, `amount` NaN and `date` NaT; `source`/`type`/`category` are categoricals.
+    """
+    table = load_table(columns)
+    # split_blocks keeps one block per column, so pandas does not consolidate (copy) them
+    return table.to_pandas(split_blocks=True)
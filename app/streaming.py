@@ -0,0 +1,40 @@
+"""
+Server-Sent Events support for `/query/stream`.
+
+`app.callbacks.StreamEventHandler` is attached to one agent run on a
+worker thread and turns tool calls and model tokens into these events.
+
+Events (each `data:` line is JSON):
+
+- `start`      question and data version, sent before any model call
+- `tool_start` tool name and input (the SQL for `sql_query`)
+- `tool`       the same plus `duration_ms`, `rows` and `error` once it returns
+- `token`      a fragment of the final report, in generation order
+- `done`       the full report, `cached` flag and total `elapsed_ms`
+- `error`      `detail` when the run fails
+"""
+import json
+from typing import Any, Optional
+
+LOGGED_ROWS = 50  # rows of tool output kept in query_logs.result
+
+
+def sse(event: str, data: dict) -> str:
+    """Encode one SSE message; JSON keeps multi-line report text on one `data:` line."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _jsonable(value: Any) -> Any:
+    """Tool outputs may hold e.g. Timestamp keys; fall back to their text form."""
+    try:
+        json.dumps(value, default=str)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def logged_result(output: Any) -> dict:
+    """The part of a tool output kept in `query_logs.result`."""
+    if isinstance(output, list):
+        return {"row_count": len(output), "rows": output[:LOGGED_ROWS]}
+    return {"output": _jsonable(output)}
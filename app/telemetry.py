@@ -0,0 +1,220 @@
+"""
+Lightweight, dependency-free tracing and metrics.
+
+- `span("stage")` times a block into the `stage_duration_seconds`
+  histogram (and `stage_errors_total` if it raises). When a trace is
+  active on the current thread (`start_trace()`), the span is also added
+  to that trace, which is how `/query?timings=true` gets its breakdown.
+- `instrumented_tool(name)` adds a span and a `tool_calls_total` count
+  to an agent tool; `count(event)` bumps `events_total`.
+- `MetricsMiddleware` records `http_request_duration_seconds` per route
+  template, method and status.
+- `render_prometheus()` returns everything in the Prometheus text format
+  for `/metrics`.
+
+A span costs two `perf_counter` calls and one short lock, so it is meant
+to stay on in production. Label values must be low-cardinality.
+"""
+import time
+import bisect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_fmt_labels(k)} {v:g}" for k, v in sorted(self._values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.buckets = name, help, buckets
+        self._series: Dict[LabelKey, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[LabelKey, Tuple[int, float]]:
+        """(count, sum) per label set."""
+        with self._lock:
+            return {k: (s[-1], s[-2]) for k, s in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {series[-1]}")
+        return lines
+
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency by route template, method and status.")
+STAGE_DURATION = Histogram("stage_duration_seconds", "Time spent in each instrumented stage.")
+STAGE_ERRORS = Counter("stage_errors_total", "Exceptions raised inside instrumented stages.")
+TOOL_CALLS = Counter("tool_calls_total", "Agent tool invocations by tool and outcome.")
+EVENTS = Counter("events_total", "Other notable events (cache hits, rejections, ...).")
+METRICS = (REQUEST_DURATION, STAGE_DURATION, STAGE_ERRORS, TOOL_CALLS, EVENTS)
+
+_trace: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace() -> contextvars.Token:
+    """Collect spans finished on this thread/context until `end_trace`."""
+    return _trace.set([])
+
+
+def end_trace(token: contextvars.Token) -> Dict[str, float]:
+    """Stop collecting and return `{stage_ms: total}` (repeated stages are summed, with a `_count`)."""
+    spans = _trace.get() or []
+    _trace.reset(token)
+    breakdown: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for stage, seconds in spans:
+        breakdown[f"{stage}_ms"] = round(breakdown.get(f"{stage}_ms", 0.0) + seconds * 1000, 2)
+        counts[stage] = counts.get(stage, 0) + 1
+    for stage, n in counts.items():
+        if n > 1:
+            breakdown[f"{stage}_count"] = n
+    return breakdown
+
+
+def record(stage: str, seconds: float):
+    """Record an already-measured stage duration."""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    spans = _trace.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def count(event: str, **labels):
+    """Increment `events_total{event=...}`."""
+    EVENTS.inc(event=event, **labels)
+
+
+def instrumented_tool(name: str):
+    """
+    Decorator for agent tool functions (apply under `@tool`): times each
+    call as stage `name` and counts it in `tool_calls_total{tool, outcome}`,
+    where outcome is "error" if it raises or returns an `{"error": ...}` dict.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            outcome = "error"
+            try:
+                with span(name):
+                    result = func(*args, **kwargs)
+                if not (isinstance(result, dict) and "error" in result):
+                    outcome = "ok"
+                return result
+            finally:
+                TOOL_CALLS.inc(tool=name, outcome=outcome)
+        return wrapper
+    return decorator
+
+
+def stage_summary() -> Dict[str, dict]:
+    """Per-stage count and total seconds, for CLI summaries."""
+    return {
+        dict(key).get("stage", ""): {"count": n, "total_s": round(total, 4)}
+        for key, (n, total) in STAGE_DURATION.snapshot().items()
+    }
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering); streaming responses are timed to their last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched"),
+                method=scope.get("method", ""),
+                status=status["code"],
+            )
@@ -0,0 +1,134 @@
+"""
+Tenant selection for HTTP requests and cross-tenant aggregates.
+
+Requests pick their company with the `X-Tenant-ID` header or a `tenant`
+query parameter (the default tenant otherwise). An invalid id is a `400`
+and a tenant without a database a `404`: requests never create shards,
+only ingestion does. Everything the request
+does, including work handed to executors with `in_current_context`, then
+reads and writes that tenant's shard (see `app.db`).
+
+`cross_tenant_totals` fans one rollup query out to every shard in
+parallel and merges the per-tenant results.
+"""
+import json
+from typing import Dict, Optional, Sequence
+from urllib.parse import parse_qs
+
+from sqlalchemy import func, select
+
+from app.db import (
+    DEFAULT_TENANT,
+    InvalidTenant,
+    current_tenant,
+    fan_out,
+    get_read_engine,
+    shards,
+    tenant_exists,
+    use_tenant,
+    validate_tenant,
+)
+from app.models import Transaction
+from app.rollups import rollup_totals
+from app.versioning import get_data_version
+
+TENANT_HEADER = b"x-tenant-id"
+TENANT_PARAM = "tenant"
+
+
+def _requested_tenant(scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == TENANT_HEADER:
+            return value.decode("latin-1").strip()
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    values = query.get(TENANT_PARAM)
+    return values[-1].strip() if values else None
+
+
+class TenantMiddleware:
+    """Pure ASGI middleware routing each request to its tenant's shard."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        try:
+            tenant = validate_tenant(_requested_tenant(scope) or DEFAULT_TENANT)
+        except InvalidTenant as e:
+            return await _reject(send, 400, str(e))
+        if not tenant_exists(tenant):
+            return await _reject(send, 404, f"Unknown tenant {tenant!r}")
+
+        with use_tenant(tenant):
+            await self.app(scope, receive, send)
+
+
+async def _reject(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def tenant_summary() -> dict:
+    """Per-tenant data version and row counts, read from every shard in parallel."""
+
+    def summarize() -> dict:
+        # From the table itself: rollups skip rows without a date
+        with get_read_engine().connect() as conn:
+            rows = conn.execute(select(func.count()).select_from(Transaction.__table__)).scalar()
+        return {"data_version": get_data_version(), "transactions": rows}
+
+    results, errors = fan_out(summarize)
+    return {
+        "current": current_tenant(),
+        "tenants": [{"tenant": t, **results[t]} for t in sorted(results)],
+        "failed": errors,
+        "engines": shards.stats(),
+    }
+
+
+def cross_tenant_totals(
+    group_by: Sequence[str],
+    type: Optional[str] = None,
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+    tenants: Optional[Sequence[str]] = None,
+) -> dict:
+    """
+    Totals per group across tenants: `rollup_totals` runs on every shard
+    in parallel, then groups with the same key are summed. Each group
+    keeps its per-tenant breakdown; shards that failed are listed under
+    `failed` instead of failing the aggregate.
+    """
+    results, errors = fan_out(
+        lambda: rollup_totals(group_by, type=type, source=source, category=category, year=year),
+        tenants=tenants,
+    )
+
+    merged: Dict[tuple, dict] = {}
+    for tenant in sorted(results):
+        for key, total, rows in results[tenant]:
+            group = merged.setdefault(key, {"total": 0.0, "transactions": 0, "by_tenant": {}})
+            group["total"] += total
+            group["transactions"] += rows
+            group["by_tenant"][tenant] = round(total, 2)
+
+    groups = [
+        {"key": dict(zip(group_by, key)), **group, "total": round(group["total"], 2)}
+        for key, group in sorted(merged.items(), key=lambda kv: -abs(kv[1]["total"]))
+    ]
+    return {
+        "group_by": list(group_by),
+        "tenants": sorted(results),
+        "failed": errors,
+        "groups": groups,
+    }
+
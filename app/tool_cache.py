@@ -0,0 +1,181 @@
+"""
+Result cache for agent tool calls, plus a per-run record of those calls.
+
+Agents repeat themselves: the same `sql_query` or `forecast_arima` call is
+often issued several times in one run, and the same SQL recurs across
+users. `cached_tool(name, key)` memoizes a tool function on
+
+    (tool, canonical arguments, tenant, data version)
+
+where SQL is canonicalized first (`canonical_sql`: comments dropped,
+whitespace collapsed, keywords and identifiers lowercased, numeric
+literals normalized; quoted strings and identifiers are kept verbatim,
+since comparisons are case-sensitive and SQLite may read `"x"` as a
+string). Entries live in a `SizedCache` bounded by `TOOL_CACHE_BYTES`
+(size = length of the JSON encoding, cost = the measured call time). Errors, raised or returned as `{"error": ...}`, are
+never cached, and a new data version drops that tenant's entries.
+
+Every call, cached or not, is also appended to the calling run's record
+(`start_capture` / `captured_calls`), which is what `query_agent` logs, so
+concurrent requests never see each other's SQL or results.
+"""
+import contextvars
+import copy
+import functools
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.cache import SizedCache
+from app.db import current_tenant
+from app.telemetry import count
+from app.versioning import get_data_version
+
+TOOL_CACHE_BYTES = int(os.getenv("TOOL_CACHE_BYTES", str(64 * 2**20)))
+TOOL_CACHE_MAX_ENTRY_BYTES = int(os.getenv("TOOL_CACHE_MAX_ENTRY_BYTES", str(2 * 2**20)))
+
+SQL_TOKEN_RE = re.compile(
+    r"""(?P<comment>--[^\n]*|/\*.*?\*/)
+      |(?P<string>'(?:[^']|'')*')
+      |(?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+      |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+      |(?P<op><>|!=|==|<=|>=|\|\||\S)
+      |(?P<space>\s+)""",
+    re.VERBOSE | re.DOTALL,
+)
+OPERATOR_ALIASES = {"!=": "<>", "==": "="}
+
+_calls: contextvars.ContextVar[Optional[List[dict]]] = contextvars.ContextVar("tool_calls", default=None)
+
+
+def canonical_sql(sql: str) -> str:
+    """Whitespace, case and literal-spelling insensitive form of `sql` (for cache keys only)."""
+    tokens = []
+    for match in SQL_TOKEN_RE.finditer(sql.strip().rstrip(";")):
+        kind, value = match.lastgroup, match.group()
+        if kind in ("comment", "space"):
+            continue
+        if kind == "word":
+            value = value.lower()
+        elif kind == "number":
+            if re.fullmatch(r"\d+", value):
+                value = str(int(value))
+            else:
+                value = repr(float(value))
+        elif kind == "op":
+            value = OPERATOR_ALIASES.get(value, value)
+        tokens.append(value)
+    return " ".join(tokens).rstrip(" ;")
+
+
+def _size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))  # e.g. Timestamp dict keys
+
+
+class ToolResultCache:
+    def __init__(self, max_bytes: int = TOOL_CACHE_BYTES, max_entry_bytes: int = TOOL_CACHE_MAX_ENTRY_BYTES):
+        self._cache = SizedCache(max_bytes, max_entry_bytes)
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}  # tenant -> data version last seen
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _check_version(self, tenant: str, version: int):
+        with self._lock:
+            seen = self._versions.get(tenant)
+            if version != seen:
+                if seen is not None:
+                    self._cache.discard_where(lambda key: key[2] == tenant)
+                self._versions[tenant] = version
+
+    def lookup(self, tool: str, key: tuple, version: int) -> Any:
+        tenant = current_tenant()
+        self._check_version(tenant, version)
+        value = self._cache.get((tool, key, tenant, version))
+        with self._lock:
+            counters = self.misses if value is None else self.hits
+            counters[tool] = counters.get(tool, 0) + 1
+        count("tool_cache_miss" if value is None else "tool_cache_hit", tool=tool)
+        return value
+
+    def store(self, tool: str, key: tuple, version: int, value: Any, seconds: float):
+        self._cache.put((tool, key, current_tenant(), version), value, _size(value), seconds)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            tools = {}
+            for tool in sorted(self.hits.keys() | self.misses.keys()):
+                hits, misses = self.hits.get(tool, 0), self.misses.get(tool, 0)
+                tools[tool] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4)}
+        return {**self._cache.stats(), "data_version": self._versions.get(current_tenant()), "tools": tools}
+
+
+tool_cache = ToolResultCache()
+
+
+def start_capture() -> contextvars.Token:
+    """Begin recording tool calls for the current run (see `captured_calls`)."""
+    return _calls.set([])
+
+
+def captured_calls() -> List[dict]:
+    """Calls made since `start_capture` in this context: `{"tool", "sql", "result", "cached"}`."""
+    return list(_calls.get() or [])
+
+
+def end_capture(token: contextvars.Token):
+    _calls.reset(token)
+
+
+def _record(tool: str, sql: Optional[str], result: Any, cached: bool):
+    # LangChain runs tools in a copy of the caller's context: the list is shared, a new one would not be
+    calls = _calls.get()
+    if calls is not None:
+        calls.append({"tool": tool, "sql": sql, "result": result, "cached": cached})
+
+
+def cached_tool(name: str, key: Callable[..., tuple], sql_arg: Optional[str] = "sql"):
+    """
+    Memoize a tool function in `tool_cache`. `key(*args, **kwargs)` returns
+    the hashable cache key (canonicalize SQL inside it); `sql_arg` names the
+    argument recorded as the call's SQL. Apply under `instrumented_tool`.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            sql = kwargs.get(sql_arg) if sql_arg else None
+            if sql is None and sql_arg and args:
+                sql = args[0] if isinstance(args[0], str) else None
+            version = get_data_version()
+            cache_key = key(*args, **kwargs)
+            hit = tool_cache.lookup(name, cache_key, version)
+            if hit is not None:
+                result = copy.deepcopy(hit)
+                _record(name, sql, result, cached=True)
+                return result
+
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                _record(name, sql, {"error": str(e)}, cached=False)
+                raise
+            if not (isinstance(result, dict) and "error" in result):
+                tool_cache.store(name, cache_key, version, copy.deepcopy(result), time.perf_counter() - start)
+            _record(name, sql, result, cached=False)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -1,32 +1,31 @@
+from typing import List, Optional
+
 from langchain_core.tools import tool
 from sqlalchemy import text
-from app.db import SessionLocal
+from app import forecasting
+from app.db import read_engine
+from app.rollups import monthly_series, year_month_index
+from app.telemetry import instrumented_tool
+from app.tool_cache import cached_tool, canonical_sql
 import pandas as pd
-from statsmodels.tsa.arima.model import ARIMA
-
 
-@tool
-def forecast_arima(sql: str, horizon: int, target: str) -> dict:
-    """Fetch data with SQL and run an ARIMA forecast.
 
-    Args:
-        sql: SQL query with a time column and a numeric target column.
-        horizon: Number of future periods to predict.
-        target: The column name to forecast (e.g. 'revenue').
-    """
-    db = SessionLocal()
-    try:
-        rows = db.execute(text(sql)).fetchall()
-        df = pd.DataFrame([dict(r._mapping) for r in rows])
-    finally:
-        db.close()
+def _series_from_sql(sql: str, target: str):
+    """Build a monthly series from custom SQL (first column = date or YYYYMM)."""
+    with read_engine.connect() as conn:
+        result = conn.execute(text(sql))
+        df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
 
     if df.empty:
-        return {"error": "No data returned for forecast"}
+        return None
 
-    # Assume first column is date/time
+    # Assume first column is date/time (or an integer year_month key)
     date_col = df.columns[0]
-    df[date_col] = pd.to_datetime(df[date_col])
+    if pd.api.types.is_numeric_dtype(df[date_col]):
+        df = df.dropna(subset=[date_col])
+        df[date_col] = year_month_index(df[date_col].astype(int))
+    else:
+        df[date_col] = pd.to_datetime(df[date_col])
 
     # --- FIX: aggregate duplicates by month ---
     df = df.groupby(pd.Grouper(key=date_col, freq="M")).sum().sort_index()
@@ -34,15 +33,57 @@ def forecast_arima(sql: str, horizon: int, target: str) -> dict:
     # Ensure continuous monthly frequency
     df = df.asfreq("M", fill_value=0)
 
-    # Forecast target series
     if target not in df.columns:
-        return {"error": f"Target column '{target}' not found in data"}
+        raise KeyError(target)
+    return df[target].astype(float)
+
+
+@tool
+@instrumented_tool("forecast_arima")
+@cached_tool(
+    "forecast_arima",
+    key=lambda horizon, target="revenue", source=None, category=None, sql=None: (
+        horizon, target, source, category, canonical_sql(sql) if sql else None,
+    ),
+)
+def forecast_arima(
+    horizon: int,
+    target: str = "revenue",
+    source: Optional[str] = None,
+    category: Optional[str] = None,
+    sql: Optional[str] = None,
+) -> dict:
+    """Run an ARIMA forecast on a monthly series (model orders are selected automatically for rollup series).
 
-    series = df[target].astype(float)
+    By default the series is read from the pre-aggregated `monthly_rollups`
+    table, so no SQL is needed for revenue/expense/profit forecasts.
+
+    Args:
+        horizon: Number of future months to predict.
+        target: Transaction type to forecast ('revenue', 'expense' or 'profit').
+            When `sql` is given, the column name to forecast instead.
+        source: Optional source filter ('quickbooks' or 'rootfi').
+        category: Optional category filter.
+        sql: Optional custom SQL with a time column (date or YYYYMM) first and
+            a numeric `target` column. Only use it for series the rollups
+            cannot express; such series use the default ARIMA order.
+    """
+    if sql:
+        try:
+            series = _series_from_sql(sql, target)
+        except KeyError:
+            return {"error": f"Target column '{target}' not found in data"}
+        # Ad-hoc SQL has no stable identity: no order search, nothing persisted
+        series_key = None
+    else:
+        series = monthly_series(target, source=source, category=category)
+        series_key = f"{target}|{source or ''}|{category or ''}"
+
+    if series is None or series.empty:
+        return {"error": "No data returned for forecast"}
 
     try:
-        model = ARIMA(series, order=(1, 1, 1))
-        fitted = model.fit()
+        fitted = forecasting.fit_arima(series, series_key=series_key)
         forecast = fitted.forecast(steps=horizon)
     except Exception as e:
         return {"error": f"ARIMA failed: {str(e)}"}
@@ -50,4 +91,36 @@ def forecast_arima(sql: str, horizon: int, target: str) -> dict:
     history = series.tail(6).to_dict()
     future = {f"t+{i+1}": float(val) for i, val in enumerate(forecast)}
 
-    return {"history": history, "forecast": future}
+    return {"history": history, "forecast": future, "model": forecasting.describe_model(fitted)}
+
+
+@tool
+@instrumented_tool("forecast_batch")
+@cached_tool(
+    "forecast_batch",
+    key=lambda group_by, horizon, type=None, source=None: (tuple(group_by), horizon, type, source),
+    sql_arg=None,
+)
+def forecast_batch(
+    group_by: List[str],
+    horizon: int,
+    type: Optional[str] = None,
+    source: Optional[str] = None,
+) -> dict:
+    """Forecast every monthly series of a grouping at once, in parallel.
+
+    Use this instead of calling forecast_arima repeatedly, e.g. to forecast
+    each expense category: group_by=["category"], type="expense".
+
+    Args:
+        group_by: Grouping columns, any of 'category', 'source', 'type'.
+        horizon: Number of future months to predict.
+        type: Transaction type filter; required unless grouping by 'type'.
+        source: Optional source filter ('quickbooks' or 'rootfi').
+    """
+    if type is None and "type" not in group_by:
+        return {"error": "Pass `type` or include 'type' in group_by"}
+    try:
+        return forecasting.batch_forecast(group_by, horizon, type=type, source=source)
+    except ValueError as e:
+        return {"error": str(e)}
@@ -1,13 +1,192 @@
-from langchain_core.tools import tool
-from sqlalchemy import text
-from app.db import SessionLocal
+"""
+`sql_query` agent tool with an execution guard.
 
-@tool
-def sql_query(sql: str) -> list[dict]:
-    """Execute a read-only SQL query on the `transactions` table and return results as a list of dicts."""
-    db = SessionLocal()
+Every statement the model writes goes through the same checks before its
+rows reach the prompt:
+
+- only a single read-only `SELECT`/`WITH` statement over the allow-listed
+  tables is accepted; SQLite's authorizer enforces this at prepare time
+- `EXPLAIN QUERY PLAN` is inspected for full scans of tables larger than
+  `SQL_FULL_SCAN_MAX_ROWS`. Scans that can stop early are rewritten with a
+  `LIMIT`; scans that must read the whole table (aggregates, sorts) are
+  rejected with a hint to use `monthly_rollups` or indexed filters
+- a progress handler interrupts statements running past `SQL_TIMEOUT`
+- at most `SQL_MAX_ROWS` rows are fetched; results above `SQL_RETURN_ROWS`
+  are summarized (row count, per-column stats and a sample) instead of
+  being returned verbatim
+
+Rejections raise `ToolException`, which the agent sees as the tool output
+and can correct, rather than failing the whole run. Successful results
+are memoized per canonical SQL and data version (`app.tool_cache`).
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Union
+
+from langchain_core.tools import ToolException, tool
+
+from app.db import current_tenant, read_engine
+from app.telemetry import instrumented_tool
+from app.tool_cache import cached_tool, canonical_sql
+from app.versioning import get_data_version
+
+SQL_TIMEOUT = float(os.getenv("SQL_TIMEOUT", "5"))
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "1000"))
+SQL_RETURN_ROWS = int(os.getenv("SQL_RETURN_ROWS", "100"))
+SQL_FULL_SCAN_MAX_ROWS = int(os.getenv("SQL_FULL_SCAN_MAX_ROWS", "100000"))
+SUMMARY_SAMPLE_ROWS = 10
+PROGRESS_INTERVAL = 1000  # SQLite VM instructions between deadline checks
+
+ALLOWED_TABLES = {"transactions", "monthly_rollups"}
+ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+STATEMENT_RE = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+AGGREGATE_RE = re.compile(r"\b(sum|count|avg|min|max|total|group_concat)\s*\(|\bgroup\s+by\b|\bdistinct\b", re.IGNORECASE)
+ALIAS_RE = re.compile(r"\b(?:from|join)\s+(\w+)(?:\s+(?:as\s+)?(?!where|join|on|group|order|limit|inner|left|cross|natural)(\w+))?", re.IGNORECASE)
+SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+_table_rows: Dict[tuple, int] = {}
+_table_rows_lock = threading.Lock()
+
+
+class QueryRejected(ToolException):
+    """The statement is not allowed or would be too expensive to run."""
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    if action not in ALLOWED_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    # CTE references are reported without a database name
+    if action == sqlite3.SQLITE_READ and db_name is not None and arg1 not in ALLOWED_TABLES:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+def _check_statement(sql: str) -> str:
+    sql = sql.strip().rstrip(";").strip()
+    if not STATEMENT_RE.match(sql):
+        raise QueryRejected("Only read-only SELECT (or WITH ... SELECT) statements are allowed.")
+    return sql
+
+
+def _table_size(conn: sqlite3.Connection, table: str) -> int:
+    key = (current_tenant(), get_data_version(), table)
+    with _table_rows_lock:
+        if key in _table_rows:
+            return _table_rows[key]
+    count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    with _table_rows_lock:
+        _table_rows[key] = count
+    return count
+
+
+def _check_plan(conn: sqlite3.Connection, sql: str) -> str:
+    """Reject or bound full scans of large tables; returns the SQL to execute."""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    aliases = {}
+    for table, alias in ALIAS_RE.findall(sql):
+        aliases[table.lower()] = table.lower()
+        if alias:
+            aliases[alias.lower()] = table.lower()
+
+    large_scans = []
+    for detail in plan:
+        match = SCAN_RE.match(detail)
+        table = aliases.get(match.group(1).lower()) if match else None
+        if table in ALLOWED_TABLES and _table_size(conn, table) > SQL_FULL_SCAN_MAX_ROWS:
+            large_scans.append(table)
+    if not large_scans:
+        return sql
+
+    streamable = not AGGREGATE_RE.search(sql) and not any("TEMP B-TREE" in d for d in plan)
+    if streamable:
+        # The scan stops as soon as enough rows were produced
+        return f"SELECT * FROM ({sql}) LIMIT {SQL_MAX_ROWS + 1}"
+    raise QueryRejected(
+        f"Query would scan all rows of {', '.join(sorted(set(large_scans)))} "
+        f"(more than {SQL_FULL_SCAN_MAX_ROWS} rows). Aggregate from monthly_rollups "
+        "or filter on indexed columns (type, source, category, date, year_month)."
+    )
+
+
+def _summarize(columns: List[str], rows: List[tuple]) -> Dict[str, Any]:
+    stats = {}
+    for i, name in enumerate(columns):
+        values = [row[i] for row in rows if row[i] is not None]
+        col: Dict[str, Any] = {"nulls": len(rows) - len(values)}
+        numbers = [v for v in values if isinstance(v, (int, float))]
+        if values and len(numbers) == len(values):
+            col.update(
+                min=min(numbers),
+                max=max(numbers),
+                mean=round(sum(numbers) / len(numbers), 2),
+                sum=round(sum(numbers), 2),
+            )
+        else:
+            counts: Dict[Any, int] = {}
+            for v in values:
+                counts[v] = counts.get(v, 0) + 1
+            top = sorted(counts.items(), key=lambda kv: -kv[1])[:5]
+            col.update(distinct=len(counts), top=[{"value": v, "count": n} for v, n in top])
+        stats[name] = col
+    return stats
+
+
+def run_guarded(sql: str) -> Union[List[dict], dict]:
+    """Execute `sql` under the guard; see the module docstring."""
+    sql = _check_statement(sql)
+    rewritten = sql
+    raw = read_engine.raw_connection()
+    conn: sqlite3.Connection = raw.driver_connection
+    deadline = time.monotonic() + SQL_TIMEOUT
+    conn.set_authorizer(_authorize)
+    conn.set_progress_handler(lambda: int(time.monotonic() > deadline), PROGRESS_INTERVAL)
     try:
-        rows = db.execute(text(sql)).fetchall()
-        return [dict(r._mapping) for r in rows]
+        rewritten = _check_plan(conn, sql)
+        cursor = conn.execute(rewritten)
+        rows = cursor.fetchmany(SQL_MAX_ROWS + 1)
+        columns = [c[0] for c in cursor.description or []]
+        cursor.close()
+    except sqlite3.ProgrammingError as e:
+        raise QueryRejected(f"Statement not allowed: {e}")
+    except sqlite3.DatabaseError as e:
+        if "interrupted" in str(e):
+            raise QueryRejected(f"Query exceeded the {SQL_TIMEOUT:g}s time limit; narrow it or use monthly_rollups.")
+        if "not authorized" in str(e) or "prohibited" in str(e):
+            raise QueryRejected(f"Statement not allowed: only reads of {', '.join(sorted(ALLOWED_TABLES))} are permitted.")
+        raise ToolException(f"SQL error: {e}")
     finally:
-        db.close()
+        conn.set_authorizer(None)
+        conn.set_progress_handler(None, 0)
+        raw.close()
+
+    truncated = len(rows) > SQL_MAX_ROWS
+    rows = rows[:SQL_MAX_ROWS]
+    if not truncated and len(rows) <= SQL_RETURN_ROWS:
+        return [dict(zip(columns, row)) for row in rows]
+
+    return {
+        "summary": True,
+        "row_count": len(rows),
+        "truncated": truncated,
+        "row_limit": SQL_MAX_ROWS,
+        "rewritten": rewritten != sql,
+        "columns": _summarize(columns, rows),
+        "sample": [dict(zip(columns, row)) for row in rows[:SUMMARY_SAMPLE_ROWS]],
+    }
+
+
+@tool
+@instrumented_tool("sql_query")
+@cached_tool("sql_query", key=lambda sql: (canonical_sql(sql),))
+def sql_query(sql: str) -> Union[List[dict], dict]:
+    """Execute a read-only SQL query on the `transactions` or `monthly_rollups` tables and return results as a list of dicts.
+
+    Large results come back as a summary dict (row_count, truncated, per-column stats, sample rows): aggregate in SQL instead of selecting raw rows.
+    """
+    return run_guarded(sql)
+
+
+sql_query.handle_tool_error = True
@@ -0,0 +1,33 @@
+from sqlalchemy import select, update, insert
+from sqlalchemy.engine import Connection
+
+from app.db import read_engine
+from app.models import DataVersion
+
+_table = DataVersion.__table__
+
+
+def get_data_version() -> int:
+    """
+    Return the global data version (0 before the first ingestion).
+
+    Caches in other layers key their entries on this value, so anything
+    computed from `transactions` is invalidated as soon as it changes.
+    """
+    with read_engine.connect() as conn:
+        version = conn.execute(
+            select(_table.c.version).where(_table.c.id == 1)
+        ).scalar()
+    return version or 0
+
+
+def bump_data_version(conn: Connection) -> int:
+    """Increment the data version inside the caller's transaction."""
+    updated = conn.execute(
+        update(_table).where(_table.c.id == 1).values(version=_table.c.version + 1)
+    )
+    if updated.rowcount == 0:
+        conn.execute(insert(_table).values(id=1, version=1))
+    return conn.execute(
+        select(_table.c.version).where(_table.c.id == 1)
+    ).scalar()
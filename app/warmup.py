@@ -0,0 +1,51 @@
+"""
+Background pre-warm after startup.
+
+The server accepts traffic as soon as the database is validated; building
+the agent runtime, warming the answer cache, checking the columnar
+snapshot and importing pandas, LangChain, statsmodels and matplotlib
+happen on a daemon thread
+instead. A request that arrives first simply does the same work itself
+(every step is lazy and thread-safe), so pre-warm only moves the cost off
+the critical path.
+"""
+import os
+import time
+import threading
+from typing import Optional
+
+from app.logger import logger
+
+PREWARM = os.getenv("PREWARM", "1") == "1"
+
+_thread: Optional[threading.Thread] = None
+
+
+def prewarm():
+    from app import forecasting, plot_utils
+    from app.answer_cache import answer_cache
+    from app.llm import init_runtime
+    from app.snapshot import ensure_snapshot
+
+    start = time.perf_counter()
+    steps = (
+        ("runtime", init_runtime),
+        ("answer cache", answer_cache.warm_from_logs),
+        ("snapshot", ensure_snapshot),
+        ("forecasting", forecasting.prewarm),
+        ("plotting", plot_utils.prewarm),
+    )
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            logger.warning("Pre-warm step '%s' failed: %s", name, str(e))
+    logger.info("Pre-warm finished in %.2fs", time.perf_counter() - start)
+
+
+def start_prewarm():
+    """Run `prewarm` on a daemon thread (once); a no-op when `PREWARM=0`."""
+    global _thread
+    if _thread is None and PREWARM:
+        _thread = threading.Thread(target=prewarm, name="prewarm", daemon=True)
+        _thread.start()
@@ -0,0 +1,282 @@
+# benchmarks/run.py
+"""
+Benchmark suite (`make bench`).
+
+Generates synthetic QuickBooks/RootFi files (`benchmarks.synthetic`) in a
+temp directory, points the app at a fresh database there and measures:
+
+- `ingest`: bulk ingestion throughput of both sources, the snapshot build
+  and an unchanged re-run (manifest skip)
+- `data_raw`: `/data/raw` page latency (plain and filtered) and CSV export
+  throughput
+- `forecast`: uncached ARIMA fit time on the revenue series and a batch
+  forecast per category
+- `plot`: PNG/SVG chart render time
+- `query`: `/query` latency with the offline fake LLM and the app overhead
+  around it (`total_ms - llm_ms` from `timings=true`)
+
+Results are written as JSON (`benchmarks/results/<timestamp>-<commit>.json`
+by default) with the commit and scale, so runs can be diffed:
+
+    python -m benchmarks.run --years 5 --accounts 2000
+    python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from statistics import median
+
+from benchmarks.synthetic import write_datasets
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO, "benchmarks", "results")
+QUESTIONS = [
+    "What was the total profit in Q1?",
+    "Show me revenue trends for 2024",
+    "Which expense category had the highest increase this year?",
+    "Forecast revenue for the next 3 months",
+]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 2)
+
+
+def latency_stats(values_ms) -> dict:
+    return {
+        "n": len(values_ms),
+        "p50_ms": percentile(values_ms, 0.50),
+        "p95_ms": percentile(values_ms, 0.95),
+        "p99_ms": percentile(values_ms, 0.99),
+    }
+
+
+def timed_ms(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_ingest(data_dir: str) -> dict:
+    from app.db import init_db
+    from app.snapshot import ensure_snapshot
+    from scripts.load_data import DEFAULT_BATCH_SIZE, ingest_file, iter_quickbooks_rows, iter_rootfi_rows
+
+    init_db()
+    sources = (
+        ("quickbooks", os.path.join(data_dir, "data_set_1.json"), iter_quickbooks_rows),
+        ("rootfi", os.path.join(data_dir, "data_set_2.json"), iter_rootfi_rows),
+    )
+    result, total_rows, total_s = {}, 0, 0.0
+    for source, path, reader in sources:
+        start = time.perf_counter()
+        rows = ingest_file(source, path, reader, DEFAULT_BATCH_SIZE, force=True)
+        elapsed = time.perf_counter() - start
+        result[source] = {
+            "rows": rows,
+            "file_mb": round(os.path.getsize(path) / 2**20, 1),
+            "seconds": round(elapsed, 3),
+            "rows_per_s": round(rows / elapsed),
+        }
+        total_rows += rows
+        total_s += elapsed
+    result["total"] = {"rows": total_rows, "seconds": round(total_s, 3), "rows_per_s": round(total_rows / total_s)}
+    result["snapshot_s"] = round(timed_ms(ensure_snapshot) / 1000, 3)
+    result["unchanged_rerun_ms"] = round(
+        sum(timed_ms(ingest_file, source, path, reader, DEFAULT_BATCH_SIZE) for source, path, reader in sources), 2
+    )
+    return result
+
+
+def bench_data_raw(client, requests: int) -> dict:
+    from app.db import read_engine
+    from sqlalchemy import text
+
+    with read_engine.connect() as conn:
+        max_id = conn.execute(text("SELECT MAX(id) FROM transactions")).scalar() or 0
+        total = conn.execute(text("SELECT COUNT(*) FROM transactions")).scalar()
+
+    rng = random.Random(0)
+    pages, filtered = [], []
+    for _ in range(requests):
+        params = {"limit": 100, "after_id": rng.randrange(max(1, max_id))}
+        pages.append(timed_ms(client.get, "/data/raw", params=params))
+        year = rng.choice(range(2020, 2025))
+        params = {"limit": 100, "type": "expense", "date_from": f"{year}-01-01", "date_to": f"{year}-12-31"}
+        filtered.append(timed_ms(client.get, "/data/raw", params=params))
+
+    start = time.perf_counter()
+    with client.stream("GET", "/data/raw", params={"format": "csv"}) as response:
+        nbytes = sum(len(chunk) for chunk in response.iter_bytes())
+    elapsed = time.perf_counter() - start
+    return {
+        "page": latency_stats(pages),
+        "filtered_page": latency_stats(filtered),
+        "csv_export": {"rows": total, "mb": round(nbytes / 2**20, 1), "rows_per_s": round(total / elapsed)},
+    }
+
+
+def bench_forecast(repeats: int) -> dict:
+    from app import forecasting
+    from app.rollups import monthly_series
+
+    series = monthly_series("revenue")
+    fits = []
+    for _ in range(repeats):
+        forecasting.clear_cache()
+        fits.append(timed_ms(forecasting.fit_arima, series))
+
+    start = time.perf_counter()
+    batch = forecasting.batch_forecast(["category"], 3, type="revenue")
+    batch_ms = (time.perf_counter() - start) * 1000
+    forecasting.shutdown_pool()
+    return {
+        "months": len(series),
+        "fit_ms": round(median(fits), 2),
+        "batch": {"series": len(batch["series"]), "failed": batch["failed"], "ms": round(batch_ms, 2)},
+    }
+
+
+def bench_plot(repeats: int) -> dict:
+    from app.plot_utils import forecast_data, render_chart
+
+    series, forecast, _ = forecast_data(3)
+    return {
+        f"{fmt}_ms": round(median(timed_ms(render_chart, series, forecast, 3, fmt, 640, 480) for _ in range(repeats)), 2)
+        for fmt in ("png", "svg")
+    }
+
+
+def bench_query(client, repeats: int) -> dict:
+    totals, llm, overhead, errors = [], [], [], 0
+    for _ in range(repeats):
+        for question in QUESTIONS:
+            response = client.get("/query", params={"q": question, "cache": "false", "timings": "true"})
+            body = response.json()
+            if response.status_code != 200 or "timings" not in body:
+                errors += 1
+                continue
+            timings = body["timings"]
+            totals.append(timings["total_ms"])
+            llm.append(timings.get("llm_ms", 0.0))
+            overhead.append(timings["total_ms"] - timings.get("llm_ms", 0.0))
+    return {
+        "total": latency_stats(totals),
+        "llm_p50_ms": percentile(llm, 0.50),
+        "overhead": latency_stats(overhead),
+        "errors": errors,
+    }
+
+
+def run_suite(args) -> dict:
+    results = {}
+    data_dir = os.path.join(os.getcwd(), "data")
+    start = time.perf_counter()
+    write_datasets(data_dir, args.years, args.accounts, seed=args.seed)
+    results["generate_s"] = round(time.perf_counter() - start, 3)
+    print(f"generated {args.years}y x {args.accounts} accounts in {results['generate_s']}s", flush=True)
+
+    results["ingest"] = bench_ingest(data_dir)
+    print(f"ingest   {json.dumps(results['ingest']['total'])}", flush=True)
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        results["data_raw"] = bench_data_raw(client, args.requests)
+        print(f"data_raw {json.dumps(results['data_raw']['page'])}", flush=True)
+        results["forecast"] = bench_forecast(args.repeats)
+        print(f"forecast {json.dumps(results['forecast'])}", flush=True)
+        results["plot"] = bench_plot(args.repeats)
+        print(f"plot     {json.dumps(results['plot'])}", flush=True)
+        results["query"] = bench_query(client, args.repeats)
+        print(f"query    {json.dumps(results['query']['overhead'])}", flush=True)
+    return results
+
+
+def flatten(tree: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline_path}):")
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    for key in sorted(old.keys() & new.keys()):
+        if old[key]:
+            print(f"  {key:<40} {old[key]:>12} -> {new[key]:>12} {100 * (new[key] - old[key]) / old[key]:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite on synthetic data")
+    parser.add_argument("--years", type=int, default=5, help="Months of history = years * 12")
+    parser.add_argument("--accounts", type=int, default=2000, help="Accounts per source")
+    parser.add_argument("--requests", type=int, default=200, help="/data/raw requests per variant")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetitions for fits, renders and /query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to print relative changes against")
+    args = parser.parse_args()
+
+    # Offline model with no artificial latency: /query measures the app, not the LLM
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+    os.environ["LOG_COMPACT_INTERVAL"] = "0"
+
+    commit = git_commit()
+    started = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # before any app import: the engine resolves ./financial.db on creation
+        results = run_suite(args)
+        os.chdir(REPO)
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "started_at": started.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": {"years": args.years, "accounts": args.accounts, "seed": args.seed},
+            "requests": args.requests,
+            "repeats": args.repeats,
+        },
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{started:%Y%m%dT%H%M%S}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {out}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# benchmarks/synthetic.py
+"""
+Synthetic source datasets at configurable scale.
+
+Writes a QuickBooks `ProfitAndLoss` report (`data_set_1.json`: one Money
+column per month, accounts nested in `Rows`/`Row` sections with
+`Header`/`Summary` totals) and a RootFi export (`data_set_2.json`: one
+entry per month with nested `line_items`) in the same shapes as the real
+files, so `scripts/load_data.py` ingests them unchanged.
+
+Each account has its own level, trend and seasonality, so monthly series
+are forecastable; a share of cells is left empty (QuickBooks) or zero
+(RootFi) like real exports. Output is deterministic for a given seed and
+is written one top-level section / period at a time.
+
+    python -m benchmarks.synthetic --years 5 --accounts 2000 --out /tmp/bench-data
+"""
+import os
+import math
+import json
+import random
+import argparse
+import calendar
+from datetime import date
+from typing import Dict, Iterator, List, Tuple
+
+QUICKBOOKS_FILE = "data_set_1.json"
+ROOTFI_FILE = "data_set_2.json"
+
+# (group, title, share of accounts) for the QuickBooks report sections
+QB_GROUPS = (
+    ("Income", "Income", 0.30),
+    ("COGS", "Cost of Goods Sold", 0.15),
+    ("Expenses", "Expenses", 0.45),
+    ("OtherExpenses", "Other Expenses", 0.10),
+)
+# (key, title, share of accounts) for the RootFi sections
+ROOTFI_SECTIONS = (
+    ("revenue", "Business Revenue", 0.30),
+    ("cost_of_goods_sold", "Cost of Products Sold", 0.15),
+    ("operating_expenses", "Business Expenses", 0.45),
+    ("non_operating_revenue", "Auxiliary Revenue", 0.05),
+    ("non_operating_expenses", "Other Charges", 0.05),
+)
+FANOUT = 8  # children per nested section / line item
+
+
+def month_range(start_year: int, months: int) -> List[Tuple[date, date]]:
+    periods = []
+    for i in range(months):
+        y, m = start_year + i // 12, i % 12 + 1
+        periods.append((date(y, m, 1), date(y, m, calendar.monthrange(y, m)[1])))
+    return periods
+
+
+class Account:
+    """Monthly amount model: level * trend * seasonality * noise, with gaps."""
+
+    def __init__(self, rng: random.Random, name: str, sparsity: float):
+        self.name = name
+        self.level = rng.lognormvariate(8, 1.2)
+        self.trend = rng.uniform(-0.01, 0.03)
+        self.season = rng.uniform(0, 0.3)
+        self.phase = rng.uniform(0, 2 * math.pi)
+        self.sparsity = sparsity
+
+    def amounts(self, rng: random.Random, months: int) -> List[float]:
+        values = []
+        for t in range(months):
+            if rng.random() < self.sparsity:
+                values.append(0.0)
+                continue
+            value = self.level * (1 + self.trend) ** t
+            value *= 1 + self.season * math.sin(2 * math.pi * t / 12 + self.phase)
+            value *= rng.uniform(0.85, 1.15)
+            if rng.random() < 0.02:
+                value = -value  # refunds / reversals
+            values.append(round(value, 2))
+        return values
+
+
+def _split(n: int, shares) -> List[int]:
+    counts = [int(n * share) for *_, share in shares]
+    counts[0] += n - sum(counts)
+    return counts
+
+
+def _chunks(items: list, parts: int) -> Iterator[list]:
+    size = math.ceil(len(items) / parts)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# --- QuickBooks ---
+def _qb_cells(values: List[float]) -> List[Dict]:
+    return [{"value": f"{v:.2f}" if v else ""} for v in values]
+
+
+def _qb_rows(rng, accounts: List[Account], months: int, prefix: str, depth: int) -> Tuple[List[Dict], List[float]]:
+    """Data rows (nested into sub-sections when there are many) and their column totals."""
+    totals = [0.0] * months
+    rows = []
+    if len(accounts) <= FANOUT or depth >= 3:
+        for account in accounts:
+            values = account.amounts(rng, months)
+            totals = [a + b for a, b in zip(totals, values)]
+            rows.append({
+                "ColData": [{"value": account.name, "id": str(rng.randrange(10**6))}, *_qb_cells(values), {"value": f"{sum(values):.2f}"}],
+                "type": "Data",
+            })
+        return rows, totals
+
+    for i, chunk in enumerate(_chunks(accounts, FANOUT)):
+        name = f"{prefix}_group_{depth}_{i}"
+        child_rows, child_totals = _qb_rows(rng, chunk, months, name, depth + 1)
+        totals = [a + b for a, b in zip(totals, child_totals)]
+        rows.append(_qb_section(name, child_rows, child_totals))
+    return rows, totals
+
+
+def _qb_section(title: str, rows: List[Dict], totals: List[float], group: str = None) -> Dict:
+    section = {
+        "Header": {"ColData": [{"value": title}] + [{"value": ""}] * (len(totals) + 1)},
+        "Rows": {"Row": rows},
+        "Summary": {"ColData": [{"value": f"Total {title}"}, *({"value": f"{v:.2f}"} for v in totals), {"value": f"{sum(totals):.2f}"}]},
+        "type": "Section",
+    }
+    if group:
+        section["group"] = group
+    return section
+
+
+def write_quickbooks(path: str, accounts: int, months: int, start_year: int = 2020, seed: int = 1, sparsity: float = 0.2):
+    rng = random.Random(seed)
+    periods = month_range(start_year, months)
+    columns = [{"ColTitle": "", "ColType": "Account", "MetaData": [{"Name": "ColKey", "Value": "account"}]}]
+    for start, end in periods:
+        title = start.strftime("%b %Y")
+        columns.append({
+            "ColTitle": title,
+            "ColType": "Money",
+            "MetaData": [
+                {"Name": "StartDate", "Value": start.isoformat()},
+                {"Name": "EndDate", "Value": end.isoformat()},
+                {"Name": "ColKey", "Value": title},
+            ],
+        })
+    columns.append({"ColTitle": "Total", "ColType": "Money", "MetaData": [{"Name": "ColKey", "Value": "total"}]})
+    header = {
+        "Time": f"{periods[-1][1].isoformat()}T00:00:00-07:00",
+        "ReportName": "ProfitAndLoss",
+        "ReportBasis": "Accrual",
+        "StartPeriod": periods[0][0].isoformat(),
+        "EndPeriod": periods[-1][1].isoformat(),
+        "SummarizeColumnsBy": "Month",
+        "Currency": "USD",
+        "Option": [{"Name": "AccountingStandard", "Value": "GAAP"}, {"Name": "NoReportData", "Value": "false"}],
+    }
+
+    with open(path, "w") as f:
+        f.write(f'{{"data": {{"Header": {json.dumps(header)}, "Columns": {{"Column": {json.dumps(columns)}}}, "Rows": {{"Row": [')
+        for i, ((group, title, _), n) in enumerate(zip(QB_GROUPS, _split(accounts, QB_GROUPS))):
+            members = [Account(rng, f"{group.lower()}_account_{j}", sparsity) for j in range(n)]
+            rows, totals = _qb_rows(rng, members, months, group.lower(), 0)
+            f.write((", " if i else "") + json.dumps(_qb_section(title, rows, totals, group)))
+        f.write("]}}}")
+
+
+# --- RootFi ---
+def _line_items(names: List[Tuple[str, int]], values: Dict[int, float], prefix: str, depth: int) -> Tuple[List[Dict], float]:
+    """Nested line items over (name, account index) leaves and their total."""
+    if len(names) <= FANOUT or depth >= 3:
+        items = [{"name": name, "value": values[idx], "account_id": str(10**12 + idx)} for name, idx in names]
+        return items, round(sum(i["value"] for i in items), 2)
+    items, total = [], 0.0
+    for i, chunk in enumerate(_chunks(names, FANOUT)):
+        name = f"{prefix} {depth}.{i}"
+        children, subtotal = _line_items(chunk, values, name, depth + 1)
+        items.append({"name": name, "value": subtotal, "line_items": children})
+        total += subtotal
+    return items, round(total, 2)
+
+
+def write_rootfi(path: str, accounts: int, months: int, start_year: int = 2020, seed: int = 2, sparsity: float = 0.3):
+    rng = random.Random(seed)
+    periods = month_range(start_year, months)
+    models = [Account(rng, f"Account {j}", sparsity) for j in range(accounts)]
+    series = [account.amounts(rng, months) for account in models]
+
+    layout, offset = [], 0
+    for (key, title, _), n in zip(ROOTFI_SECTIONS, _split(accounts, ROOTFI_SECTIONS)):
+        layout.append((key, title, [(models[j].name, j) for j in range(offset, offset + n)]))
+        offset += n
+
+    with open(path, "w") as f:
+        f.write('{"data": [')
+        for t, (start, end) in enumerate(periods):
+            values = {j: abs(s[t]) for j, s in enumerate(series)}
+            entry = {
+                "rootfi_id": 100000 + t,
+                "rootfi_created_at": f"{end.isoformat()}T00:00:00.000Z",
+                "rootfi_updated_at": f"{end.isoformat()}T00:00:00.000Z",
+                "rootfi_deleted_at": None,
+                "rootfi_company_id": 1,
+                "platform_id": f"{start.isoformat()}_{end.isoformat()}",
+                "platform_unique_id": None,
+                "currency_id": None,
+                "period_end": end.isoformat(),
+                "period_start": start.isoformat(),
+            }
+            totals = {}
+            for key, title, names in layout:
+                children, total = _line_items(names, values, title, 0)
+                entry[key] = [{"name": title, "value": total, "line_items": children}]
+                totals[key] = total
+            entry["gross_profit"] = round(totals["revenue"] - totals["cost_of_goods_sold"], 2)
+            entry["operating_profit"] = round(entry["gross_profit"] - totals["operating_expenses"], 2)
+            entry["earnings_before_taxes"] = round(
+                entry["operating_profit"] + totals["non_operating_revenue"] - totals["non_operating_expenses"], 2
+            )
+            entry["taxes"] = None
+            entry["net_profit"] = entry["earnings_before_taxes"]
+            entry["custom_fields"] = None
+            entry["updated_at"] = entry["rootfi_updated_at"]
+            f.write((", " if t else "") + json.dumps(entry))
+        f.write("]}")
+
+
+def write_datasets(out_dir: str, years: int = 5, accounts: int = 2000, start_year: int = 2020, seed: int = 42) -> Dict[str, str]:
+    """Write both source files into `out_dir` (load_data's `--data-dir` layout); return their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    months = years * 12
+    paths = {"quickbooks": os.path.join(out_dir, QUICKBOOKS_FILE), "rootfi": os.path.join(out_dir, ROOTFI_FILE)}
+    write_quickbooks(paths["quickbooks"], accounts, months, start_year, seed)
+    write_rootfi(paths["rootfi"], accounts, months, start_year, seed + 1)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic QuickBooks and RootFi source files")
+    parser.add_argument("--years", type=int, default=5, help="Months of history = years * 12")
+    parser.add_argument("--accounts", type=int, default=2000, help="Accounts per source")
+    parser.add_argument("--start-year", type=int, default=2020)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench-data", help="Output directory")
+    args = parser.parse_args()
+
+    for source, path in write_datasets(args.out, args.years, args.accounts, args.start_year, args.seed).items():
+        print(f"{source:<11} {path} {os.path.getsize(path) / 2**20:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
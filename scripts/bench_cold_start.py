@@ -0,0 +1,103 @@
+# scripts/bench_cold_start.py
+"""
+Cold-start benchmark: `import app.main` time and time to the first `/health`.
+
+Each trial runs in a fresh process against a temp copy of `financial.db`
+(and `data/`, `snapshots/`), so the real database is never touched:
+
+- `import`: wall time of `import app.main` in a new interpreter
+- `health`: from spawning the server to the first `200` from `/health`;
+  `--cmd` picks what is spawned, e.g. the old container command that
+  re-ran ingestion before uvicorn
+
+    python -m scripts.bench_cold_start --trials 5
+    python -m scripts.bench_cold_start --cmd "python -m scripts.load_data && python -m uvicorn app.main:app --port {port}"
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+
+import httpx
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CMD = "{python} -m uvicorn app.main:app --host 127.0.0.1 --port {port} --log-level warning"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare(workdir: str):
+    src = sqlite3.connect(os.path.join(REPO, "financial.db"))
+    dst = sqlite3.connect(os.path.join(workdir, "financial.db"))
+    src.backup(dst)
+    dst.close()
+    src.close()
+    shutil.copytree(os.path.join(REPO, "data"), os.path.join(workdir, "data"))  # keeps mtimes, like COPY
+    if os.path.isdir(os.path.join(REPO, "snapshots")):
+        shutil.copytree(os.path.join(REPO, "snapshots"), os.path.join(workdir, "snapshots"))
+
+
+def import_time(env: dict, workdir: str) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_to_health(cmd: str, env: dict, workdir: str, timeout: float = 120) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd.format(python=sys.executable, port=port), shell=True, cwd=workdir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("no healthy response before the timeout")
+    finally:
+        os.killpg(proc.pid, 15)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first /health")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--cmd", default=DEFAULT_CMD, help="Server command; {python} and {port} are substituted")
+    parser.add_argument("--llm-provider", default="fake", help="LLM_PROVIDER for the spawned app (default: fake)")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONPATH": REPO, "LLM_PROVIDER": args.llm_provider, "LOG_COMPACT_INTERVAL": "0"}
+    imports, health = [], []
+    for _ in range(args.trials):
+        with tempfile.TemporaryDirectory() as tmp:
+            prepare(tmp)
+            imports.append(import_time(env, tmp))
+            health.append(time_to_health(args.cmd, env, tmp))
+    print(json.dumps({
+        "trials": args.trials,
+        "cmd": args.cmd,
+        "import_s": {"median": round(median(imports), 3), "min": round(min(imports), 3)},
+        "first_health_s": {"median": round(median(health), 3), "min": round(min(health), 3)},
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# scripts/bench_concurrency.py
+"""
+Concurrent read/write stress benchmark for the SQLite layer.
+
+Copies `financial.db` to a temp directory and, for a fixed duration, runs
+at the same time:
+
+- reader threads doing what tools, forecasts and plots do (guarded agent
+  SQL, `monthly_series`, `get_data_version`) on the read-only pool
+- logger threads recording `query_logs` entries as fast as they can
+- one ingester repeatedly replacing a block of rows in one transaction
+
+Each configuration runs in a fresh subprocess, since the pragmas are read
+at import time. The default matrix compares the old setup (rollback
+journal, `synchronous=FULL`, one commit per log entry) against WAL with
+the batched log writer:
+
+    python -m scripts.bench_concurrency --seconds 10 --readers 8 --loggers 4
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+
+CONFIGS = {
+    "legacy": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "BENCH_LOG_MODE": "direct"},
+    "wal": {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL", "BENCH_LOG_MODE": "direct"},
+    "wal+batched": {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL", "BENCH_LOG_MODE": "batched"},
+}
+INGEST_BLOCK = 5000
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def run_child(seconds: float, readers: int, loggers: int) -> dict:
+    """Run one configuration in this process (cwd holds the database copy)."""
+    from sqlalchemy import insert
+
+    from app.db import engine, init_db
+    from app.llm import log_query
+    from app.log_writer import query_log_writer
+    from app.models import QueryLog, Transaction
+    from app.rollups import monthly_series
+    from app.tools.sql_tool import run_guarded
+    from app.versioning import get_data_version
+
+    init_db()
+    log_mode = os.environ["BENCH_LOG_MODE"]
+    stop = threading.Event()
+    read_lat, log_lat, ingest_lat = [], [], []
+    errors = {"read": 0, "log": 0, "ingest": 0}
+    reads = [
+        lambda: run_guarded("SELECT type, SUM(total_amount) FROM monthly_rollups GROUP BY type"),
+        lambda: run_guarded("SELECT category, SUM(amount) FROM transactions WHERE type = 'expense' GROUP BY category"),
+        lambda: monthly_series("revenue"),
+        get_data_version,
+    ]
+
+    def reader(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                rng.choice(reads)()
+                read_lat.append(time.perf_counter() - start)
+            except Exception:
+                errors["read"] += 1
+
+    def logger_thread(seed):
+        n = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                if log_mode == "batched":
+                    log_query(f"bench question {seed}-{n}", "", "bench", {"n": n}, "report")
+                else:
+                    with engine.begin() as conn:
+                        conn.execute(insert(QueryLog.__table__).values(question=f"bench question {seed}-{n}", tool="bench", report="report"))
+                log_lat.append(time.perf_counter() - start)
+            except Exception:
+                errors["log"] += 1
+            n += 1
+
+    def ingester():
+        rng = random.Random(0)
+        rows = [
+            {"date": None, "year_month": 209901, "source": "bench", "type": "expense", "category": f"c{i % 50}", "amount": rng.uniform(1, 100)}
+            for i in range(INGEST_BLOCK)
+        ]
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(Transaction.__table__.delete().where(Transaction.source == "bench"))
+                    conn.execute(insert(Transaction.__table__), rows)
+                ingest_lat.append(time.perf_counter() - start)
+            except Exception:
+                errors["ingest"] += 1
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=logger_thread, args=(i,)) for i in range(loggers)]
+    threads.append(threading.Thread(target=ingester))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    flush_start = time.perf_counter()
+    query_log_writer.stop()
+    with engine.begin() as conn:
+        conn.execute(Transaction.__table__.delete().where(Transaction.source == "bench"))
+
+    return {
+        "reads_per_sec": round(len(read_lat) / seconds, 1),
+        "read_p50_ms": percentile(read_lat, 0.50),
+        "read_p95_ms": percentile(read_lat, 0.95),
+        "read_p99_ms": percentile(read_lat, 0.99),
+        "logs_per_sec": round(len(log_lat) / seconds, 1),
+        "log_p99_ms": percentile(log_lat, 0.99),
+        "ingest_txns": len(ingest_lat),
+        "ingest_p50_ms": percentile(ingest_lat, 0.50),
+        "final_log_flush_ms": round((time.perf_counter() - flush_start) * 1000, 2),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read/write SQLite stress benchmark")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--loggers", type=int, default=4)
+    parser.add_argument("--db", default="financial.db", help="Database to copy for each run")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help=f"Subset of {', '.join(CONFIGS)}")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.seconds, args.readers, args.loggers)))
+        return
+
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for name in args.configs.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy(args.db, os.path.join(tmp, "financial.db"))
+            env = {**os.environ, **CONFIGS[name], "PYTHONPATH": repo, "LLM_PROVIDER": "fake"}
+            out = subprocess.run(
+                [sys.executable, "-m", "scripts.bench_concurrency", "--child",
+                 "--seconds", str(args.seconds), "--readers", str(args.readers), "--loggers", str(args.loggers)],
+                cwd=tmp, env=env, capture_output=True, text=True, check=True,
+            )
+            results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{name:<12} {json.dumps(results[name])}", flush=True)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# scripts/bench_export.py
+"""
+Throughput benchmark for `/data/raw` reads and exports, in rows/sec.
+
+Builds a synthetic `transactions` table in a temp directory and walks it
+end to end with the legacy path (ORM objects + `as_dict` + one JSON body),
+keyset-paginated JSON pages, and the NDJSON / CSV / Arrow streaming
+encoders. Peak RSS is printed after each mode: the streaming modes should
+not move it. With `--url`, the same exports are also streamed over HTTP
+from a running server.
+
+    python -m scripts.bench_export --rows 1000000
+    python -m scripts.bench_export --url http://localhost:8000
+"""
+import os
+import gc
+import json
+import time
+import argparse
+import resource
+import tempfile
+
+STREAM_FORMATS = ("ndjson", "csv", "arrow")
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def build_db(rows: int):
+    from app.db import engine, init_db
+    from scripts.bench_indexes import synthetic_rows
+    from scripts.load_data import bulk_insert
+
+    init_db()
+    with engine.begin() as conn:
+        bulk_insert(
+            conn,
+            ((d, int(d[:4] + d[5:7]), s, t, c, a) for d, s, t, c, a in synthetic_rows(rows)),
+        )
+
+
+def report(mode: str, rows: int, nbytes: int, elapsed: float):
+    print(
+        f"{mode:<14} {rows:>10} rows {elapsed:8.2f}s {rows / elapsed:>12,.0f} rows/s "
+        f"{nbytes / elapsed / 1e6:8.1f} MB/s  peak RSS {peak_rss_mb():8.1f} MB",
+        flush=True,
+    )
+
+
+def bench_local(page_size: int, skip_legacy: bool):
+    from app.db import SessionLocal
+    from app.export import COLUMNS, RawFilter, export_rows, fetch_page
+    from app.models import Transaction
+
+    if not skip_legacy:
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            body = json.dumps({"transactions": [r.as_dict() for r in db.query(Transaction).all()]})
+        finally:
+            db.close()
+        report("legacy-orm", body.count('"id"'), len(body), time.perf_counter() - start)
+        del body
+        gc.collect()
+
+    start, rows, nbytes, after = time.perf_counter(), 0, 0, 0
+    while after is not None:
+        page = fetch_page(COLUMNS, RawFilter(after_id=after), page_size)
+        nbytes += len(json.dumps(page))
+        rows += len(page["transactions"])
+        after = page["next_after_id"]
+    report("json-pages", rows, nbytes, time.perf_counter() - start)
+
+    for fmt in STREAM_FORMATS:
+        start, nbytes = time.perf_counter(), 0
+        for chunk in export_rows(fmt, COLUMNS, RawFilter()):
+            nbytes += len(chunk)
+        report(fmt, rows, nbytes, time.perf_counter() - start)
+
+
+def bench_http(url: str):
+    import httpx
+
+    with httpx.Client(timeout=None) as client:
+        for fmt in STREAM_FORMATS:
+            start, nbytes, rows = time.perf_counter(), 0, 0
+            with client.stream("GET", f"{url}/data/raw", params={"format": fmt}) as resp:
+                resp.raise_for_status()
+                for chunk in resp.iter_bytes():
+                    nbytes += len(chunk)
+                    if fmt != "arrow":
+                        rows += chunk.count(b"\n")
+            if fmt == "csv":
+                rows -= 1  # header
+            label = f"http-{fmt}"
+            if fmt == "arrow":
+                print(f"{label:<14} {nbytes / 1e6:10.1f} MB {time.perf_counter() - start:8.2f}s", flush=True)
+            else:
+                report(label, rows, nbytes, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /data/raw pagination and streaming exports")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic rows for the local benchmark")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the load-everything ORM baseline")
+    parser.add_argument("--url", help="Also stream exports from a running server at this base URL")
+    args = parser.parse_args()
+
+    if args.url:
+        bench_http(args.url.rstrip("/"))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # before any app import: the engine resolves ./financial.db on creation
+        start = time.perf_counter()
+        build_db(args.rows)
+        print(f"built {args.rows} rows in {time.perf_counter() - start:.1f}s", flush=True)
+        bench_local(args.page_size, args.skip_legacy)
+
+
+if __name__ == "__main__":
+    main()
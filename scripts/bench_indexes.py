@@ -0,0 +1,166 @@
+# scripts/bench_indexes.py
+"""
+Before/after benchmark for the typed-date + composite-index migration.
+
+Builds a synthetic `transactions` table in the pre-migration shape (string
+`date`, index on `id` only), times the queries the forecast/plot paths and
+typical agent SQL run, applies `app.migrations.run_migrations` and times
+the equivalent queries against the new columns and indexes.
+
+    python -m scripts.bench_indexes --rows 2000000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import calendar
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from app.migrations import run_migrations
+from app.models import Base
+
+LEGACY_DDL = [
+    """
+    CREATE TABLE transactions (
+        id INTEGER NOT NULL PRIMARY KEY,
+        date VARCHAR, source VARCHAR, type VARCHAR, category VARCHAR, amount FLOAT
+    )
+    """,
+    "CREATE INDEX ix_transactions_id ON transactions (id)",
+]
+
+CATEGORY = "category_7"
+
+
+def synthetic_rows(n: int, seed: int = 42, categories: int = 500):
+    rng = random.Random(seed)
+    months = [(y, m) for y in range(2019, 2026) for m in range(1, 13)]
+    for _ in range(n):
+        y, m = rng.choice(months)
+        if rng.random() < 0.5:
+            source, date = "quickbooks", f"{y:04d}-{m:02d}-01"
+        else:
+            last = calendar.monthrange(y, m)[1]
+            source, date = "rootfi", f"{y:04d}-{m:02d}-{last:02d}"
+        t_type = rng.choices(("revenue", "expense", "profit"), (0.45, 0.45, 0.1))[0]
+        yield (date, source, t_type, f"category_{rng.randrange(categories)}", round(rng.uniform(1, 1e5), 2))
+
+
+def build_legacy_db(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for ddl in LEGACY_DDL:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (date, source, type, category, amount) VALUES (?, ?, ?, ?, ?)",
+            list(synthetic_rows(rows)),
+        )
+    return engine
+
+
+def monthly_revenue_legacy(conn):
+    rows = conn.execute(text("SELECT date, amount FROM transactions WHERE type='revenue'")).fetchall()
+    df = pd.DataFrame([dict(r._mapping) for r in rows])
+    df["date"] = pd.to_datetime(df["date"])
+    return df.groupby(pd.Grouper(key="date", freq="M")).sum()
+
+
+def monthly_revenue_indexed(conn):
+    rows = conn.execute(
+        text(
+            "SELECT year_month, SUM(amount) AS amount FROM transactions "
+            "WHERE type='revenue' AND year_month IS NOT NULL GROUP BY year_month"
+        )
+    ).fetchall()
+    return pd.DataFrame([dict(r._mapping) for r in rows])
+
+
+CASES = [
+    # name, legacy callable/SQL, migrated callable/SQL
+    ("monthly_revenue_series", monthly_revenue_legacy, monthly_revenue_indexed),
+    (
+        "category_monthly_2023",
+        "SELECT substr(date, 1, 7) AS month, SUM(amount) FROM transactions "
+        f"WHERE category='{CATEGORY}' AND date >= '2023-01-01' AND date < '2024-01-01' GROUP BY month",
+        "SELECT year_month, SUM(amount) FROM transactions "
+        f"WHERE category='{CATEGORY}' AND date >= '2023-01-01' AND date < '2024-01-01' GROUP BY year_month",
+    ),
+    (
+        "source_type_quarter_total",
+        "SELECT SUM(amount) FROM transactions WHERE source='rootfi' AND type='expense' "
+        "AND date >= '2024-01-01' AND date < '2024-04-01'",
+        "SELECT SUM(amount) FROM transactions WHERE source='rootfi' AND type='expense' "
+        "AND date >= '2024-01-01' AND date < '2024-04-01'",
+    ),
+    (
+        "revenue_by_quarter_2024",
+        "SELECT (CAST(substr(date, 6, 2) AS INTEGER) + 2) / 3 AS quarter, SUM(amount) FROM transactions "
+        "WHERE type='revenue' AND date LIKE '2024-%' GROUP BY quarter",
+        "SELECT (year_month % 100 + 2) / 3 AS quarter, SUM(amount) FROM transactions "
+        "WHERE type='revenue' AND year_month BETWEEN 202401 AND 202412 GROUP BY quarter",
+    ),
+]
+
+
+def best_of(conn, case, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if callable(case):
+            case(conn)
+        else:
+            conn.execute(text(case)).fetchall()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def query_plan(conn, case) -> str:
+    if callable(case):
+        return "(pandas post-processing)"
+    plan = conn.execute(text(f"EXPLAIN QUERY PLAN {case}")).fetchall()
+    return "; ".join(r[-1] for r in plan)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Synthetic rows to generate (default: 2,000,000).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; the best time is reported.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+
+        start = time.perf_counter()
+        engine = build_legacy_db(path, args.rows)
+        print(f"Generated {args.rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+        with engine.connect() as conn:
+            before = {name: best_of(conn, legacy, args.repeat) for name, legacy, _ in CASES}
+
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            # As `init_db` does: later migrations expect the tables only create_all makes
+            Base.metadata.create_all(conn)
+            run_migrations(conn)
+        print(f"Migration took {time.perf_counter() - start:.1f}s")
+
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            after = {name: best_of(conn, migrated, args.repeat) for name, _, migrated in CASES}
+            plans = {name: query_plan(conn, migrated) for name, _, migrated in CASES}
+        engine.dispose()
+
+    print(f"\n{'query':<28}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for name, _, _ in CASES:
+        b, a = before[name] * 1000, after[name] * 1000
+        print(f"{name:<28}{b:>14.1f}{a:>14.1f}{b / a:>9.1f}x")
+    print("\nQuery plans after migration:")
+    for name, plan in plans.items():
+        print(f"- {name}: {plan}")
+
+
+if __name__ == "__main__":
+    main()
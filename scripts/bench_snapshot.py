@@ -0,0 +1,115 @@
+# scripts/bench_snapshot.py
+"""
+Load-time and peak-memory benchmark: row dicts vs the columnar snapshot.
+
+Builds a synthetic `transactions` table in a temp directory, writes its
+Arrow snapshot, then loads the full table into pandas with each method in
+a fresh subprocess (so peak RSS is not shared between methods):
+
+- `row-dicts`: `pd.DataFrame([dict(r._mapping) for r in rows])`, the old pattern
+- `tuples`: `pd.DataFrame(rows, columns=...)` from the same query
+- `snapshot`: `app.snapshot.load_transactions()` (memory-mapped, zero-copy)
+
+    python -m scripts.bench_snapshot --rows 2000000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+METHODS = ("row-dicts", "tuples", "snapshot")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_method(method: str) -> dict:
+    import pandas as pd
+    from sqlalchemy import text
+
+    from app.db import read_engine
+    from app.snapshot import load_transactions
+
+    sql = text("SELECT id, date, year_month, source, type, category, amount FROM transactions")
+    base = rss_mb()
+    start = time.perf_counter()
+    if method == "row-dicts":
+        with read_engine.connect() as conn:
+            rows = conn.execute(sql).fetchall()
+        df = pd.DataFrame([dict(r._mapping) for r in rows])
+        del rows
+    elif method == "tuples":
+        with read_engine.connect() as conn:
+            result = conn.execute(sql)
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+    else:
+        df = load_transactions()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total = float(df.groupby("type", observed=True)["amount"].sum().sum())
+    agg = time.perf_counter() - start
+    return {
+        "method": method,
+        "rows": len(df),
+        "load_s": round(elapsed, 3),
+        "groupby_s": round(agg, 4),
+        "peak_rss_delta_mb": round(peak_rss_mb() - base, 1),
+        "rss_after_mb": round(rss_mb() - base, 1),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 2**20, 1),
+        "checksum": round(total, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare row-dict and snapshot loading into pandas")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--method", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.method:
+        print(json.dumps(run_method(args.method)))
+        return
+
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": repo}
+    with tempfile.TemporaryDirectory() as tmp:
+        build = (
+            "from app.db import engine, init_db\n"
+            "from app.snapshot import build_snapshot\n"
+            "from scripts.bench_indexes import synthetic_rows\n"
+            "from scripts.load_data import bulk_insert\n"
+            "import time\n"
+            "init_db()\n"
+            "with engine.begin() as conn:\n"
+            f"    bulk_insert(conn, ((d, int(d[:4] + d[5:7]), s, t, c, a) for d, s, t, c, a in synthetic_rows({args.rows})))\n"
+            "start = time.perf_counter()\n"
+            "build_snapshot()\n"
+            "print(f'snapshot written in {time.perf_counter() - start:.2f}s')\n"
+        )
+        # The child processes open ./financial.db and ./snapshots relative to the temp dir
+        out = subprocess.run([sys.executable, "-c", build], cwd=tmp, env=env, capture_output=True, text=True, check=True)
+        print(out.stdout.strip())
+        size = os.path.getsize(os.path.join(tmp, "snapshots", "transactions-v0.arrow"))
+        print(f"snapshot size {size / 2**20:.1f} MB")
+
+        for method in METHODS:
+            out = subprocess.run(
+                [sys.executable, "-m", "scripts.bench_snapshot", "--method", method],
+                cwd=tmp, env=env, capture_output=True, text=True, check=True,
+            )
+            print(out.stdout.strip().splitlines()[-1], flush=True)
+
+
+if __name__ == "__main__":
+    main()
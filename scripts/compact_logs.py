@@ -0,0 +1,26 @@
+# scripts/compact_logs.py
+"""
+Roll `query_logs` entries older than the retention window into daily
+aggregates (`query_log_daily`) and delete them.
+
+    python -m scripts.compact_logs --days 30 [--tenant acme]
+"""
+import argparse
+
+from app.db import DEFAULT_TENANT, init_db, use_tenant
+from app.log_retention import LOG_RETENTION_DAYS, compact_logs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old query log entries into daily aggregates")
+    parser.add_argument("--days", type=float, default=LOG_RETENTION_DAYS, help="Keep entries newer than this many days")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant whose database to compact")
+    args = parser.parse_args()
+
+    with use_tenant(args.tenant):
+        init_db()
+        print(f"Compacted {compact_logs(args.days)} entries")
+
+
+if __name__ == "__main__":
+    main()
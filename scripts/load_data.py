@@ -1,13 +1,30 @@
 # scripts/load_data.py
 import os
 import json
+import time
+import hashlib
 import logging
-from typing import Any, Dict, List, Optional
+import argparse
+from datetime import date as date_type
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from app.db import SessionLocal, init_db
-from app.models import Transaction
+import ijson
+from sqlalchemy import delete, func, insert, or_, select, update
+
+from app.db import DEFAULT_TENANT, InvalidTenant, SessionLocal, engine, init_db, use_tenant, validate_tenant
+from app.models import IngestionManifest, IngestionPeriod, Transaction
+from app.rollups import refresh_rollups
+from app.snapshot import ensure_snapshot
+from app.telemetry import span, stage_summary
+from app.versioning import bump_data_version
 
 DATA_DIR = "data"
+DEFAULT_BATCH_SIZE = 5000
+
+# Column order of the plain tuples emitted by the streaming readers
+TX_COLUMNS = ("date", "year_month", "source", "type", "category", "amount")
+TxRow = Tuple[Optional[str], Optional[int], str, str, str, float]
 
 # --- Logging setup ---
 logging.basicConfig(
@@ -27,8 +44,34 @@ def safe_float(val: Any) -> Optional[float]:
         return None
 
 
+def normalize_date(val: Any) -> Tuple[Optional[str], Optional[int]]:
+    """Return (ISO date, YYYYMM key) for a source date string, or (None, None)."""
+    if not val:
+        return None, None
+    try:
+        d = date_type.fromisoformat(str(val)[:10])
+    except ValueError:
+        return None, None
+    return d.isoformat(), d.year * 100 + d.month
+
+
+def batched(rows: Iterable[TxRow], size: int) -> Iterator[List[TxRow]]:
+    """Group an iterable of rows into lists of at most `size` items."""
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def log_throughput(label: str, count: int, elapsed: float):
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    logger.info(f"{label}: {count} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+
 # --- QuickBooks Loader ---
-def load_quickbooks(path: str, db):
+def load_quickbooks(path: str, db) -> int:
     logger.info(f"Loading QuickBooks data from {path}")
 
     with open(path) as f:
@@ -43,6 +86,7 @@ def load_quickbooks(path: str, db):
             col_map[col["ColTitle"]] = meta.get("StartDate")
 
     def process_rows(rows: List[Dict]):
+        nonlocal count
         for row in rows:
             if "Rows" in row:  # Nested children
                 process_rows(row["Rows"]["Row"])
@@ -62,47 +106,55 @@ def load_quickbooks(path: str, db):
                     continue
 
                 col_title = cols[i]["ColTitle"]
-                date = col_map.get(col_title)
+                date, year_month = normalize_date(col_map.get(col_title))
                 t_type = "revenue" if amount >= 0 else "expense"
 
                 tx = Transaction(
-                    date=date,
+                    date=date_type.fromisoformat(date) if date else None,
+                    year_month=year_month,
                     source="quickbooks",
                     type=t_type,
                     category=account,
                     amount=abs(amount),
                 )
                 db.add(tx)
+                count += 1
 
+    count = 0
     rows = raw["data"]["Rows"]["Row"]
     process_rows(rows)
     db.commit()
     logger.info("✅ QuickBooks data loaded successfully")
+    return count
 
 
 # --- Rootfi Loader ---
-def load_rootfi(path: str, db):
+def load_rootfi(path: str, db) -> int:
     logger.info(f"Loading Rootfi data from {path}")
 
     with open(path) as f:
         raw = json.load(f)
 
+    count = 0
     for entry in raw["data"]:
-        date = entry.get("period_end")
+        date, year_month = normalize_date(entry.get("period_end"))
 
         def process_items(items: List[Dict], t_type: str):
+            nonlocal count
             for item in items:
                 amount = safe_float(item.get("value"))
                 if amount is None or amount == 0:
                     continue
                 tx = Transaction(
-                    date=date,
+                    date=date_type.fromisoformat(date) if date else None,
+                    year_month=year_month,
                     source="rootfi",
                     type=t_type,
                     category=item.get("name", "unknown"),
                     amount=abs(amount),
                 )
                 db.add(tx)
+                count += 1
 
                 # Recurse into nested line_items
                 if "line_items" in item and isinstance(item["line_items"], list):
@@ -116,28 +168,365 @@ def load_rootfi(path: str, db):
 
     db.commit()
     logger.info("✅ Rootfi data loaded successfully")
+    return count
+
+
+# --- Streaming readers (bulk mode) ---
+def iter_quickbooks_rows(path: str) -> Iterator[TxRow]:
+    """
+    Stream a QuickBooks ProfitAndLoss report and yield one tuple per
+    (account, month) cell, without materializing the whole report.
+    """
+    with open(path, "rb") as f:
+        cols = next(ijson.items(f, "data.Columns.Column", use_float=True), [])
+        col_dates = [(None, None)]
+        for col in cols[1:]:
+            meta = {m["Name"]: m["Value"] for m in col.get("MetaData", [])}
+            col_dates.append(
+                normalize_date(meta.get("StartDate") if col.get("ColType") == "Money" else None)
+            )
 
+        f.seek(0)
+        for col_data in _iter_leaf_coldata(f):
+            if not col_data or "value" not in col_data[0]:
+                continue
+
+            account = col_data[0]["value"]
+            for i, coldata in enumerate(col_data[1:], start=1):
+                amount = safe_float(coldata.get("value"))
+                if amount is None:
+                    continue
+
+                date, year_month = col_dates[i] if i < len(col_dates) else (None, None)
+                t_type = "revenue" if amount >= 0 else "expense"
+                yield (date, year_month, "quickbooks", t_type, account, abs(amount))
+
+
+def _iter_leaf_coldata(f) -> Iterator[List[Dict]]:
+    """
+    Yield the `ColData` array of every leaf row in the report. Section
+    headers and summaries keep theirs under `Header`/`Summary`, so only
+    arrays sitting directly on a row item are data rows.
+    """
+    builder = None
+    target = None
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if builder is None:
+            if event == "start_array" and prefix.endswith("item.ColData"):
+                builder = ijson.ObjectBuilder()
+                target = prefix
+                builder.event(event, value)
+            continue
+
+        if event == "end_array" and prefix == target:
+            builder.event(event, value)
+            yield builder.value
+            builder = None
+            continue
+
+        builder.event(event, value)
+
+
+def iter_rootfi_rows(path: str) -> Iterator[TxRow]:
+    """Stream a Rootfi export one period at a time and yield row tuples."""
+    sections = (
+        ("revenue", "revenue"),
+        ("cost_of_goods_sold", "expense"),
+        ("operating_expenses", "expense"),
+        ("other_expenses", "expense"),
+        ("net_income", "profit"),
+    )
+
+    def process_items(items: List[Dict], period: Tuple, t_type: str):
+        for item in items:
+            amount = safe_float(item.get("value"))
+            if amount is None or amount == 0:
+                continue
+            yield (*period, "rootfi", t_type, item.get("name", "unknown"), abs(amount))
+
+            # Recurse into nested line_items
+            if "line_items" in item and isinstance(item["line_items"], list):
+                yield from process_items(item["line_items"], period, t_type)
+
+    with open(path, "rb") as f:
+        for entry in ijson.items(f, "data.item", use_float=True):
+            period = normalize_date(entry.get("period_end"))
+            for key, t_type in sections:
+                yield from process_items(entry.get(key, []), period, t_type)
+
+
+def bulk_insert(conn, rows: Iterable[TxRow], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Write row tuples with a Core-level executemany, `batch_size` rows per
+    statement, so memory stays bounded by the batch rather than the file.
+    The caller owns the transaction.
+    """
+    table = Transaction.__table__
+    stmt = "INSERT INTO {} ({}) VALUES ({})".format(
+        table.name, ", ".join(TX_COLUMNS), ", ".join("?" for _ in TX_COLUMNS)
+    )
+
+    count = 0
+    for batch in batched(rows, batch_size):
+        conn.exec_driver_sql(stmt, batch)
+        count += len(batch)
+    return count
+
+
+# --- Incremental ingestion ---
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def period_digests(rows: Iterable[TxRow]) -> Dict[Optional[str], Tuple[str, int]]:
+    """Fingerprint the rows of every period (the `date` column) in one pass."""
+    hashes: Dict[Optional[str], Any] = {}
+    counts: Dict[Optional[str], int] = {}
+    for row in rows:
+        period = row[0]
+        if period not in hashes:
+            hashes[period] = hashlib.sha1()
+            counts[period] = 0
+        hashes[period].update(repr(row).encode())
+        counts[period] += 1
+    return {p: (h.hexdigest(), counts[p]) for p, h in hashes.items()}
+
+
+def _period_clause(column, periods):
+    """SQL filter matching a set of periods, where the NULL period is allowed."""
+    values = [date_type.fromisoformat(p) for p in periods if p is not None]
+    clauses = [column.in_(values)] if values else []
+    if None in periods:
+        clauses.append(column.is_(None))
+    return or_(*clauses)
+
+
+def delete_source_rows(conn, source: str, periods=None):
+    """Delete a source's rows, restricted to `periods` when given."""
+    tx = Transaction.__table__
+    stmt = delete(tx).where(tx.c.source == source)
+    if periods is not None:
+        stmt = stmt.where(_period_clause(tx.c.date, periods))
+    conn.execute(stmt)
+
+
+def write_manifest(conn, source: str, path: str, sha256: str, st: os.stat_result, digests=None):
+    """Record the file fingerprint, its row range and (optionally) period digests."""
+    tx = Transaction.__table__
+    manifest = IngestionManifest.__table__
+    periods = IngestionPeriod.__table__
+
+    row_count, first_id, last_id = conn.execute(
+        select(func.count(), func.min(tx.c.id), func.max(tx.c.id)).where(tx.c.source == source)
+    ).one()
+    values = dict(
+        path=path,
+        sha256=sha256,
+        size_bytes=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        row_count=row_count,
+        first_id=first_id,
+        last_id=last_id,
+        loaded_at=func.now(),
+    )
+    updated = conn.execute(update(manifest).where(manifest.c.source == source).values(**values))
+    if updated.rowcount == 0:
+        conn.execute(insert(manifest).values(source=source, **values))
+
+    if digests is not None:
+        conn.execute(delete(periods).where(periods.c.source == source))
+        if digests:
+            conn.execute(
+                insert(periods),
+                [
+                    {"source": source, "period": p, "digest": d, "row_count": n}
+                    for p, (d, n) in digests.items()
+                ],
+            )
+
+
+def ingest_file(source: str, path: str, row_reader, batch_size: int, force: bool = False) -> int:
+    """
+    Idempotently ingest one source file and return the number of rows written.
+
+    Unchanged files are skipped on a stat/hash check. Otherwise the file's
+    rows are fingerprinted per period and only the changed, new or removed
+    periods are rewritten, all in a single transaction that also bumps the
+    data version. Monthly rollups of the touched months are rebuilt in the
+    same transaction.
+    """
+    st = os.stat(path)
+    manifest_t = IngestionManifest.__table__
+    periods_t = IngestionPeriod.__table__
+
+    with engine.connect() as conn:
+        manifest = conn.execute(select(manifest_t).where(manifest_t.c.source == source)).first()
+        stored = {
+            r.period: (r.digest, r.row_count)
+            for r in conn.execute(select(periods_t).where(periods_t.c.source == source))
+        }
+
+    if manifest is not None and not force:
+        if (manifest.path, manifest.size_bytes, manifest.mtime_ns) == (path, st.st_size, st.st_mtime_ns):
+            logger.info(f"{source}: unchanged (size/mtime match), skipping")
+            return 0
+
+    with span("ingest_hash"):
+        sha256 = file_sha256(path)
+    if manifest is not None and not force and manifest.sha256 == sha256:
+        with engine.begin() as conn:
+            write_manifest(conn, source, path, sha256, st)
+        logger.info(f"{source}: unchanged (sha256 match), skipping")
+        return 0
+
+    with span("ingest_digest"):
+        digests = period_digests(row_reader(path))
+    if manifest is None or force:
+        replaced, to_insert = None, set(digests)
+    else:
+        changed = {p for p in digests.keys() & stored.keys() if digests[p] != stored[p]}
+        removed = stored.keys() - digests.keys()
+        added = digests.keys() - stored.keys()
+        replaced, to_insert = changed | removed, changed | added
+        logger.info(
+            f"{source}: {len(changed)} changed, {len(added)} new, "
+            f"{len(removed)} removed periods ({len(digests) - len(changed) - len(added)} unchanged)"
+        )
+
+    with engine.begin() as conn:
+        with span("ingest_write"):
+            if replaced is None:
+                delete_source_rows(conn, source)
+            elif replaced:
+                delete_source_rows(conn, source, replaced)
+
+            count = 0
+            if to_insert:
+                rows = (row for row in row_reader(path) if row[0] in to_insert)
+                count = bulk_insert(conn, rows, batch_size)
+
+        with span("ingest_rollups"):
+            if replaced is None:
+                refresh_rollups(conn, source)
+            elif replaced or to_insert:
+                refresh_rollups(conn, source, [normalize_date(p)[1] for p in replaced | to_insert])
+
+        write_manifest(conn, source, path, sha256, st, digests)
+        if replaced is None or replaced or to_insert:
+            version = bump_data_version(conn)
+            logger.info(f"{source}: data version is now {version}")
+    return count
+
+
+def reload_with_orm(source: str, path: str, orm_loader) -> int:
+    """
+    Baseline path: replace the source's rows through the ORM loader. The
+    manifest entry is dropped, so the next bulk run does a full replace.
+    """
+    manifest = IngestionManifest.__table__
+    periods = IngestionPeriod.__table__
 
-# --- Entrypoint ---
-def main():
-    logger.info("Initializing database...")
-    init_db()
     db = SessionLocal()
+    try:
+        conn = db.connection()
+        delete_source_rows(conn, source)
+        conn.execute(delete(manifest).where(manifest.c.source == source))
+        conn.execute(delete(periods).where(periods.c.source == source))
+        bump_data_version(conn)
+        count = orm_loader(path, db)  # commits everything above with the new rows
+    finally:
+        db.close()
 
-    quickbooks_path = os.path.join(DATA_DIR, "data_set_1.json")
-    rootfi_path = os.path.join(DATA_DIR, "data_set_2.json")
+    with engine.begin() as conn:
+        refresh_rollups(conn, source)
+    return count
 
-    if os.path.exists(quickbooks_path):
-        load_quickbooks(quickbooks_path, db)
-    else:
-        logger.warning("QuickBooks dataset not found")
 
-    if os.path.exists(rootfi_path):
-        load_rootfi(rootfi_path, db)
-    else:
-        logger.warning("Rootfi dataset not found")
+# --- Entrypoint ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load source datasets into the database.")
+    parser.add_argument(
+        "--mode",
+        choices=("bulk", "orm"),
+        default="bulk",
+        help=(
+            "bulk: incremental streaming ingestion with executemany (default); "
+            "orm: full reload with one Transaction object per row."
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Rows per executemany batch in bulk mode (default: {DEFAULT_BATCH_SIZE}).",
+    )
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory containing the source JSON files.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reload every file even if its fingerprint matches the manifest.",
+    )
+    parser.add_argument(
+        "--tenant",
+        default=DEFAULT_TENANT,
+        help=f"Company whose database to load (default: {DEFAULT_TENANT}); created on first use.",
+    )
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be a positive integer")
+    try:
+        validate_tenant(args.tenant)
+    except InvalidTenant as e:
+        parser.error(str(e))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with use_tenant(args.tenant):
+        load(args)
+
+
+def load(args):
+    logger.info(f"Initializing database for tenant {args.tenant}...")
+    init_db()
 
-    db.close()
+    datasets = [
+        ("quickbooks", os.path.join(args.data_dir, "data_set_1.json"), load_quickbooks, iter_quickbooks_rows),
+        ("rootfi", os.path.join(args.data_dir, "data_set_2.json"), load_rootfi, iter_rootfi_rows),
+    ]
+
+    total, total_elapsed = 0, 0.0
+    for source, path, orm_loader, row_reader in datasets:
+        if not os.path.exists(path):
+            logger.warning(f"{source} dataset not found")
+            continue
+
+        start = time.perf_counter()
+        if args.mode == "orm":
+            count = reload_with_orm(source, path, orm_loader)
+        else:
+            logger.info(f"Ingesting {source} data from {path} (batch size {args.batch_size})")
+            count = ingest_file(source, path, row_reader, args.batch_size, force=args.force)
+        elapsed = time.perf_counter() - start
+
+        log_throughput(f"{source} [{args.mode}]", count, elapsed)
+        total += count
+        total_elapsed += elapsed
+
+    log_throughput(f"Total [{args.mode}]", total, total_elapsed)
+
+    # One columnar snapshot per data version, however many sources changed
+    start = time.perf_counter()
+    with span("snapshot"):
+        ensure_snapshot()
+    logger.info(f"Snapshot ready in {time.perf_counter() - start:.2f}s")
+    for stage, stats in stage_summary().items():
+        logger.info(f"stage {stage}: {stats['count']}x, {stats['total_s']:.3f}s")
     logger.info("🎉 Data loading complete!")
 
 
@@ -0,0 +1,292 @@
+# scripts/replay_load.py
+"""
+Load replay: drive a running app with recorded traffic.
+
+Questions come from `query_logs` (most recent first, duplicates kept so the
+answer cache sees the real repeat rate) or from a file with one question
+per line. They are mixed with `/data/raw` pages and `/plot/forecast`
+renders in configurable proportions and sent with an async HTTP client,
+either open-loop at a fixed `--rate` (requests/sec, independent of how
+fast the server answers) or closed-loop with `--concurrency` workers.
+
+Per endpoint it reports p50/p95/p99 latency, throughput and error rates
+(429s are counted separately from other failures).
+
+With `--spawn` the app is started on a free port with the offline fake LLM,
+against a temp copy of the database, so the run is fully offline and does
+not add replayed rows to the real `query_logs`:
+
+    python -m scripts.replay_load --spawn --rate 20 --duration 60 --mix query=0.6,data_raw=0.3,plot=0.1
+    python -m scripts.replay_load --url http://localhost:8000 --concurrency 16 --questions questions.txt
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ("query", "data_raw", "plot")
+FALLBACK_QUESTIONS = [
+    "What was the total profit in Q1?",
+    "Show me revenue trends for 2024",
+    "Which expense category had the highest increase this year?",
+    "Compare Q1 and Q2 performance",
+]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}' (expected one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs at least one positive weight")
+    return mix
+
+
+def load_questions(db_path: str, path: Optional[str], limit: int) -> List[str]:
+    if path:
+        with open(path) as f:
+            return [line.strip() for line in f if line.strip()]
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT question FROM query_logs WHERE NOT error AND question IS NOT NULL ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"could not read query_logs from {db_path}: {e}", file=sys.stderr)
+        rows = []
+    return [r[0] for r in rows] or FALLBACK_QUESTIONS
+
+
+class Replay:
+    def __init__(self, client: httpx.AsyncClient, questions: List[str], mix: Dict[str, float], no_cache: bool, seed: int):
+        self.client = client
+        self.questions = questions
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.no_cache = no_cache
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def next_request(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == "query":
+            params = {"q": self.rng.choice(self.questions)}
+            if self.no_cache:
+                params["cache"] = "false"
+            return name, "/query", params
+        if name == "data_raw":
+            params = {"limit": self.rng.choice((10, 100, 500))}
+            if self.rng.random() < 0.5:
+                params["type"] = self.rng.choice(("revenue", "expense"))
+            if self.rng.random() < 0.5:
+                year = self.rng.choice(range(2020, 2026))
+                params.update(date_from=f"{year}-01-01", date_to=f"{year}-12-31")
+            return name, "/data/raw", params
+        return name, "/plot/forecast", {"horizon": self.rng.randint(1, 12)}
+
+    async def send(self, name: str, path: str, params: dict):
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(path, params=params)
+            await response.aread()
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][status] += 1
+
+    async def open_loop(self, rate: float, duration: float, max_inflight: int):
+        """Send at `rate` req/s on a fixed schedule; skip (and count) sends when `max_inflight` are pending."""
+        tasks = set()
+        start = time.perf_counter()
+        i = 0
+        while True:
+            due = start + i / rate
+            if due - start >= duration:
+                break
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            name, path, params = self.next_request()
+            if len(tasks) >= max_inflight:
+                self.statuses[name]["skipped"] += 1
+            else:
+                task = asyncio.create_task(self.send(name, path, params))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            i += 1
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def closed_loop(self, concurrency: int, duration: float):
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self.send(*self.next_request())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in self.names:
+            statuses = dict(self.statuses.get(name, {}))
+            sent = sum(n for status, n in statuses.items() if status != "skipped")
+            ok = sum(n for status, n in statuses.items() if status.startswith("2") or status == "304")
+            lat = self.latencies.get(name, [])
+            endpoints[name] = {
+                "requests": sent,
+                "throughput_rps": round(sent / elapsed, 2),
+                "p50_ms": percentile(lat, 0.50),
+                "p95_ms": percentile(lat, 0.95),
+                "p99_ms": percentile(lat, 0.99),
+                "error_rate": round((sent - ok) / sent, 4) if sent else None,
+                "rejected_429": statuses.get("429", 0),
+                "skipped": statuses.get("skipped", 0),
+                "statuses": statuses,
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {"elapsed_s": round(elapsed, 2), "requests": total, "throughput_rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_app(db_path: str, workdir: str, port: int, fake_latency: float) -> subprocess.Popen:
+    """Start uvicorn with the fake LLM in `workdir`, on a copy of `db_path`."""
+    if os.path.exists(db_path):
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(os.path.join(workdir, "financial.db"))
+        src.backup(dst)  # consistent copy even while the WAL is in use
+        dst.close()
+        src.close()
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(fake_latency),
+        "LOG_COMPACT_INTERVAL": "0",
+    }
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"app exited during startup, see {log.name}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("app did not become healthy within 60s")
+
+
+def print_report(report: dict):
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s ({report['throughput_rps']} req/s)")
+    print(f"{'endpoint':<10} {'reqs':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8} {'429':>6} {'skipped':>8}")
+    for name, e in report["endpoints"].items():
+        error_rate = f"{100 * e['error_rate']:.1f}%" if e["error_rate"] is not None else "-"
+        print(
+            f"{name:<10} {e['requests']:>7} {e['throughput_rps']:>8} {e['p50_ms'] or '-':>9} {e['p95_ms'] or '-':>9} "
+            f"{e['p99_ms'] or '-':>9} {error_rate:>8} {e['rejected_429']:>6} {e['skipped']:>8}"
+        )
+
+
+async def replay(args, base_url: str, questions: List[str]) -> dict:
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        runner = Replay(client, questions, args.mix, args.no_cache, args.seed)
+        start = time.perf_counter()
+        if args.rate:
+            await runner.open_loop(args.rate, args.duration, args.max_inflight)
+        else:
+            await runner.closed_loop(args.concurrency, args.duration)
+        return runner.report(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded questions and mixed traffic against the API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running app, e.g. http://localhost:8000")
+    target.add_argument("--spawn", action="store_true", help="Start the app with the fake LLM on a temp copy of --db")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, help="Open loop: requests per second")
+    load.add_argument("--concurrency", type=int, default=8, help="Closed loop: concurrent workers (default 8)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (default 30)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("query=0.6,data_raw=0.3,plot=0.1"),
+                        help="Endpoint weights (default query=0.6,data_raw=0.3,plot=0.1)")
+    parser.add_argument("--db", default="financial.db", help="Database to read query_logs from (and to copy with --spawn)")
+    parser.add_argument("--questions", help="File with one question per line, instead of query_logs")
+    parser.add_argument("--limit", type=int, default=1000, help="Most recent query_logs questions to replay")
+    parser.add_argument("--no-cache", action="store_true", help="Send cache=false so every question runs the agent")
+    parser.add_argument("--fake-latency", type=float, default=0.5, help="Seconds per fake LLM call with --spawn")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Cap on pending requests / connections")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    questions = load_questions(args.db, args.questions, args.limit)
+    print(f"{len(questions)} questions ({len(set(questions))} distinct); mix {args.mix}", flush=True)
+
+    workdir, proc = None, None
+    base_url = args.url
+    try:
+        if args.spawn:
+            workdir = tempfile.mkdtemp(prefix="replay-")
+            port = free_port()
+            proc = spawn_app(os.path.abspath(args.db), workdir, port, args.fake_latency)
+            base_url = f"http://127.0.0.1:{port}"
+            print(f"app started at {base_url} (fake LLM, {args.fake_latency}s per call)", flush=True)
+        report = asyncio.run(replay(args, base_url.rstrip("/"), questions))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report["mode"] = {"rate": args.rate} if args.rate else {"concurrency": args.concurrency}
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
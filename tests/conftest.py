@@ -0,0 +1,51 @@
+"""
+Shared fixtures: the app runs offline (`LLM_PROVIDER=fake`) against a
+database loaded from `data/` in a temporary working directory, so
+`./financial.db`, `./tenants/`, `./snapshots/` and `./logs/` never touch
+the checkout.
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["FAKE_LLM_LATENCY"] = "0"
+os.environ["LOG_COMPACT_INTERVAL"] = "0"
+
+_workdir = None
+
+
+def pytest_configure(config):
+    # Before any app import: engines resolve ./financial.db against the working directory
+    global _workdir
+    _workdir = tempfile.mkdtemp(prefix="kudwa-tests-")
+    os.chdir(_workdir)
+
+
+def pytest_unconfigure(config):
+    os.chdir(REPO)
+    if _workdir is not None:
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def loaded_db():
+    from scripts.load_data import load, parse_args
+
+    load(parse_args(["--data-dir", os.path.join(REPO, "data")]))
+    return _workdir
+
+
+@pytest.fixture(scope="session")
+def client(loaded_db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from sqlalchemy import update
+
+from app import batch_jobs
+from app.api import query as query_api
+from app.batch_jobs import BatchRunner
+from app.db import engine
+from tests.test_query_executor import wait_for
+
+QUESTIONS = ["What was the total profit in Q1?", "Show me revenue trends for 2024", "Summarize our cash position"]
+
+
+def use_runner(monkeypatch, **options) -> BatchRunner:
+    runner = BatchRunner(**options)
+    monkeypatch.setattr(query_api, "batch_runner", runner)
+    return runner
+
+
+def stalled_runner(monkeypatch, **options) -> BatchRunner:
+    """A runner that admits jobs but never runs them, like a process that died right after submitting."""
+    runner = use_runner(monkeypatch, **options)
+    monkeypatch.setattr(runner, "_enqueue", lambda *args: None)
+    return runner
+
+
+def expire_leases(job_id: str, **values):
+    stale = batch_jobs._now() - timedelta(minutes=5)
+    with engine.begin() as conn:
+        conn.execute(
+            update(batch_jobs._items).where(batch_jobs._items.c.job_id == job_id).values(heartbeat_at=stale, **values)
+        )
+
+
+def test_submitted_job_reports_progress_until_done(client, monkeypatch):
+    runner = use_runner(monkeypatch, workers=2)
+
+    response = client.post("/query/batch", json={"questions": QUESTIONS})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["total"] == 3 and job["queued"] + job["running"] + job["done"] == 3
+
+    wait_for(lambda: client.get(f"/query/jobs/{job['id']}", params={"items": "false"}).json()["status"] == "done", 15)
+    done = client.get(f"/query/jobs/{job['id']}").json()
+
+    assert done["done"] == 3 and done["progress"] == 1.0
+    assert [item["question"] for item in done["items"]] == QUESTIONS
+    assert all(item["report"] for item in done["items"])
+    assert runner.stats()["answered"] == 3
+
+
+def test_full_queue_returns_429_with_computed_retry_after(client, monkeypatch):
+    runner = stalled_runner(monkeypatch, workers=2, max_pending=3)
+    runner._avg_run = 4.0
+
+    assert client.post("/query/batch", json={"questions": QUESTIONS}).status_code == 202
+    response = client.post("/query/batch", json={"questions": QUESTIONS[:2]})
+
+    assert response.status_code == 429
+    # 2 of the 3 pending questions must finish, at 4s each on 2 workers
+    assert response.headers["Retry-After"] == "4"
+
+
+def test_resume_takes_over_only_expired_leases(client, monkeypatch):
+    dead = stalled_runner(monkeypatch)
+    job = dead.submit(QUESTIONS[:2])
+    live = BatchRunner(workers=1, lease=30)
+
+    # The submitting runner still holds a fresh lease
+    assert live.resume() == 0
+
+    expire_leases(job["id"])
+    with engine.begin() as conn:
+        conn.execute(
+            update(batch_jobs._items)
+            .where(batch_jobs._items.c.job_id == job["id"], batch_jobs._items.c.position == 0)
+            .values(status="running", attempts=1)
+        )
+
+    assert live.resume() == 2
+    wait_for(lambda: batch_jobs.get_job(job["id"], include_items=False)["status"] == "done", 15)
+    items = batch_jobs.get_job(job["id"])["items"]
+    assert [item["status"] for item in items] == ["done", "done"]
+    assert [item["attempts"] for item in items] == [2, 1]
+    live.shutdown()
+
+
+def test_expired_runner_does_not_overwrite_the_new_owners_answer(client, monkeypatch):
+    dead = stalled_runner(monkeypatch)
+    job = dead.submit(QUESTIONS[:1])
+    expire_leases(job["id"])
+    live = BatchRunner(workers=1, lease=30)
+    assert live.resume() == 1
+    wait_for(lambda: batch_jobs.get_job(job["id"], include_items=False)["status"] == "done", 15)
+
+    # The old runner wakes up and tries to run the question it had queued
+    dead._execute(job["id"], 0, QUESTIONS[0], True)
+
+    item = batch_jobs.get_job(job["id"])["items"][0]
+    assert item["attempts"] == 1
+    assert dead.answered == 0
+    live.shutdown()
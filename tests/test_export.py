@@ -0,0 +1,45 @@
+import io
+from datetime import date
+
+import pyarrow as pa
+import pytest
+
+from app.export import COLUMNS, RawFilter, export_rows, iter_batches
+
+
+def arrow_rows(columns, where, limit=None):
+    table = pa.ipc.open_stream(io.BytesIO(b"".join(export_rows("arrow", columns, where, limit)))).read_all()
+    return [tuple(row[c] for c in columns) for row in table.to_pylist()]
+
+
+def sql_rows(columns, where, limit=None):
+    rows = [list(row) for batch in iter_batches(columns, where, limit) for row in batch]
+    if "date" in columns:
+        i = columns.index("date")
+        for row in rows:
+            row[i] = date.fromisoformat(row[i]) if row[i] else None
+    return [tuple(row) for row in rows]
+
+
+@pytest.mark.parametrize(
+    "columns, where, limit",
+    [
+        (list(COLUMNS), RawFilter(), None),
+        (list(COLUMNS), RawFilter(after_id=500), 100),
+        (["id", "date", "amount"], RawFilter(type="expense", date_from=date(2024, 1, 1), date_to=date(2024, 12, 31)), None),
+        (list(COLUMNS), RawFilter(source="rootfi", date_to=date(2023, 6, 30)), None),
+        (list(COLUMNS), RawFilter(category="no such category"), None),
+    ],
+)
+def test_arrow_export_from_snapshot_matches_the_database(columns, where, limit):
+    rows = arrow_rows(columns, where, limit)
+    assert rows == sql_rows(columns, where, limit)
+
+
+def test_arrow_export_keeps_unknown_values_null(client):
+    response = client.get("/data/raw", params={"format": "arrow"})
+    table = pa.ipc.open_stream(io.BytesIO(response.content)).read_all()
+
+    assert table.schema.field("source").type == pa.string()
+    assert table.schema.field("date").type == pa.date32()
+    assert table.column("date").null_count == table.column("year_month").null_count
@@ -0,0 +1,23 @@
+from app.model_selection import list_models
+from app.tools.forecast_tool import forecast_arima
+
+MONTHLY_REVENUE_SQL = (
+    "SELECT year_month, SUM(total_amount) AS revenue FROM monthly_rollups "
+    "WHERE type = 'revenue' AND source = 'rootfi' GROUP BY year_month"
+)
+
+
+def test_custom_sql_series_use_the_default_order_and_are_not_persisted():
+    before = {m["series_key"] for m in list_models()}
+
+    result = forecast_arima.invoke({"horizon": 3, "target": "revenue", "sql": MONTHLY_REVENUE_SQL})
+
+    assert len(result["forecast"]) == 3
+    assert result["model"] == "ARIMA(1,1,1)"
+    assert {m["series_key"] for m in list_models()} == before
+
+
+def test_rollup_series_get_a_persisted_model():
+    forecast_arima.invoke({"horizon": 3, "target": "expense", "source": "rootfi"})
+
+    assert "expense|rootfi|" in {m["series_key"] for m in list_models()}
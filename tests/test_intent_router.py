@@ -0,0 +1,48 @@
+import pytest
+
+from app.intent_router import intent_router
+
+
+@pytest.mark.parametrize(
+    "question, intent",
+    [
+        ("What was the total profit in Q1?", "total"),
+        ("How much revenue from rootfi in 2024", "total"),
+        ("Show me revenue trends for 2024", "trend"),
+        ("Top expense categories in 2024", "top_category"),
+        ("Which expense category had the highest increase this year?", "category_increase"),
+        ("Compare Q1 and Q2 performance", "compare"),
+        ("compare revenue between 2023 and 2024", "compare"),
+    ],
+)
+def test_common_questions_are_routed(question, intent):
+    answer = intent_router.route(question)
+    assert answer is not None and answer["intent"] == intent
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "revenue not from quickbooks in 2024",
+        "revenue except rootfi 2024",
+        "Which expense category had the lowest spend in 2024?",
+        "revenue after Q1 2024",
+        "How much revenue did we lose in 2024?",
+        "revenue between Q1 and Q3 2024",
+        "total profit in Q1 and Q2",
+        "revenue for 2023 and 2024",
+        "Which month had the highest revenue?",
+        "revenue over 10000 in 2024",
+        "top 100 expense categories",
+        "Forecast revenue for the next 3 months",
+    ],
+)
+def test_questions_the_grammar_cannot_express_go_to_the_agent(question):
+    assert intent_router.route(question) is None
+
+
+def test_top_n_is_taken_from_the_question():
+    answer = intent_router.route("top 3 expense categories in 2024")
+    assert answer["params"]["limit"] == 3
+    assert len(answer["result"]) == 3
+    assert intent_router.route("top expense categories in 2024")["params"]["limit"] == 5
@@ -0,0 +1,43 @@
+from app import llm
+from app.db import engine
+from app.fake_llm import FakeFinancialChatModel
+from app.llm import AgentRuntime
+from app.versioning import bump_data_version
+
+
+def test_agent_is_reused_until_the_data_version_changes():
+    runtime = AgentRuntime(llm=FakeFinancialChatModel())
+    model, agent, streaming_agent = runtime.llm, runtime.agent, runtime.streaming_agent
+
+    assert runtime.agent is agent
+    assert runtime.streaming_agent is streaming_agent
+    assert runtime.llm is model
+
+    with engine.begin() as conn:
+        version = bump_data_version(conn)
+
+    assert runtime.agent is not agent
+    assert runtime.streaming_agent is not streaming_agent
+    assert runtime.llm is model
+    assert runtime.version == version
+    assert runtime.agent is runtime.agent
+
+
+def test_real_provider_shares_one_http_client(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    runtime = AgentRuntime()
+    try:
+        assert runtime._http_client is not None
+        assert runtime.llm.http_client is runtime._http_client
+        assert runtime.llm.http_async_client is runtime._http_async_client
+        # The streaming copy talks through the same connection pool
+        assert runtime.streaming_llm is not runtime.llm
+        assert runtime.streaming_llm.streaming
+        assert runtime.streaming_llm.http_client is runtime._http_client
+    finally:
+        runtime.close()
+
+
+def test_get_runtime_returns_the_process_wide_instance():
+    assert llm.get_runtime() is llm.get_runtime()
@@ -0,0 +1,81 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db import engine, read_engine
+from app.log_retention import compact_logs
+from app.models import COMPRESS_MIN_BYTES, QueryLog
+
+LONG_REPORT = "Revenue grew in every quarter. " * (COMPRESS_MIN_BYTES // 10)
+
+
+def add_logs(*rows: dict) -> list:
+    ids = []
+    with engine.begin() as conn:
+        for row in rows:
+            ids.append(conn.execute(insert(QueryLog.__table__).values({"question": "q", **row})).inserted_primary_key[0])
+    return ids
+
+
+def test_filters_and_keyset_pagination(client):
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    ids = add_logs(
+        *[{"tool": "test_paging", "question": f"revenue question {i}", "created_at": now - timedelta(hours=i)} for i in range(4)],
+        {"tool": "test_paging", "question": "profit up 50% ?", "report": "ERROR: boom", "error": True, "created_at": now},
+    )
+
+    pages, params = [], {"tool": "test_paging", "limit": 2}
+    while True:
+        body = client.get("/logs", params=params).json()
+        pages.append([entry["id"] for entry in body["logs"]])
+        if body["next_before_id"] is None:
+            break
+        params["before_id"] = body["next_before_id"]
+    assert [i for page in pages for i in page] == sorted(ids, reverse=True)
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+    errors = client.get("/logs", params={"tool": "test_paging", "errors_only": "true"}).json()["logs"]
+    assert [entry["id"] for entry in errors] == [ids[-1]]
+    # LIKE wildcards in the search text are literal
+    assert [e["id"] for e in client.get("/logs", params={"tool": "test_paging", "q": "50%"}).json()["logs"]] == [ids[-1]]
+    assert client.get("/logs", params={"tool": "test_paging", "q": "PROFIT"}).json()["logs"][0]["id"] == ids[-1]
+
+    window = {"tool": "test_paging", "since": (now - timedelta(hours=2, minutes=30)).isoformat(), "until": (now - timedelta(minutes=30)).isoformat()}
+    assert [e["id"] for e in client.get("/logs", params=window).json()["logs"]] == [ids[2], ids[1]]
+
+
+def test_long_text_is_stored_compressed_and_read_back(client):
+    result = {"rows": [{"month": "2024-01", "amount": 1.5}] * 200}
+    (log_id,) = add_logs({"tool": "test_compressed", "report": LONG_REPORT, "result": json.dumps(result)})
+
+    with read_engine.connect() as conn:
+        stored = conn.exec_driver_sql("SELECT typeof(report), typeof(result) FROM query_logs WHERE id = ?", (log_id,)).one()
+    assert tuple(stored) == ("blob", "blob")
+
+    entry = client.get("/logs", params={"tool": "test_compressed", "include_result": "true"}).json()["logs"][0]
+    assert entry["report"] == LONG_REPORT
+    assert entry["result"] == result
+
+
+def test_compaction_rolls_old_entries_into_daily_counts(client):
+    old = datetime(2020, 1, 1, 12)
+    add_logs(
+        {"tool": "test_compact", "created_at": old},
+        {"tool": "test_compact", "created_at": old, "report": "ERROR: x", "error": True},
+        {"tool": "test_compact", "created_at": old + timedelta(days=1)},
+    )
+    (kept,) = add_logs({"tool": "test_compact", "report": LONG_REPORT})
+
+    assert compact_logs(retention_days=30) >= 3
+
+    days = client.get("/logs/daily", params={"tool": "test_compact"}).json()["days"]
+    assert days == [
+        {"day": "2020-01-02", "tool": "test_compact", "queries": 1, "errors": 0},
+        {"day": "2020-01-01", "tool": "test_compact", "queries": 2, "errors": 1},
+    ]
+    with Session(read_engine) as session:
+        remaining = session.scalars(select(QueryLog).where(QueryLog.tool == "test_compact")).all()
+    assert [row.id for row in remaining] == [kept]
+    assert isinstance(remaining[0].report, str) and remaining[0].report == LONG_REPORT
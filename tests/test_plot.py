@@ -0,0 +1,38 @@
+from app import forecasting
+
+
+def test_repeat_request_with_the_etag_is_304(client):
+    params = {"horizon": 3, "format": "json"}
+    first = client.get("/plot/forecast", params=params)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get("/plot/forecast", params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert not again.content
+
+    other = client.get("/plot/forecast", params={**params, "horizon": 4}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_failed_fit_is_neither_tagged_nor_cached(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError("LU decomposition error")
+
+    monkeypatch.setattr(forecasting, "forecast", fail)
+    params = {"horizon": 5, "format": "json"}
+
+    response = client.get("/plot/forecast", params=params)
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert response.headers["Cache-Control"] == "no-store"
+    assert response.headers["X-Forecast-Error"] == "LU decomposition error"
+    assert response.json()["error"] == "Forecast failed: LU decomposition error"
+    assert response.json()["forecast"] == {}
+
+    # Once the fit works again the same request is fitted, not served from the render cache
+    monkeypatch.undo()
+    recovered = client.get("/plot/forecast", params=params)
+    assert "ETag" in recovered.headers
+    assert len(recovered.json()["forecast"]) == 5
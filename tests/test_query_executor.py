@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import llm
+from app.api import query as query_api
+from app.fake_llm import FakeFinancialChatModel
+from app.llm import AgentRuntime
+from app.query_executor import QueryExecutor
+
+
+@pytest.fixture
+def slow_agent(monkeypatch):
+    """Agent runs take about a second: two fake model calls of 0.5s each."""
+    monkeypatch.setattr(llm, "_runtime", AgentRuntime(llm=FakeFinancialChatModel(latency=0.5)))
+
+
+def use_executor(monkeypatch, **limits) -> QueryExecutor:
+    executor = QueryExecutor(**limits)
+    monkeypatch.setattr(query_api, "query_executor", executor)
+    return executor
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.01)
+
+
+def test_identical_concurrent_questions_share_one_run(client, slow_agent, monkeypatch):
+    executor = use_executor(monkeypatch, max_concurrent=2, max_queue=2, deadline=30)
+    params = {"q": "Summarize our cash position", "cache": "false"}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(client.get, "/query", params=params)
+        wait_for(lambda: executor.stats()["inflight_keys"] == 1)
+        second = pool.submit(client.get, "/query", params={**params, "q": "  summarize our CASH position "})
+        responses = [first.result(), second.result()]
+
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json()["report"] == responses[1].json()["report"]
+    # Each caller gets its own wording back
+    assert responses[1].json()["question"] == "  summarize our CASH position "
+    assert executor.executions == 1
+    assert executor.coalesced == 1
+
+
+def test_saturated_returns_429_with_retry_after(client, slow_agent, monkeypatch):
+    executor = use_executor(monkeypatch, max_concurrent=1, max_queue=0, deadline=30)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        busy = pool.submit(client.get, "/query", params={"q": "What drove costs up in the last audit?", "cache": "false"})
+        wait_for(lambda: executor.stats()["pending"] == 1)
+        response = client.get("/query", params={"q": "Summarize our cash position", "cache": "false"})
+        assert busy.result().status_code == 200
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert executor.rejected == 1
+
+
+def test_missed_deadline_returns_504(client, slow_agent, monkeypatch):
+    executor = use_executor(monkeypatch, max_concurrent=1, max_queue=1, deadline=0.2)
+
+    response = client.get("/query", params={"q": "Summarize our cash position today", "cache": "false"})
+
+    assert response.status_code == 504
+    assert executor.timeouts == 1
+    # The run still finishes in the background and releases its slot
+    wait_for(lambda: executor.stats()["pending"] == 0)
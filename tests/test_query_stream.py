@@ -0,0 +1,68 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import llm
+from app.api import query as query_api
+from app.fake_llm import FakeFinancialChatModel
+from app.llm import AgentRuntime
+from app.query_executor import QueryExecutor
+
+
+def events(response) -> list:
+    """Parse an SSE body into (event, data) pairs, skipping keep-alive comments."""
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            parsed.append((lines["event"], json.loads(lines["data"])))
+    return parsed
+
+
+def test_stream_events_arrive_in_order(client):
+    response = client.get("/query/stream", params={"q": "Summarize our cash position", "cache": "false"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    stream = events(response)
+    names = [name for name, _ in stream]
+    assert names[0] == "start"
+    assert names[1:3] == ["tool_start", "tool"]
+    assert stream[1][1]["tool"] == "sql_query"
+    assert "duration_ms" in stream[2][1]
+    tokens = names[3:-1]
+    assert tokens and set(tokens) == {"token"}
+    assert names[-1] == "done"
+
+    done = stream[-1][1]
+    assert done["cached"] is False
+    assert "".join(data["text"] for name, data in stream if name == "token") == done["report"]
+
+
+def test_cache_hit_is_replayed(client):
+    question = "What drove costs up in the last audit?"
+    first = events(client.get("/query/stream", params={"q": question}))
+    replay = events(client.get("/query/stream", params={"q": question}))
+
+    assert [name for name, _ in replay] == ["start", "token", "done"]
+    assert replay[-1][1]["cached"] is True
+    assert replay[-1][1]["report"] == first[-1][1]["report"]
+
+
+def test_saturated_stream_is_rejected_before_the_first_event(client, monkeypatch):
+    monkeypatch.setattr(llm, "_runtime", AgentRuntime(llm=FakeFinancialChatModel(latency=0.5)))
+    executor = QueryExecutor(max_concurrent=1, max_queue=0, deadline=30)
+    monkeypatch.setattr(query_api, "query_executor", executor)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        busy = pool.submit(client.get, "/query", params={"q": "Summarize our cash position", "cache": "false"})
+        deadline = time.monotonic() + 5
+        while executor.stats()["pending"] == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        response = client.get("/query/stream", params={"q": "What drove revenue up?", "cache": "false"})
+        assert busy.result().status_code == 200
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["detail"].startswith("Query capacity exhausted")
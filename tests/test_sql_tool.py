@@ -0,0 +1,77 @@
+import pytest
+
+from app.tools import sql_tool
+from app.tools.sql_tool import QueryRejected, run_guarded, sql_query
+
+COUNT_TO_A_MILLION = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000) SELECT COUNT(*) FROM c"
+)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM transactions",
+        "PRAGMA table_info(transactions)",
+        "SELECT * FROM query_logs",
+        "SELECT name FROM sqlite_master",
+        "SELECT 1; DROP TABLE transactions",
+    ],
+)
+def test_statements_outside_the_allow_list_are_rejected(sql):
+    with pytest.raises(QueryRejected):
+        run_guarded(sql)
+
+
+def test_allowed_reads_return_rows():
+    rows = run_guarded("WITH t AS (SELECT type, amount FROM transactions) SELECT type, COUNT(*) AS n FROM t GROUP BY type")
+    assert {row["type"] for row in rows} >= {"revenue", "expense"}
+
+
+def test_full_scan_aggregate_of_a_large_table_is_rejected(monkeypatch):
+    monkeypatch.setattr(sql_tool, "SQL_FULL_SCAN_MAX_ROWS", 100)
+
+    with pytest.raises(QueryRejected, match="scan all rows of transactions"):
+        run_guarded("SELECT SUM(amount) FROM transactions WHERE amount > 0")
+    # The same aggregate over an indexed filter is a search, not a scan
+    assert run_guarded("SELECT SUM(amount) AS total FROM transactions WHERE type = 'revenue' AND date >= '2024-01-01'")
+
+
+def test_streamable_full_scan_is_bounded_instead(monkeypatch):
+    monkeypatch.setattr(sql_tool, "SQL_FULL_SCAN_MAX_ROWS", 100)
+    monkeypatch.setattr(sql_tool, "SQL_MAX_ROWS", 50)
+
+    result = run_guarded("SELECT id, amount FROM transactions WHERE amount > 0")
+
+    assert result["rewritten"] and result["truncated"]
+    assert result["row_count"] == 50
+
+
+def test_statement_past_the_time_limit_is_interrupted(monkeypatch):
+    monkeypatch.setattr(sql_tool, "SQL_TIMEOUT", 0.0)
+
+    with pytest.raises(QueryRejected, match="time limit"):
+        run_guarded(COUNT_TO_A_MILLION)
+
+
+def test_large_results_are_capped_and_summarized(monkeypatch):
+    monkeypatch.setattr(sql_tool, "SQL_MAX_ROWS", 50)
+    monkeypatch.setattr(sql_tool, "SQL_RETURN_ROWS", 10)
+
+    capped = run_guarded("SELECT id, type, amount FROM transactions")
+    assert capped["summary"] and capped["truncated"]
+    assert capped["row_count"] == 50 and capped["row_limit"] == 50
+    assert len(capped["sample"]) == sql_tool.SUMMARY_SAMPLE_ROWS
+    assert {"min", "max", "mean", "sum"} <= set(capped["columns"]["amount"])
+    assert capped["columns"]["type"]["distinct"] >= 1
+
+    summarized = run_guarded("SELECT id FROM transactions LIMIT 20")
+    assert summarized["summary"] and not summarized["truncated"]
+    assert summarized["row_count"] == 20
+
+    assert len(run_guarded("SELECT id FROM transactions LIMIT 10")) == 10
+
+
+def test_rejections_reach_the_agent_as_tool_output():
+    output = sql_query.invoke({"sql": "DELETE FROM transactions"})
+    assert "Only read-only SELECT" in output
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from app.db import TENANT_DB_DIR, list_tenants, shards, use_tenant
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@pytest.fixture(scope="module")
+def acme(loaded_db):
+    from scripts.load_data import main
+
+    main(["--tenant", "acme", "--data-dir", DATA_DIR])
+    return "acme"
+
+
+def test_unknown_tenant_is_404_and_creates_nothing(client):
+    response = client.get("/data/raw", params={"tenant": "evil-probe"})
+
+    assert response.status_code == 404
+    assert not os.path.exists(os.path.join(TENANT_DB_DIR, "evil-probe.db"))
+    assert "evil-probe" not in list_tenants()
+    assert "evil-probe" not in shards.open_tenants()
+
+
+def test_invalid_tenant_is_400(client):
+    assert client.get("/data/raw", headers={"X-Tenant-ID": "../etc"}).status_code == 400
+
+
+def test_loaded_tenant_is_served(client, acme):
+    response = client.get("/data/raw", params={"limit": 1}, headers={"X-Tenant-ID": acme})
+    assert response.status_code == 200
+    assert acme in {t["tenant"] for t in client.get("/tenants").json()["tenants"]}
+
+
+def test_aggregate_over_an_unknown_tenant_is_404(client, acme):
+    response = client.get("/tenants/aggregate", params={"tenants": f"{acme},nobody"})
+    assert response.status_code == 404
+    assert not os.path.exists(os.path.join(TENANT_DB_DIR, "nobody.db"))
+
+
+def test_version_bump_evicts_only_that_tenants_answers(acme):
+    from app.answer_cache import AnswerCache
+
+    cache = AnswerCache(similarity=0)
+    cache.store("What was the total profit in Q1?", "default report", version=1)
+    with use_tenant(acme):
+        cache.store("What was the total profit in Q1?", "acme report", version=1)
+        assert cache.lookup("What was the total profit in Q1?", version=2) is None
+
+    assert cache.lookup("What was the total profit in Q1?", version=1)["report"] == "default report"
+
+
+def test_summary_counts_every_transaction(client, acme):
+    from sqlalchemy import text
+
+    from app.db import get_read_engine
+
+    with use_tenant(acme), get_read_engine().connect() as conn:
+        rows = conn.execute(text("SELECT COUNT(*) FROM transactions")).scalar()
+
+    summary = {t["tenant"]: t for t in client.get("/tenants").json()["tenants"]}
+    assert summary[acme]["transactions"] == rows
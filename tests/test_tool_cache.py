@@ -0,0 +1,77 @@
+import pytest
+
+from app import tool_cache as tool_cache_module
+from app.db import use_tenant
+from app.tool_cache import ToolResultCache, cached_tool, canonical_sql
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("SELECT SUM(amount) FROM transactions WHERE year_month = 202401", "select  sum(amount)\nfrom Transactions where YEAR_MONTH=202401;"),
+        ("SELECT * FROM t WHERE a != 1", "SELECT * FROM t WHERE a <> 1 -- any rows"),
+        ("SELECT * FROM t WHERE amount > 1.50", "SELECT * FROM t /* threshold */ WHERE amount > 1.5"),
+        ("SELECT * FROM t LIMIT 010", "SELECT * FROM t LIMIT 10"),
+    ],
+)
+def test_equivalent_spellings_share_a_key(first, second):
+    assert canonical_sql(first) == canonical_sql(second)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("SELECT * FROM t WHERE year_month = 202401", "SELECT * FROM t WHERE year_month = 202402"),
+        ("SELECT * FROM t WHERE type = 'revenue'", "SELECT * FROM t WHERE type = 'Revenue'"),
+        ("SELECT * FROM t WHERE category = 'a  b'", "SELECT * FROM t WHERE category = 'a b'"),
+        ('SELECT "Amount" FROM t', "SELECT amount FROM t"),
+        ("SELECT * FROM t WHERE amount > 1.5", "SELECT * FROM t WHERE amount > 15"),
+    ],
+)
+def test_different_queries_do_not(first, second):
+    assert canonical_sql(first) != canonical_sql(second)
+
+
+@pytest.fixture
+def counted_tool(monkeypatch):
+    """A cached tool over a fresh cache, on a data version the test controls."""
+    calls, version = [], {"value": 1}
+    monkeypatch.setattr(tool_cache_module, "tool_cache", ToolResultCache())
+    monkeypatch.setattr(tool_cache_module, "get_data_version", lambda: version["value"])
+
+    @cached_tool("test_sql", key=lambda sql: (canonical_sql(sql),))
+    def run(sql: str):
+        calls.append(sql)
+        return [{"sql": sql}]
+
+    return run, calls, version
+
+
+def test_variants_hit_one_entry_and_other_literals_miss(counted_tool):
+    run, calls, _ = counted_tool
+
+    run("SELECT SUM(amount) FROM transactions WHERE year_month = 202401")
+    run("select sum(amount)   from transactions\nwhere year_month = 202401;")
+    assert len(calls) == 1
+
+    run("SELECT SUM(amount) FROM transactions WHERE year_month = 202402")
+    assert len(calls) == 2
+
+
+def test_a_new_data_version_misses_for_that_tenant_only(counted_tool):
+    run, calls, version = counted_tool
+    sql = "SELECT COUNT(*) FROM transactions"
+
+    run(sql)
+    with use_tenant("other"):
+        run(sql)
+    assert len(calls) == 2
+
+    version["value"] = 2
+    run(sql)
+    assert len(calls) == 3
+    # The other tenant's entry was computed on its own version and survives
+    version["value"] = 1
+    with use_tenant("other"):
+        run(sql)
+    assert len(calls) == 3